@@ -1,11 +1,14 @@
 import streamlit as st
 import os
+import time
 import pandas as pd
-import tempfile
-from src.data.loader import MeetingLoader, SegmentGenerator
-from src.features.text import TextFeatureExtractor
-from src.models.role_encoder import RoleEncoder
-from src.app.utils import generate_highlight_video
+from src.data.loader import MeetingLoader
+from src.data.upload_store import UploadStore
+from src.pipeline.jobs import JobQueue, start_workers, QUEUED, RUNNING, FAILED
+from src.models.registry import SCORER_PATH
+from src.models.fusion import read_checkpoint_meta
+from src.models.cascade import scorer_mismatch
+from src.app.utils import fragment_path, prune_fragment_cache
 
 # Page Config
 st.set_page_config(page_title="RoME: Role-aware Meeting Summarizer", layout="wide")
@@ -13,10 +16,52 @@ st.set_page_config(page_title="RoME: Role-aware Meeting Summarizer", layout="wid
 st.title("RoME: Role-aware Multimodal Meeting Summarizer")
 st.markdown("Upload a meeting video and transcript, select your role, and get a personalized highlight reel.")
 
+@st.cache_resource
+def load_job_queue():
+    # Highlight jobs run in background worker processes (one set per app process),
+    # so reruns, refreshes and concurrent sessions never block on the pipeline
+    queue = JobQueue()
+    start_workers(n_workers=max(1, (os.cpu_count() or 2) // 2))
+    return queue
+
+queue = load_job_queue()
+
+@st.cache_resource
+def load_upload_store():
+    return UploadStore()
+
+store = load_upload_store()
+
+@st.cache_data
+def cascade_unavailable(scorer_path: str, mtime: float):
+    """Why the fusion model can't re-rank this app's jobs ('lines' text embeddings), or None."""
+    if not os.path.exists(scorer_path):
+        return f"Needs a trained model at {scorer_path}"
+    mismatch = scorer_mismatch(read_checkpoint_meta(scorer_path), "lines")
+    return f"Unavailable: {mismatch}" if mismatch else None
+
+def ingest_upload(uploaded_file):
+    """
+    Streams an upload into the content-addressed store once per upload (not on
+    every rerun). Returns: (sha256, stored path) for MeetingLoader to open in place.
+    """
+    key = f"upload:{getattr(uploaded_file, 'file_id', None) or (uploaded_file.name, uploaded_file.size)}"
+    if key not in st.session_state or not os.path.exists(st.session_state[key][1]):
+        uploaded_file.seek(0)
+        digest, path = store.ingest(uploaded_file, suffix=os.path.splitext(uploaded_file.name)[1])
+        st.session_state[key] = (digest, path)
+        # New content may push the store over its size budget; keep inputs and fragments of pending
+        # jobs, and this session's uploads (e.g. the video, while the transcript is still being ingested)
+        session_uploads = [v[0] for k, v in st.session_state.items() if str(k).startswith("upload:")]
+        store.gc(protect=queue.active_inputs() + session_uploads)
+        queue.prune_artifacts()
+        prune_fragment_cache(protect=queue.active_fragments())
+    return st.session_state[key]
+
 # Sidebar: Inputs
 st.sidebar.header("1. Upload Data")
 video_file = st.sidebar.file_uploader("Upload Meeting Video", type=['mp4', 'mov', 'avi'])
-transcript_file = st.sidebar.file_uploader("Upload Transcript (CSV/JSON/XML)", type=['csv', 'json', 'xml'])
+transcript_file = st.sidebar.file_uploader("Upload Transcript (CSV/JSON/XML/VTT/SRT)", type=['csv', 'json', 'xml', 'vtt', 'srt'])
 
 st.sidebar.header("2. Select Role")
 role_options = [
@@ -25,81 +70,103 @@ role_options = [
     "Frontend Designer (UX, UI, CSS, Flow)",
     "QA Engineer (Bugs, Testing, Release)"
 ]
-selected_role_desc = st.sidebar.selectbox("Choose your perspective:", role_options)
+selected_roles = st.sidebar.multiselect("Choose your perspective(s):", role_options, default=role_options[:1])
+
+st.sidebar.header("3. Ranking")
+# Cascade: text shortlist first, audio/video features only for the shortlist
+cascade_issue = cascade_unavailable(SCORER_PATH, os.path.getmtime(SCORER_PATH) if os.path.exists(SCORER_PATH) else 0.0)
+use_cascade = st.sidebar.checkbox("Re-rank with audio/video (fusion model)", value=False,
+                                  disabled=cascade_issue is not None,
+                                  help=cascade_issue or "Text shortlist, then audio/video features for the shortlist only")
+shortlist = st.sidebar.slider("Shortlist per role", 5, 50, 20, disabled=not use_cascade)
+# Highlights are cut one by one (cached per highlight) and play as soon as each is ready
+order = st.sidebar.radio("Highlight order", ["chronological", "ranked"], horizontal=True)
+
+with st.sidebar.expander("Job Queue"):
+    st.json(queue.stats())
+
+with st.sidebar.expander("Model Stats"):
+    # Models live in the worker processes; each reports its stats with its heartbeat
+    st.json(queue.worker_stats())
 
 # Main Area
-if video_file and transcript_file:
-    # Save uploaded files temporarily
-    tfile_video = tempfile.NamedTemporaryFile(delete=False, suffix=f".{video_file.name.split('.')[-1]}") 
-    tfile_video.write(video_file.read())
-    video_path = tfile_video.name
-    
-    tfile_trans = tempfile.NamedTemporaryFile(delete=False, suffix=f".{transcript_file.name.split('.')[-1]}")
-    tfile_trans.write(transcript_file.read())
-    transcript_path = tfile_trans.name
+# The job id lives in the URL, so a browser refresh picks the job back up
+job_id = st.query_params.get("job")
+
+if video_file and transcript_file and selected_roles:
+    # Uploads go to the content-addressed store; identical content is stored once
+    video_hash, video_path = ingest_upload(video_file)
+    transcript_hash, transcript_path = ingest_upload(transcript_file)
     
     # Load Data using MeetingLoader
     loader = MeetingLoader(video_path, transcript_path)
-    transcript_df = loader.load_transcript()
+    # Streamlit reruns the script on every interaction; parse each transcript content once
+    transcript_df = loader.load_transcript(cache=True)
         
     st.info(f"Loaded Video: {video_file.name} | Transcript: {len(transcript_df)} lines")
     
     if st.button("Generate Highlights"):
-        with st.spinner("Processing Meeting... (This may take a minute)"):
-            # 1. Load & Segment
-            # loader already initialized above
-            # metadata = loader.load_video_metadata()
-            
-            segmenter = SegmentGenerator(window_size_sec=30, step_size_sec=30)
-            # For prototype, we use a dummy duration or calculate it
-            # duration = metadata['duration']
-            duration = transcript_df['end_time'].max()
-            segments = segmenter.segment_meeting(duration, transcript_df)
-            
-            st.write(f"Divided meeting into {len(segments)} segments.")
-            
-            # 2. Feature Extraction (Text Only for Prototype Speed)
-            text_extractor = TextFeatureExtractor()
-            role_encoder = RoleEncoder(text_extractor)
-            
-            # 3. Scoring (Dummy Logic for Prototype until Model is Trained)
-            # We will use Cosine Similarity between Role Embedding and Segment Text Embedding
-            role_emb = role_encoder.encode_role(selected_role_desc)
-            
-            scored_segments = []
-            segment_texts = [s['text'] for s in segments]
-            seg_embs = text_extractor.extract(segment_texts)
-            
-            from sklearn.metrics.pairwise import cosine_similarity
-            scores = cosine_similarity([role_emb], seg_embs)[0]
-            
-            for i, seg in enumerate(segments):
-                seg['score'] = scores[i]
-                scored_segments.append(seg)
-                
-            # 4. Filter Top Segments
-            # Sort by score and take top 3 or top 20%
-            scored_segments.sort(key=lambda x: x['score'], reverse=True)
-            top_segments = scored_segments[:3] # Top 3 segments
-            
-            # Sort back by time for the video
-            top_segments.sort(key=lambda x: x['start_time'])
-            
-            # 5. Generate Video
-            output_video_path = "highlight_reel.mp4"
-            success = generate_highlight_video(video_path, top_segments, output_video_path)
+        # Identical submissions share one job; finished ones are served from their artifacts.
+        # Workers use features from the offline batch pipeline (src/pipeline/precompute.py) when available.
+        job_id = queue.submit(video_path, transcript_path, selected_roles,
+                              meeting_id=video_file.name.split('.')[0], top_k=3, window_size=30, step_size=30,
+                              ranking="cascade" if use_cascade else "text", shortlist=shortlist,
+                              output="hls", order=order,
+                              video_hash=video_hash, transcript_hash=transcript_hash)
+        st.query_params["job"] = job_id
+
+def show_fragments(role_result):
+    """Plays each ready highlight; st.video can't play HLS, but every fragment is a standalone fMP4."""
+    for fragment in role_result["fragments"]:
+        st.caption(f"{fragment['start_time']:.1f}s - {fragment['end_time']:.1f}s")
+        st.video(fragment_path(fragment["dir"]), format="video/mp4")
+
+if job_id:
+    job = queue.get(job_id)
+    if job is None:
+        st.warning("Unknown job. Please upload the meeting again.")
+    elif job["status"] in (QUEUED, RUNNING):
+        label = "Waiting for a worker..." if job["status"] == QUEUED else f"Processing meeting: {job['stage']}"
+        st.progress(job["progress"], text=label)
+        if job["result"]:
+            # Highlights rendered so far
+            for role_result in job["result"]["roles"]:
+                st.markdown(f"**{role_result['role']}**")
+                show_fragments(role_result)
+        time.sleep(1.0)
+        st.rerun()
+    elif job["status"] == FAILED:
+        st.error("Failed to generate highlights.")
+        with st.expander("Error details"):
+            st.code(job["error"])
+    else:
+        result = job["result"]
+        st.write(f"Divided meeting into {result['n_segments']} segments.")
+        if result.get("ranking", {}).get("mode") == "cascade":
+            st.caption(f"Audio/video features computed for {result['ranking']['feature_segments']} "
+                       f"of {result['n_segments']} segments (shortlist {result['ranking']['shortlist']} per role).")
+        
+        tabs = st.tabs([r["role"].split(' (')[0] for r in result["roles"]])
+        for role_result, tab in zip(result["roles"], tabs):
+            with tab:
+                if role_result["video"]:
+                    st.success(f"Highlight Reel Generated for {role_result['role']}!")
+                    if role_result.get("playlist"):
+                        show_fragments(role_result)
+                        st.caption(f"HLS playlist: {role_result['playlist']}")
+                    else:
+                        st.video(role_result["video"])
+                    
+                    st.subheader("Summary of Highlights")
+                    for seg in role_result["segments"]:
+                        st.markdown(f"**{seg['start_time']:.1f}s - {seg['end_time']:.1f}s** (Score: {seg['score']:.2f})")
+                        st.write(seg['text'])
+                        st.divider()
+                else:
+                    st.error("Failed to generate video.")
+        
+        with st.expander("Timing breakdown"):
+            st.dataframe(pd.DataFrame(result["profile"]), hide_index=True)
             
-            if success:
-                st.success("Highlight Reel Generated!")
-                st.video(output_video_path)
-                
-                st.subheader("Summary of Highlights")
-                for seg in top_segments:
-                    st.markdown(f"**{seg['start_time']:.1f}s - {seg['end_time']:.1f}s** (Score: {seg['score']:.2f})")
-                    st.write(seg['text'])
-                    st.divider()
-            else:
-                st.error("Failed to generate video.")
-                
-else:
-    st.info("Please upload both a video and a transcript to begin.")
+elif not (video_file and transcript_file and selected_roles):
+    st.info("Please upload both a video and a transcript, and select at least one role to begin.")
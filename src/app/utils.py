@@ -1,31 +1,446 @@
 import os
-from moviepy.editor import VideoFileClip, concatenate_videoclips
-from typing import List, Dict
+import math
+import bisect
+import time
+import shutil
+import hashlib
+import subprocess
+import tempfile
+from typing import Callable, Iterable, List, Dict, Tuple, Optional
+
+# Source codec -> encoder used for the re-encoded boundary fragments.
+# Fragments must use the same codec as the stream-copied parts so the
+# concat demuxer can join them without re-encoding.
+VIDEO_ENCODERS = {'h264': 'libx264', 'hevc': 'libx265', 'mpeg4': 'mpeg4'}
+AUDIO_ENCODERS = {'aac': 'aac', 'mp3': 'libmp3lame', 'opus': 'libopus'}
+# Seek offset (s) around piece boundaries, well below one frame. Keyframe times
+# are rounded when printed, and an input seek to even slightly before a
+# keyframe's true pts lands on the previous keyframe (duplicating a GOP).
+SEEK_EPSILON = 1e-3
+# Extra duration a concat join may add: encoder priming plus a partial audio frame
+JOIN_TOLERANCE_SEC = 0.05
+
+# Per-highlight HLS renditions (fMP4), shared by every reel that contains the same cut
+HIGHLIGHT_CACHE_DIR = "data/cache/highlights"
+HIGHLIGHT_CACHE_BUDGET_BYTES = 5 * 2**30
+HLS_FORMAT_VERSION = 2
+HLS_SEGMENT_SEC = 4
+FRAGMENT_FILE = "fragment.mp4"
+
+class IncompatibleCodecError(Exception):
+    pass
+
+def merge_segments(segments: List[Dict], gap: float = 0.0) -> List[Tuple[float, float]]:
+    """
+    Sorts segments by start time and merges overlapping (or closer than gap seconds)
+    ones so no footage is cut twice.
+    Returns: list of (start, end) tuples.
+    """
+    spans = sorted((max(seg['start_time'], 0.0), seg['end_time']) for seg in segments)
+    merged = []
+    for start, end in spans:
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1] + gap:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
 
 def generate_highlight_video(video_path: str, segments: List[Dict], output_path: str):
     """
     Cuts and concatenates video segments based on the provided list.
     segments: List of dicts with 'start_time' and 'end_time'.
+    Uses keyframe-aligned stream copy; falls back to a MoviePy re-encode when
+    the source codecs cannot be smart-cut.
     """
     if not segments:
         print("No segments to generate video.")
         return
 
+    spans = merge_segments(segments)
+    if not spans:
+        return False
+
+    try:
+        render_stream_copy(video_path, spans, output_path)
+        return True
+    except Exception as e:
+        print(f"Stream-copy rendering failed ({e}), falling back to MoviePy.")
+        return _render_moviepy(video_path, spans, output_path)
+
+def probe_video(video_path: str) -> Dict:
+    """Returns the first video/audio stream descriptions and the container duration."""
+    import ffmpeg
+
+    info = ffmpeg.probe(video_path)
+    streams = info.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    return {
+        "video": video,
+        "audio": audio,
+        "duration": float(info.get('format', {}).get('duration', 0.0))
+    }
+
+def keyframe_times(video_path: str) -> List[float]:
+    """
+    Keyframe timestamps of the first video stream.
+    Reads packet flags only, so nothing is decoded.
+    """
+    return sorted(probe_frames(video_path)[1])
+
+def probe_frames(video_path: str) -> Tuple[List[float], Dict[float, int]]:
+    """
+    Frame timestamps of the first video stream from its packets (nothing is decoded).
+    Returns: (sorted pts of every frame, keyframe pts -> packet index in decode order).
+    The packets between two keyframes' indices are one GOP, which stream copy takes as a whole.
+    """
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+         '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', video_path],
+        capture_output=True, text=True, check=True
+    )
+    times, keyframes = [], {}
+    for index, line in enumerate(result.stdout.splitlines()):
+        parts = line.strip().split(',')
+        if len(parts) < 2 or parts[0] in ('', 'N/A'):
+            continue
+        times.append(float(parts[0]))
+        if 'K' in parts[1]:
+            keyframes[times[-1]] = index
+    return sorted(times), keyframes
+
+def snap_to_frames(spans: List[Tuple[float, float]], frame_times: List[float],
+                   duration: float) -> List[Tuple[float, float]]:
+    """
+    Moves span boundaries to the first frame at or after them (the end of the
+    stream past the last frame), so every cut falls exactly on a frame and
+    re-encoded pieces start on the frame they are meant to.
+    """
+    def snap(t):
+        i = bisect.bisect_left(frame_times, t - SEEK_EPSILON)
+        return frame_times[i] if i < len(frame_times) else max(duration, t)
+
+    snapped = [(snap(s), snap(e)) for s, e in spans]
+    return [(s, e) for s, e in snapped if e > s]
+
+def plan_cuts(spans: List[Tuple[float, float]], keyframes: List[float]) -> List[Tuple[str, float, float]]:
+    """
+    Splits each span into ('encode'|'copy', start, end) pieces: the part between the
+    first and last keyframe inside the span is stream-copied, the short GOP
+    fragments at either boundary are re-encoded.
+    """
+    pieces = []
+    for start, end in spans:
+        first = bisect.bisect_left(keyframes, start)
+        last = bisect.bisect_right(keyframes, end) - 1
+        if first > last or keyframes[first] >= keyframes[last]:
+            # No complete GOP inside the span
+            pieces.append(('encode', start, end))
+            continue
+        k_start, k_end = keyframes[first], keyframes[last]
+        if k_start > start:
+            pieces.append(('encode', start, k_start))
+        pieces.append(('copy', k_start, k_end))
+        if end > k_end:
+            pieces.append(('encode', k_end, end))
+    return pieces
+
+def render_stream_copy(video_path: str, spans: List[Tuple[float, float]], output_path: str):
+    """
+    Renders spans with ffmpeg's concat demuxer. Only the boundary fragments are
+    re-encoded (matching the source codec/pixel format); everything else is copied.
+    Raises IncompatibleCodecError if the source codecs have no matching encoder,
+    and RuntimeError if the output's frame count or duration does not match the
+    spans (e.g. a duplicated GOP at a join).
+    """
+    info = probe_video(video_path)
+    video, audio = info['video'], info['audio']
+    if video is None or video.get('codec_name') not in VIDEO_ENCODERS:
+        raise IncompatibleCodecError(f"Unsupported video codec: {video and video.get('codec_name')}")
+    if audio is not None and audio.get('codec_name') not in AUDIO_ENCODERS:
+        raise IncompatibleCodecError(f"Unsupported audio codec: {audio.get('codec_name')}")
+
+    duration = info['duration']
+    if duration > 0:
+        spans = [(s, min(e, duration)) for s, e in spans if s < duration]
+    frame_times, packet_index = probe_frames(video_path)
+    spans = snap_to_frames(spans, frame_times, duration)
+    pieces = plan_cuts(spans, sorted(packet_index))
+    if not pieces:
+        raise ValueError("No renderable segments")
+
+    encode_args = ['-c:v', VIDEO_ENCODERS[video['codec_name']]]
+    if video.get('pix_fmt'):
+        encode_args += ['-pix_fmt', video['pix_fmt']]
+    audio_args = []
+    if audio is not None:
+        audio_args = ['-c:a', AUDIO_ENCODERS[audio['codec_name']],
+                      '-ar', str(audio.get('sample_rate', 48000)),
+                      '-ac', str(audio.get('channels', 2))]
+        encode_args += audio_args
+    if video.get('time_base'):
+        # Keep the stream timescale identical across copied and encoded pieces
+        encode_args += ['-video_track_timescale', video['time_base'].split('/')[-1]]
+
+    work_dir = tempfile.mkdtemp(prefix="rome_render_")
+    try:
+        list_path = os.path.join(work_dir, "pieces.txt")
+        with open(list_path, "w") as list_file:
+            for i, (mode, start, end) in enumerate(pieces):
+                piece_path = os.path.join(work_dir, f"piece_{i:04d}.mp4")
+                if mode == 'copy':
+                    # Just past the keyframe: the input seek snaps back to exactly that keyframe.
+                    # Copied video stops by decode time rather than -t, so take exactly the
+                    # packets up to the next keyframe; audio is re-encoded (cheap) so it is
+                    # cut at the same instants instead of at the nearest copied packet.
+                    seek = start + SEEK_EPSILON
+                    codec_args = ['-c:v', 'copy', '-frames:v', str(packet_index[end] - packet_index[start]),
+                                  *audio_args]
+                else:
+                    # Just before the start: accurate seeking keeps the frame at `start`
+                    seek = max(start - SEEK_EPSILON, 0.0)
+                    codec_args = encode_args
+                # The frame at `end` starts the next piece
+                _run_ffmpeg(['-ss', f"{seek:.6f}", '-i', video_path, '-t', f"{end - 2 * SEEK_EPSILON - seek:.6f}",
+                             '-map', '0:v:0', '-map', '0:a:0?', *codec_args,
+                             '-avoid_negative_ts', 'make_zero', piece_path])
+                list_file.write(f"file '{piece_path}'\n")
+
+        _run_ffmpeg(['-f', 'concat', '-safe', '0', '-i', list_path,
+                     '-c', 'copy', '-movflags', '+faststart', output_path])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    # Every source frame of the spans exactly once (a duplicated or lost GOP shows here),
+    # and the duration up to the audio frame padding each join may add
+    expected_frames = sum(bisect.bisect_left(frame_times, e - SEEK_EPSILON) -
+                          bisect.bisect_left(frame_times, s - SEEK_EPSILON) for s, e in spans)
+    actual_frames = len(probe_frames(output_path)[0])
+    expected = sum(e - s for s, e in spans)
+    actual = probe_video(output_path)['duration']
+    tolerance = len(pieces) * JOIN_TOLERANCE_SEC + 1.0 / (_frame_rate(video) or 25.0)
+    if actual_frames != expected_frames or abs(actual - expected) > tolerance:
+        raise RuntimeError(f"Rendered {actual_frames} frames / {actual:.3f}s "
+                           f"for {expected_frames} frames / {expected:.3f}s of highlights")
+
+def _frame_rate(stream: Dict) -> float:
+    num, _, den = (stream.get('avg_frame_rate') or stream.get('r_frame_rate') or '0/1').partition('/')
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+def generate_highlight_playlist(video_path: str, segments: List[Dict], playlist_path: str,
+                                order: str = "chronological", cache_dir: str = HIGHLIGHT_CACHE_DIR,
+                                source_key: Optional[str] = None,
+                                on_fragment: Optional[Callable[[int, Dict], None]] = None) -> List[Dict]:
+    """
+    Segmented alternative to generate_highlight_video: every highlight becomes
+    an independently playable HLS/fMP4 fragment (cached under cache_dir, so
+    reels that share a cut reuse it), and playlist_path is an HLS playlist over them.
+    order: 'chronological', or 'ranked' (segments are given best first; merged
+    overlapping highlights take their best rank).
+    The playlist is rewritten as an EVENT playlist after each fragment, so players
+    can start on the first highlight while later ones are cut, and on_fragment(i, fragment)
+    is called as each one is ready. source_key identifies the video content (e.g. its sha256).
+    Returns: [{'start_time', 'end_time', 'dir'}] in playlist order.
+    """
+    spans = merge_segments(segments)
+    if order == "ranked":
+        def best_rank(span):
+            return min(i for i, seg in enumerate(segments)
+                       if seg['start_time'] < span[1] and seg['end_time'] > span[0])
+        spans = sorted(spans, key=best_rank)
+    elif order != "chronological":
+        raise ValueError(f"Unknown highlight order: {order}")
+
+    source_key = source_key or _file_key(video_path)
+    fragments = []
+    for i, (start, end) in enumerate(spans):
+        frag_dir = render_fragment(video_path, start, end, cache_dir, source_key)
+        fragments.append({"start_time": start, "end_time": end, "dir": frag_dir})
+        write_reel_playlist([f["dir"] for f in fragments], playlist_path, complete=i == len(spans) - 1)
+        if on_fragment is not None:
+            on_fragment(i, fragments[-1])
+    return fragments
+
+def fragment_key(source_key: str, start: float, end: float) -> str:
+    return hashlib.sha256(f"{source_key}|{start:.3f}|{end:.3f}|v{HLS_FORMAT_VERSION}".encode("utf-8")).hexdigest()[:32]
+
+def _file_key(path: str) -> str:
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+
+def render_fragment(video_path: str, start: float, end: float, cache_dir: str = HIGHLIGHT_CACHE_DIR,
+                    source_key: Optional[str] = None) -> str:
+    """
+    Cuts [start, end) into an HLS rendition unless it is cached already:
+    fragment.mp4, a single fragmented MP4 that also plays on its own, and
+    index.m3u8 addressing its init section and media segments by byte range.
+    Uses the keyframe-aligned stream copy, and re-encodes to H.264/AAC if the
+    source cannot be smart-cut.
+    Returns: the fragment directory.
+    """
+    key = fragment_key(source_key or _file_key(video_path), start, end)
+    frag_dir = os.path.join(cache_dir, key[:2], key)
+    if os.path.exists(os.path.join(frag_dir, "index.m3u8")):
+        _touch(frag_dir)
+        return frag_dir
+
+    tmp_dir = f"{frag_dir}.{os.getpid()}.{time.time_ns()}.tmp"
+    os.makedirs(tmp_dir)
+    try:
+        hls_args = ['-f', 'hls', '-hls_time', str(HLS_SEGMENT_SEC), '-hls_playlist_type', 'vod',
+                    '-hls_segment_type', 'fmp4', '-hls_flags', 'single_file',
+                    '-hls_segment_filename', os.path.join(tmp_dir, FRAGMENT_FILE),
+                    os.path.join(tmp_dir, 'index.m3u8')]
+        clip_path = os.path.join(tmp_dir, "clip.mp4")
+        try:
+            render_stream_copy(video_path, [(start, end)], clip_path)
+            _run_ffmpeg(['-i', clip_path, '-c', 'copy', *hls_args])
+        except Exception as e:
+            print(f"Stream-copy fragment failed ({e}), re-encoding.")
+            _run_ffmpeg(['-ss', f"{start:.6f}", '-i', video_path, '-t', f"{end - start:.6f}",
+                         '-map', '0:v:0', '-map', '0:a:0?', '-c:v', 'libx264', '-pix_fmt', 'yuv420p',
+                         '-c:a', 'aac', *hls_args])
+        if os.path.exists(clip_path):
+            os.remove(clip_path)
+        try:
+            os.rename(tmp_dir, frag_dir)
+        except OSError:
+            # Another worker finished the same fragment first
+            if not os.path.exists(os.path.join(frag_dir, "index.m3u8")):
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return frag_dir
+
+def _read_media_playlist(frag_dir: str) -> Tuple[Optional[str], List[Tuple[float, List[str], str]]]:
+    """
+    Returns: (EXT-X-MAP tag or None, [(duration, tag lines, segment path), ...]) of a
+    fragment's index.m3u8, with URIs made absolute.
+    """
+    map_tag, entries, tags = None, [], []
+    with open(os.path.join(frag_dir, "index.m3u8")) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("#EXT-X-MAP:"):
+                uri = line.split('URI="', 1)[1].split('"', 1)[0]
+                map_tag = line.replace(f'URI="{uri}"', 'URI="{}"'.format(os.path.join(frag_dir, uri)))
+            elif line.startswith(("#EXTINF:", "#EXT-X-BYTERANGE:")):
+                tags.append(line)
+            elif line and not line.startswith("#"):
+                duration = float(tags[0][len("#EXTINF:"):].split(",", 1)[0])
+                entries.append((duration, tags, os.path.join(frag_dir, line)))
+                tags = []
+    return map_tag, entries
+
+def write_reel_playlist(fragment_dirs: List[str], playlist_path: str, complete: bool = True):
+    """
+    Writes an HLS media playlist (version 7) that plays the fragments back to back.
+    Each fragment has its own init section, so fragments are separated by
+    EXT-X-DISCONTINUITY and re-declare EXT-X-MAP. URIs are relative to the playlist.
+    Incomplete reels are EVENT playlists without EXT-X-ENDLIST (players poll for more).
+    """
+    base = os.path.dirname(os.path.abspath(playlist_path))
+
+    def relative(line: str, path: str) -> str:
+        return line.replace(path, os.path.relpath(path, base))
+
+    body, target = [], 1
+    for i, frag_dir in enumerate(fragment_dirs):
+        map_tag, entries = _read_media_playlist(frag_dir)
+        if i > 0:
+            body.append("#EXT-X-DISCONTINUITY")
+        if map_tag:
+            body.append(relative(map_tag, os.path.join(frag_dir, FRAGMENT_FILE)))
+        for duration, tags, path in entries:
+            body += tags
+            body.append(os.path.relpath(path, base))
+            target = max(target, math.ceil(duration))
+    lines = ["#EXTM3U", "#EXT-X-VERSION:7", f"#EXT-X-TARGETDURATION:{target}",
+             "#EXT-X-MEDIA-SEQUENCE:0", f"#EXT-X-PLAYLIST-TYPE:{'VOD' if complete else 'EVENT'}",
+             "#EXT-X-INDEPENDENT-SEGMENTS", *body]
+    if complete:
+        lines.append("#EXT-X-ENDLIST")
+
+    os.makedirs(base, exist_ok=True)
+    tmp_path = playlist_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, playlist_path)
+
+def fragment_path(frag_dir: str) -> str:
+    """The fragment as one playable fragmented MP4 (e.g. for st.video)."""
+    return os.path.join(frag_dir, FRAGMENT_FILE)
+
+def fragments_exist(fragments: List[Dict]) -> bool:
+    return all(os.path.exists(os.path.join(f["dir"], "index.m3u8")) for f in fragments)
+
+def prune_fragment_cache(cache_dir: str = HIGHLIGHT_CACHE_DIR, max_bytes: int = HIGHLIGHT_CACHE_BUDGET_BYTES,
+                         protect: Iterable[str] = ()) -> int:
+    """
+    Deletes least recently used fragments until the cache fits in max_bytes.
+    Fragment directories in protect (e.g. those of queued/running jobs, whose
+    playlists are being played and extended) are never deleted.
+    Reels that referenced a deleted fragment are re-rendered when requested again.
+    Returns: number of fragments deleted.
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+    protected = {os.path.realpath(p) for p in protect}
+    fragments = []
+    for sub in os.listdir(cache_dir):
+        sub_dir = os.path.join(cache_dir, sub)
+        if not os.path.isdir(sub_dir):
+            continue
+        for name in os.listdir(sub_dir):
+            path = os.path.join(sub_dir, name)
+            if name.endswith(".tmp") or not os.path.isdir(path):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            fragments.append((os.path.getmtime(path), size, path))
+    total = sum(size for _, size, _ in fragments)
+    pruned = 0
+    for _, size, path in sorted(fragments):
+        if total <= max_bytes:
+            break
+        if os.path.realpath(path) in protected:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        pruned += 1
+    return pruned
+
+def _touch(path: str):
+    # mtime doubles as the last-used time for prune_fragment_cache
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def _run_ffmpeg(args: List[str]):
+    subprocess.run(['ffmpeg', '-y', '-v', 'error', '-nostdin', *args],
+                   check=True, capture_output=True)
+
+def _render_moviepy(video_path: str, spans: List[Tuple[float, float]], output_path: str):
+    from moviepy.editor import VideoFileClip, concatenate_videoclips
+
     try:
         original_clip = VideoFileClip(video_path)
         clips = []
-        
-        for seg in segments:
-            start = seg['start_time']
-            end = seg['end_time']
+
+        for start, end in spans:
             # Ensure we don't go out of bounds
             if start < 0: start = 0
             if end > original_clip.duration: end = original_clip.duration
             if start >= end: continue
-            
+
             clip = original_clip.subclip(start, end)
             clips.append(clip)
-            
+
         if clips:
             final_clip = concatenate_videoclips(clips)
             final_clip.write_videofile(output_path, codec='libx264', audio_codec='aac')
@@ -35,7 +450,7 @@ def generate_highlight_video(video_path: str, segments: List[Dict], output_path:
         else:
             original_clip.close()
             return False
-            
+
     except Exception as e:
         print(f"Error generating video: {e}")
         return False
@@ -0,0 +1,188 @@
+import os
+import re
+import glob
+from array import array
+import xml.etree.ElementTree as ET
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, List, Optional, Tuple
+
+WORD_TAGS = ('w', 'word')
+SPEAKER_WORDS_RE = re.compile(r'^(?P<meeting>[^.]+)\.(?P<speaker>[A-Za-z0-9]+)\.words\.xml$')
+
+def _local(tag: str) -> str:
+    # Strip the namespace ({http://nite.sourceforge.net/}root -> root)
+    return tag.rsplit('}', 1)[-1]
+
+def _iter_elements(path: str, tags: Tuple[str, ...]) -> Iterator[ET.Element]:
+    """
+    Streams completed elements whose local tag is in tags. Each one is removed
+    from its actual parent once consumed (and other completed elements outside
+    a record right away), so memory stays bounded by the largest single record
+    at any nesting depth (<root><w/>.. as well as <root><transcript><segment>..).
+    """
+    stack = []  # open elements, root first
+    open_records = 0  # matching elements currently open; their children must survive
+    for event, elem in ET.iterparse(path, events=('start', 'end')):
+        matches = elem.tag in tags or _local(elem.tag) in tags
+        if event == 'start':
+            stack.append(elem)
+            open_records += matches
+            continue
+        stack.pop()
+        if matches:
+            open_records -= 1
+            yield elem
+        if stack and not open_records:
+            stack[-1].remove(elem)
+
+def read_words(path: str) -> Tuple[np.ndarray, np.ndarray, List[str], np.ndarray]:
+    """
+    Streams one NXT words file (<w starttime=.. endtime=..>word</w>, file order).
+    Untimed or empty words are skipped.
+    Returns: start (float32), end (float32), word strings and punct flags.
+    """
+    starts, ends, punct, texts = array('f'), array('f'), array('b'), []
+    for elem in _iter_elements(path, WORD_TAGS):
+        start, end, text = elem.get('starttime'), elem.get('endtime'), elem.text
+        if start is None or end is None or not text:
+            continue
+        starts.append(float(start))
+        ends.append(float(end))
+        punct.append(elem.get('punc') == 'true')
+        texts.append(text.strip())
+    return (np.frombuffer(starts, dtype=np.float32), np.frombuffer(ends, dtype=np.float32),
+            texts, np.frombuffer(punct, dtype=np.int8).astype(bool))
+
+def find_speaker_word_files(transcript_path: str) -> Optional[Dict[str, str]]:
+    """
+    For an NXT words file such as IS1001a.A.words.xml, returns every sibling
+    per-speaker words file of the same meeting ({'A': path, 'B': path, ...}).
+    Returns None for other transcript files.
+    """
+    match = SPEAKER_WORDS_RE.match(os.path.basename(transcript_path))
+    if not match:
+        return None
+    pattern = os.path.join(os.path.dirname(transcript_path), f"{match.group('meeting')}.*.words.xml")
+    files = {}
+    for path in sorted(glob.glob(pattern)):
+        m = SPEAKER_WORDS_RE.match(os.path.basename(path))
+        if m and m.group('meeting') == match.group('meeting'):
+            files[m.group('speaker')] = path
+    return files
+
+class AmiWords:
+    """
+    Word-level timings for a whole meeting in compact columnar arrays,
+    sorted by start time: start/end (float32), speaker (int16 code into speakers),
+    punct (bool) and the word strings.
+    """
+    def __init__(self, start: np.ndarray, end: np.ndarray, speaker: np.ndarray,
+                 speakers: List[str], text: List[str], punct: np.ndarray):
+        self.start = start
+        self.end = end
+        self.speaker = speaker
+        self.speakers = speakers
+        self.text = text
+        self.punct = punct
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    @classmethod
+    def from_files(cls, files_by_speaker: Dict[str, str]) -> "AmiWords":
+        """
+        Streams each per-speaker words file into compact arrays, then merges them
+        in time order (ties broken by speaker) with a single lexsort.
+        """
+        speakers = list(files_by_speaker.keys())
+        parts = [read_words(path) for path in files_by_speaker.values()]
+        start = np.concatenate([p[0] for p in parts]) if parts else np.zeros(0, dtype=np.float32)
+        end = np.concatenate([p[1] for p in parts]) if parts else np.zeros(0, dtype=np.float32)
+        punct = np.concatenate([p[3] for p in parts]) if parts else np.zeros(0, dtype=bool)
+        codes = np.repeat(np.arange(len(parts), dtype=np.int16), [len(p[0]) for p in parts])
+        texts = [t for p in parts for t in p[2]]
+
+        order = np.lexsort((codes, start))
+        return cls(start[order], end[order], codes[order], speakers,
+                   [texts[k] for k in order], punct[order])
+
+    def snap(self, starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Moves cut points off mid-word positions: a start inside a word moves back
+        to that word's start, an end inside a word moves forward to its end.
+        """
+        starts = np.asarray(starts, dtype=np.float64).copy()
+        ends = np.asarray(ends, dtype=np.float64).copy()
+        if len(self) == 0:
+            return starts, ends
+
+        i = np.searchsorted(self.start, starts, side='right') - 1
+        inside = (i >= 0) & (self.end[np.maximum(i, 0)] > starts)
+        starts[inside] = self.start[i[inside]]
+
+        j = np.searchsorted(self.start, ends, side='left') - 1
+        inside = (j >= 0) & (self.end[np.maximum(j, 0)] > ends)
+        ends[inside] = self.end[j[inside]]
+        return starts, ends
+
+    def to_transcript_df(self, max_gap: float = 1.0) -> pd.DataFrame:
+        """
+        Groups each speaker's words into utterances (split at pauses longer than
+        max_gap seconds) and returns them as transcript rows sorted by start time.
+        """
+        columns = ['start_time', 'end_time', 'speaker', 'text']
+        if len(self) == 0:
+            return pd.DataFrame(columns=columns)
+
+        # Per-speaker time order; stable so merged order is kept within a speaker
+        order = np.argsort(self.speaker, kind='stable')
+        spk, start, end = self.speaker[order], self.start[order], self.end[order]
+        new_utt = np.ones(len(order), dtype=bool)
+        new_utt[1:] = (spk[1:] != spk[:-1]) | (start[1:] - end[:-1] > max_gap)
+        bounds = np.append(np.flatnonzero(new_utt), len(order))
+
+        # Punctuation tokens attach to the previous word, everything else gets a space
+        punct = self.punct.tolist()
+        tokens = [self.text[k] if punct[k] else " " + self.text[k] for k in order.tolist()]
+        utt_end = np.maximum.reduceat(end, bounds[:-1])
+        rows = [
+            (float(start[a]), float(e), f"Speaker {self.speakers[spk[a]]}", "".join(tokens[a:b]).lstrip())
+            for a, b, e in zip(bounds[:-1], bounds[1:], utt_end)
+        ]
+        return pd.DataFrame(rows, columns=columns).sort_values('start_time', kind='stable').reset_index(drop=True)
+
+def parse_segment_transcript(path: str) -> Tuple[pd.DataFrame, AmiWords]:
+    """
+    Streams a single-file <segment><word/></segment> transcript (the sample/dummy format).
+    Returns: one transcript row per segment, plus word-level timings.
+    """
+    rows = []
+    starts, ends, punct, texts = array('f'), array('f'), array('b'), []
+    for segment in _iter_elements(path, ('segment',)):
+        words = [w for w in segment if _local(w.tag) in WORD_TAGS]
+        if words:
+            text = " ".join([w.text for w in words if w.text])
+            for w in words:
+                if w.text and w.get('starttime') is not None and w.get('endtime') is not None:
+                    starts.append(float(w.get('starttime')))
+                    ends.append(float(w.get('endtime')))
+                    punct.append(w.get('punc') == 'true')
+                    texts.append(w.text.strip())
+        else:
+            text = segment.text if segment.text else ""
+
+        if text:
+            rows.append({
+                "start_time": float(segment.get('starttime', 0)),
+                "end_time": float(segment.get('endtime', 0)),
+                "speaker": segment.get('participant', "Speaker 1"),
+                "text": text.strip()
+            })
+
+    start = np.frombuffer(starts, dtype=np.float32)
+    order = np.argsort(start, kind='stable')
+    words = AmiWords(start[order], np.frombuffer(ends, dtype=np.float32)[order],
+                     np.zeros(len(order), dtype=np.int16), ["1"], [texts[k] for k in order],
+                     np.frombuffer(punct, dtype=np.int8).astype(bool)[order])
+    return pd.DataFrame(rows), words
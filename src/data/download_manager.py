@@ -0,0 +1,212 @@
+import os
+import json
+import shutil
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import List, Dict, Optional
+
+import aiohttp
+
+class IntegrityError(Exception):
+    pass
+
+class DownloadTask:
+    def __init__(self, url: str, dest: Path, size: Optional[int] = None, sha256: Optional[str] = None,
+                 links: Optional[List[Path]] = None):
+        """
+        url: source URL
+        dest: final file path (a <dest>.part file holds partial data until verified)
+        size / sha256: optional expected size in bytes and hex digest
+        links: extra paths that should point at the same file once downloaded
+        """
+        self.url = url
+        self.dest = Path(dest)
+        self.size = size
+        self.sha256 = sha256
+        self.links = [Path(p) for p in (links or [])]
+
+def place_file(src: Path, dst: Path):
+    """
+    Makes dst refer to src's content without reading it into memory:
+    a hardlink when possible, otherwise a streamed copy. dst is swapped in atomically.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(dst.name + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class DownloadManager:
+    """
+    Concurrent downloader built on asyncio/aiohttp.
+    - at most `concurrency` transfers run at once
+    - partial files are resumed with HTTP Range requests, conditional on the
+      resource being unchanged (If-Range with the ETag/Last-Modified seen when the
+      part file was started, kept in <dest>.part.meta); a changed resource is
+      downloaded again from the start instead of being spliced onto old bytes
+    - failures are retried with exponential backoff
+    - size (expected or announced by the server) and optional sha256 are verified
+      before the file is moved into place with os.replace
+    """
+    def __init__(self, concurrency: int = 4, retries: int = 5, backoff: float = 1.0,
+                 chunk_size: int = 1 << 20, headers: Optional[Dict[str, str]] = None, timeout: float = 60.0):
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.chunk_size = chunk_size
+        self.headers = headers or {}
+        self.timeout = aiohttp.ClientTimeout(total=None, sock_read=timeout, sock_connect=timeout)
+
+    async def run(self, tasks: List[DownloadTask]) -> Dict[str, Optional[Exception]]:
+        """Downloads all tasks. Returns: url -> None on success, or the last error."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # Byte ranges must refer to the stored bytes, so ask for uncompressed transfers
+        headers = {"Accept-Encoding": "identity", **self.headers}
+        async with aiohttp.ClientSession(headers=headers, timeout=self.timeout) as session:
+            async def guarded(task):
+                async with semaphore:
+                    return await self._download(session, task)
+            errors = await asyncio.gather(*(guarded(t) for t in tasks))
+        return {t.url: e for t, e in zip(tasks, errors)}
+
+    def download_all(self, tasks: List[DownloadTask]) -> Dict[str, Optional[Exception]]:
+        return asyncio.run(self.run(tasks))
+
+    async def _download(self, session: aiohttp.ClientSession, task: DownloadTask) -> Optional[Exception]:
+        if task.dest.exists():
+            try:
+                await asyncio.to_thread(self._verify, task, task.dest, None)
+                print(f"Already downloaded {task.dest}")
+                self._place_links(task)
+                return None
+            except (IntegrityError, aiohttp.ClientPayloadError):
+                pass
+
+        task.dest.parent.mkdir(parents=True, exist_ok=True)
+        part = task.dest.with_name(task.dest.name + ".part")
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                delay = self.backoff * 2 ** (attempt - 1)
+                print(f"Retrying {task.url} in {delay:.1f}s ({error})")
+                await asyncio.sleep(delay)
+            try:
+                total = await self._fetch(session, task, part)
+                await asyncio.to_thread(self._verify, task, part, total)
+                os.replace(part, task.dest)
+                _meta_path(part).unlink(missing_ok=True)
+                self._place_links(task)
+                print(f"Saved to {task.dest}")
+                return None
+            except aiohttp.ClientResponseError as e:
+                error = e
+                if 400 <= e.status < 500 and e.status not in (408, 429):
+                    # Client errors (e.g. 404) will not fix themselves
+                    break
+            except IntegrityError as e:
+                # Corrupt data cannot be resumed; start over
+                error = e
+                part.unlink(missing_ok=True)
+                _meta_path(part).unlink(missing_ok=True)
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                error = e
+        print(f"Failed to download {task.url}: {error}")
+        return error
+
+    async def _fetch(self, session: aiohttp.ClientSession, task: DownloadTask, part: Path) -> Optional[int]:
+        """Streams the (remaining) body into part. Returns: total size announced by the server, if any."""
+        offset = part.stat().st_size if part.exists() else 0
+        validator = _read_validator(part) if offset else None
+        headers = {}
+        if offset and (validator or task.sha256):
+            # Without a validator only a sha256 would catch a changed resource, so resume only then
+            headers["Range"] = f"bytes={offset}-"
+            if validator:
+                headers["If-Range"] = validator
+
+        async with session.get(task.url, headers=headers) as resp:
+            if resp.status == 416 and "Range" in headers:
+                # Requested range starts at or past EOF: complete only if the sizes agree
+                # (Content-Range: bytes */<total>); a longer part file is from another version
+                content_range = resp.headers.get("Content-Range", "")
+                if content_range == f"bytes */{offset}":
+                    return offset
+                print(f"{task.url}: part file ({offset} bytes) doesn't match the resource "
+                      f"({content_range or 'size unknown'}); restarting")
+                part.unlink(missing_ok=True)
+                _meta_path(part).unlink(missing_ok=True)
+                restart = True
+            else:
+                restart = False
+                resp.raise_for_status()
+
+                if resp.status == 206 and "Range" in headers:
+                    if validator and _validator(resp) not in (None, validator):
+                        raise IntegrityError(f"{task.url}: resource changed while resuming")
+                    mode = "ab"
+                    content_range = resp.headers.get("Content-Range", "")
+                    total = int(content_range.rsplit("/", 1)[-1]) if "/" in content_range and not content_range.endswith("*") else None
+                else:
+                    # Fresh download, changed resource (If-Range failed) or Range ignored: restart from scratch
+                    mode, offset = "wb", 0
+                    total = resp.content_length
+                    _write_validator(part, task.url, _validator(resp))
+
+                print(f"Downloading {task.url}" + (f" (resuming at {offset} bytes)" if mode == "ab" else ""))
+                with open(part, mode) as f:
+                    async for chunk in resp.content.iter_chunked(self.chunk_size):
+                        f.write(chunk)
+                return total
+        if restart:
+            # Part file removed, so this request carries no Range header
+            return await self._fetch(session, task, part)
+
+    def _verify(self, task: DownloadTask, part: Path, total: Optional[int]):
+        size = part.stat().st_size
+        expected = task.size if task.size is not None else total
+        if expected is not None and size != expected:
+            if size > expected:
+                raise IntegrityError(f"{task.url}: got {size} bytes, expected {expected}")
+            # Short read (connection dropped): keep the part file and resume
+            raise aiohttp.ClientPayloadError(f"{task.url}: incomplete ({size}/{expected} bytes)")
+        if task.sha256 is not None and file_sha256(part) != task.sha256.lower():
+            raise IntegrityError(f"{task.url}: sha256 mismatch")
+
+    def _place_links(self, task: DownloadTask):
+        for link in task.links:
+            place_file(task.dest, link)
+            print(f"Linked {link} -> {task.dest}")
+
+def _meta_path(part: Path) -> Path:
+    return part.with_name(part.name + ".meta")
+
+def _validator(resp: aiohttp.ClientResponse) -> Optional[str]:
+    """Strong ETag, else Last-Modified: what If-Range may carry (weak ETags are not allowed there)."""
+    etag = resp.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return resp.headers.get("Last-Modified")
+
+def _read_validator(part: Path) -> Optional[str]:
+    try:
+        with open(_meta_path(part)) as f:
+            return json.load(f).get("validator")
+    except (OSError, ValueError):
+        return None
+
+def _write_validator(part: Path, url: str, validator: Optional[str]):
+    # Written before the body, so an interrupted download knows what it resumes
+    with open(_meta_path(part), "w") as f:
+        json.dump({"url": url, "validator": validator}, f)
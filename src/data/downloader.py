@@ -1,8 +1,8 @@
 import os
-import requests
 import zipfile
-import io
+from xml.sax.saxutils import escape
 from pathlib import Path
+from src.data.download_manager import DownloadManager, DownloadTask
 
 DATA_DIR = Path("data")
 QMSUM_URL = "https://github.com/Yale-LILY/QMSum/archive/refs/heads/main.zip"
@@ -13,15 +13,9 @@ QMSUM_URL = "https://github.com/Yale-LILY/QMSum/archive/refs/heads/main.zip"
 # We will download the annotations (transcripts) which are public.
 
 def download_file(url: str, dest_path: Path):
-    print(f"Downloading {url}...")
-    response = requests.get(url, stream=True)
-    if response.status_code == 200:
-        with open(dest_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        print(f"Saved to {dest_path}")
-    else:
-        print(f"Failed to download. Status: {response.status_code}")
+    result = DownloadManager().download_all([DownloadTask(url, dest_path)])
+    if result[url] is not None:
+        print(f"Failed to download. Error: {result[url]}")
 
 def setup_qmsum():
     print("\n--- Setting up QMSum Dataset ---")
@@ -43,31 +37,35 @@ def setup_qmsum():
     else:
         print("QMSum download failed.")
 
-def create_dummy_transcript(dest_path: Path, meeting_id: str):
-    content = f"""<?xml version="1.0" encoding="UTF-8"?>
-<nite:root xmlns:nite="http://nite.sourceforge.net/">
-    <transcript>
-        <segment nite:id="{meeting_id}.s1" starttime="0.0" endtime="10.0">
-            <word starttime="0.0" endtime="1.5">Hello</word>
-            <word starttime="1.6" endtime="3.0">everyone</word>
-            <word starttime="3.1" endtime="5.0">welcome</word>
-            <word starttime="5.1" endtime="6.0">to</word>
-            <word starttime="6.1" endtime="7.0">the</word>
-            <word starttime="7.1" endtime="10.0">meeting.</word>
-        </segment>
-        <segment nite:id="{meeting_id}.s2" starttime="10.5" endtime="20.0">
-            <word starttime="10.5" endtime="12.0">We</word>
-            <word starttime="12.1" endtime="13.0">need</word>
-            <word starttime="13.1" endtime="14.0">to</word>
-            <word starttime="14.1" endtime="16.0">discuss</word>
-            <word starttime="16.1" endtime="18.0">the</word>
-            <word starttime="18.1" endtime="20.0">project.</word>
-        </segment>
-    </transcript>
-</nite:root>"""
+# (segment start, segment end, [(word start, word end, word), ...])
+DUMMY_SEGMENTS = [
+    (0.0, 10.0, [(0.0, 1.5, "Hello"), (1.6, 3.0, "everyone"), (3.1, 5.0, "welcome"),
+                 (5.1, 6.0, "to"), (6.1, 7.0, "the"), (7.1, 10.0, "meeting.")]),
+    (10.5, 20.0, [(10.5, 12.0, "We"), (12.1, 13.0, "need"), (13.1, 14.0, "to"),
+                  (14.1, 16.0, "discuss"), (16.1, 18.0, "the"), (18.1, 20.0, "project.")]),
+]
+
+def create_dummy_transcript(dest_path: Path, meeting_id: str, segments=None, verbose: bool = True):
+    """
+    Writes an AMI-style <segment><word/></segment> transcript.
+    segments defaults to a two-segment placeholder; synthetic meetings
+    (e.g. src/pipeline/benchmark.py) pass their own.
+    """
+    segments = DUMMY_SEGMENTS if segments is None else segments
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<nite:root xmlns:nite="http://nite.sourceforge.net/">',
+             '    <transcript>']
+    for i, (start, end, words) in enumerate(segments, 1):
+        lines.append(f'        <segment nite:id="{meeting_id}.s{i}" starttime="{start}" endtime="{end}">')
+        for w_start, w_end, word in words:
+            lines.append(f'            <word starttime="{w_start}" endtime="{w_end}">{escape(word)}</word>')
+        lines.append('        </segment>')
+    lines += ['    </transcript>', '</nite:root>']
+
     with open(dest_path, "w") as f:
-        f.write(content)
-    print(f"Created dummy transcript at {dest_path}")
+        f.write("\n".join(lines))
+    if verbose:
+        print(f"Created dummy transcript at {dest_path}")
 
 def setup_ami_sample():
     print("\n--- Setting up AMI Meeting Corpus (Sample) ---")
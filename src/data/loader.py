@@ -1,6 +1,5 @@
 import os
 import cv2
-import librosa
 import numpy as np
 import pandas as pd
 from typing import List, Dict, Optional
@@ -10,6 +9,8 @@ class MeetingLoader:
         self.video_path = video_path
         self.transcript_path = transcript_path
         self.meeting_id = os.path.basename(video_path).split('.')[0]
+        self.words = None # Word-level timings (AmiWords), set when parsing AMI XML
+        self.transcript_key = None # Content key of the transcript, set by load_transcript(cache=True)
         
     def load_video_metadata(self) -> Dict:
         """Returns basic video metadata (fps, duration, resolution)."""
@@ -32,31 +33,195 @@ class MeetingLoader:
             "duration": duration
         }
 
-    def load_audio(self, sr: int = 16000):
-        """Loads audio from the video file using librosa."""
-        # Note: librosa can load audio directly from video files if ffmpeg is installed
+    def iter_frames(self, frame_indices: np.ndarray, short_side: Optional[int] = 232, seek_gap: Optional[int] = None):
+        """
+        Decodes only the requested frames (sorted, unique indices) and yields
+        (frame_index, RGB uint8 frame) one at a time, downscaled so that the
+        shorter side is at most short_side pixels.
+        Short forward gaps are skipped with grab() (no pixel conversion);
+        longer gaps seek directly.
+        """
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file: {self.video_path}")
+
+        if seek_gap is None:
+            # Seeking re-decodes from the previous keyframe, so it only pays off for larger jumps
+            seek_gap = 2 * max(int(cap.get(cv2.CAP_PROP_FPS)), 1)
+
+        pos = 0 # Index of the next frame the decoder will return
+        try:
+            for target in frame_indices:
+                target = int(target)
+                if target < pos or target - pos > seek_gap:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                    pos = target
+                while pos < target:
+                    if not cap.grab():
+                        return
+                    pos += 1
+
+                ok, frame = cap.read()
+                if not ok:
+                    return
+                pos += 1
+
+                h, w = frame.shape[:2]
+                if short_side and min(h, w) > short_side:
+                    scale = short_side / min(h, w)
+                    frame = cv2.resize(frame, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+                yield target, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        finally:
+            cap.release()
+
+    def load_audio(self, sr: int = 16000, cache: bool = False):
+        """
+        Decodes audio from the video file as 16 kHz (by default) mono float32 PCM.
+        Decoding is streamed from ffmpeg in fixed-size blocks. With cache=True the
+        PCM is written once to a .npy next to the meeting and returned memory-mapped
+        on later calls (zero-copy).
+        """
         try:
-            y, sr = librosa.load(self.video_path, sr=sr)
+            if cache:
+                return self._load_cached_audio(sr), sr
+            blocks = list(self.iter_audio_blocks(sr=sr))
+            y = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
             return y, sr
         except Exception as e:
             print(f"Error loading audio: {e}")
             return None, None
 
-    def load_transcript(self) -> pd.DataFrame:
+    def audio_cache_path(self, sr: int = 16000) -> str:
+        return f"{os.path.splitext(self.video_path)[0]}.{sr}hz.npy"
+
+    def iter_audio_blocks(self, sr: int = 16000, block_sec: float = 30.0,
+                          start: float = 0.0, end: Optional[float] = None):
+        """
+        Yields mono float32 PCM blocks of block_sec seconds (the last one may be shorter)
+        for [start, end), piped straight from ffmpeg without decoding the whole file.
+        Raises RuntimeError (with ffmpeg's stderr) if decoding fails, e.g. for a
+        missing file, a file without audio or a corrupt container.
+        """
+        import ffmpeg
+        import threading
+
+        if end is not None and end - start < 1.0 / sr:
+            # ffmpeg reads -t 0 (or a duration below its time base) as "until the end"
+            return
+        input_kwargs = {}
+        if start > 0:
+            # -ss before -i seeks in the container instead of decoding up to start
+            # Fixed-point: ffmpeg rejects exponent notation such as str(3e-05)
+            input_kwargs['ss'] = f"{start:.6f}"
+        if end is not None:
+            input_kwargs['t'] = f"{max(end - start, 0.0):.6f}"
+
+        process = (
+            ffmpeg
+            .input(self.video_path, **input_kwargs)
+            .output('pipe:', format='f32le', acodec='pcm_f32le', ac=1, ar=sr)
+            .global_args('-loglevel', 'error', '-nostdin')
+            .run_async(pipe_stdout=True, pipe_stderr=True)
+        )
+        # Drained on the side so a chatty ffmpeg can't block on a full stderr pipe
+        stderr = []
+        drain = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+        drain.start()
+        block_bytes = max(int(block_sec * sr), 1) * 4
+        finished = False
+        try:
+            while True:
+                buf = process.stdout.read(block_bytes)
+                if not buf:
+                    break
+                # Drop a trailing partial sample, if any
+                yield np.frombuffer(buf[:len(buf) - len(buf) % 4], dtype=np.float32)
+            finished = True
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            drain.join()
+            process.stderr.close()
+        # Only a run that reached EOF is checked; a consumer stopping early kills ffmpeg on purpose
+        if finished and process.returncode != 0:
+            message = b"".join(stderr).decode("utf-8", "replace").strip()
+            raise RuntimeError(f"ffmpeg failed to decode audio from {self.video_path} "
+                               f"(exit code {process.returncode}): {message}")
+
+    def load_audio_range(self, start: float, end: float, sr: int = 16000) -> np.ndarray:
+        """
+        Random access to the PCM for [start, end) seconds.
+        Slices the cached .npy if present, otherwise decodes only that range.
+        """
+        cache_path = self.audio_cache_path(sr)
+        if os.path.exists(cache_path):
+            y = np.load(cache_path, mmap_mode='r')
+            return y[int(start * sr):int(end * sr)]
+        blocks = list(self.iter_audio_blocks(sr=sr, start=start, end=end))
+        return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+
+    def _load_cached_audio(self, sr: int) -> np.ndarray:
+        cache_path = self.audio_cache_path(sr)
+        if not os.path.exists(cache_path):
+            tmp_path = cache_path + ".tmp"
+            header = {'descr': '<f4', 'fortran_order': False, 'shape': (0,)}
+            try:
+                with open(tmp_path, 'wb') as f:
+                    # Total length is unknown until ffmpeg finishes, so write a
+                    # placeholder header, stream blocks, then patch the shape in.
+                    np.lib.format.write_array_header_1_0(f, header)
+                    data_offset = f.tell()
+                    n_samples = 0
+                    for block in self.iter_audio_blocks(sr=sr):
+                        f.write(block.tobytes())
+                        n_samples += len(block)
+                    f.seek(0)
+                    np.lib.format.write_array_header_1_0(f, dict(header, shape=(n_samples,)))
+                    if f.tell() != data_offset:
+                        raise RuntimeError("Unexpected .npy header size while caching audio")
+            except BaseException:
+                # A failed decode must not become a cached (empty or truncated) track
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            os.replace(tmp_path, cache_path)
+        return np.load(cache_path, mmap_mode='r')
+
+    def load_transcript(self, cache: bool = False, cache_dir: Optional[str] = None) -> pd.DataFrame:
         """
-        Parses the transcript file. 
-        Assumes a simple CSV/JSON format for now, or VTT parsing logic can be added.
+        Parses the transcript file (CSV/JSON, AMI XML or VTT/SRT subtitles).
         Expected columns: ['start_time', 'end_time', 'speaker', 'text']
+        With cache=True the parsed transcript is stored once in a canonical columnar
+        form (float32 times, categorical speaker) keyed by the file's content hash,
+        and later loads of the same content are memory-mapped instead of re-parsed.
         """
-        if self.transcript_path.endswith('.csv'):
+        if not cache:
+            return self._parse_transcript()
+
+        from src.data.transcript_cache import TranscriptCache, TRANSCRIPT_CACHE_DIR, transcript_key
+        store = TranscriptCache(cache_dir or TRANSCRIPT_CACHE_DIR)
+        key = self.transcript_key = transcript_key(self.transcript_path)
+        cached = store.load(key)
+        if cached is None:
+            cached = store.save(key, self._parse_transcript(), self.words)
+        df, self.words = cached
+        return df
+
+    def _parse_transcript(self) -> pd.DataFrame:
+        path = self.transcript_path.lower()
+        if path.endswith('.csv'):
             df = pd.read_csv(self.transcript_path)
-        elif self.transcript_path.endswith('.json'):
+        elif path.endswith('.json'):
             df = pd.read_json(self.transcript_path)
-        elif self.transcript_path.endswith('.xml'):
+        elif path.endswith('.xml'):
             return self._parse_ami_xml()
+        elif path.endswith(('.vtt', '.srt')):
+            from src.data.subtitles import parse_subtitles
+            return parse_subtitles(self.transcript_path)
         else:
-            # Placeholder for VTT/SRT parsing
-            raise NotImplementedError("Only CSV/JSON/XML transcripts supported for prototype.")
+            raise NotImplementedError("Only CSV/JSON/XML/VTT/SRT transcripts are supported.")
             
         required_cols = {'start_time', 'end_time', 'speaker', 'text'}
         if not required_cols.issubset(df.columns):
@@ -66,76 +231,148 @@ class MeetingLoader:
 
     def _parse_ami_xml(self) -> pd.DataFrame:
         """
-        Parses AMI Corpus XML transcript format.
+        Parses AMI Corpus XML transcript format with a streaming (iterparse) reader.
+        For an NXT per-speaker words file (e.g. IS1001a.A.words.xml), all speakers'
+        words files of the meeting are merged in time order and grouped into
+        utterances. Single-file <segment><word/></segment> transcripts give one row
+        per segment. Word-level timings are kept in self.words for snapping cuts.
         """
-        import xml.etree.ElementTree as ET
-        
-        tree = ET.parse(self.transcript_path)
-        root = tree.getroot()
-        
-        # AMI XML structure: <segment><word>...</word></segment>
-        # We want to group words into segments or just use the segments if they have text.
-        # The dummy transcript I created has words inside segments.
-        
-        rows = []
-        # Namespace handling might be needed if nite:id is used, but usually findall works with tags
-        # Let's try to iterate segments
-        
-        # Find all 'segment' tags (ignoring namespace for simplicity if possible, or handling it)
-        # The dummy transcript uses <segment> and <word>
-        
-        for segment in root.findall('.//segment'):
-            # Get timing from segment or first/last word
-            start = float(segment.get('starttime', 0))
-            end = float(segment.get('endtime', 0))
-            
-            # Collect text from words
-            words = segment.findall('word')
-            if words:
-                text = " ".join([w.text for w in words if w.text])
-            else:
-                text = segment.text if segment.text else ""
-                
-            if text:
-                rows.append({
-                    "start_time": start,
-                    "end_time": end,
-                    "speaker": "Speaker 1", # AMI XMLs are usually per-speaker, but for this sample we assume single file
-                    "text": text.strip()
-                })
-                
-        return pd.DataFrame(rows)
+        from src.data.ami import AmiWords, find_speaker_word_files, parse_segment_transcript
+
+        word_files = find_speaker_word_files(self.transcript_path)
+        if word_files:
+            self.words = AmiWords.from_files(word_files)
+            return self.words.to_transcript_df()
+
+        df, self.words = parse_segment_transcript(self.transcript_path)
+        return df
+
+class SegmentTable:
+    """
+    Columnar container for meeting segments.
+    Transcript rows are stored as CSR offsets (row_ptr/row_index) into the
+    source transcript_df instead of per-segment record copies.
+    """
+    def __init__(self, start_time: np.ndarray, end_time: np.ndarray, text: List[str],
+                 row_ptr: np.ndarray, row_index: np.ndarray, transcript_df: pd.DataFrame):
+        self.start_time = start_time
+        self.end_time = end_time
+        self.text = text
+        self.row_ptr = row_ptr
+        self.row_index = row_index
+        self.transcript_df = transcript_df
+
+    def __len__(self) -> int:
+        return len(self.start_time)
+
+    def row_positions(self, i: int) -> np.ndarray:
+        """Positional indices (iloc) of the transcript lines overlapping segment i."""
+        return self.row_index[self.row_ptr[i]:self.row_ptr[i + 1]]
+
+    def transcript_rows(self, i: int) -> pd.DataFrame:
+        """Transcript lines overlapping segment i (materialized on demand)."""
+        return self.transcript_df.iloc[self.row_positions(i)]
+
+    def to_records(self, indices: Optional[np.ndarray] = None) -> List[Dict]:
+        """Lightweight dicts (start_time, end_time, text) for the given segments."""
+        if indices is None:
+            indices = np.arange(len(self))
+        return [
+            {
+                "start_time": float(self.start_time[i]),
+                "end_time": float(self.end_time[i]),
+                "text": self.text[i]
+            }
+            for i in indices
+        ]
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "text": self.text
+        })
 
 class SegmentGenerator:
     def __init__(self, window_size_sec: int = 30, step_size_sec: int = 15):
         self.window_size = window_size_sec
         self.step_size = step_size_sec
 
-    def segment_meeting(self, duration: float, transcript_df: pd.DataFrame) -> List[Dict]:
+    def segment_meeting(self, duration: float, transcript_df: pd.DataFrame) -> SegmentTable:
         """
-        Creates fixed-length segments and maps transcript lines to them.
+        Creates fixed-length (possibly overlapping) segments and maps transcript lines to them.
         """
-        segments = []
-        current_time = 0.0
-        
-        while current_time < duration:
-            end_time = min(current_time + self.window_size, duration)
-            
-            # Find transcript lines that overlap with this window
-            # Overlap logic: (StartA <= EndB) and (EndA >= StartB)
-            mask = (transcript_df['start_time'] <= end_time) & (transcript_df['end_time'] >= current_time)
-            segment_transcript = transcript_df[mask]
-            
+        if duration > 0:
+            win_starts = np.arange(0.0, duration, self.step_size, dtype=np.float64)
+        else:
+            win_starts = np.empty(0, dtype=np.float64)
+        win_ends = np.minimum(win_starts + self.window_size, duration)
+        return self.segment_windows(win_starts, win_ends, transcript_df)
+
+    def segment_by_sentences(self, transcript_df: pd.DataFrame) -> SegmentTable:
+        """
+        Creates non-overlapping segments that close on a sentence boundary
+        (line ending in . ? or !) once they reach window_size seconds.
+        """
+        starts = transcript_df['start_time'].to_numpy(dtype=np.float64)
+        ends = transcript_df['end_time'].to_numpy(dtype=np.float64)
+        texts = transcript_df['text'].astype(str).str.rstrip()
+        is_sentence_end = texts.str.endswith(('.', '?', '!')).to_numpy()
+        order = np.argsort(starts, kind='stable')
+
+        win_starts, win_ends = [], []
+        cur_start, cur_end = None, None
+        for pos in order:
+            if cur_start is None:
+                cur_start, cur_end = starts[pos], ends[pos]
+            cur_end = max(cur_end, ends[pos])
+            if is_sentence_end[pos] and cur_end - cur_start >= self.window_size:
+                win_starts.append(cur_start)
+                win_ends.append(cur_end)
+                cur_start = None
+        if cur_start is not None:
+            win_starts.append(cur_start)
+            win_ends.append(cur_end)
+
+        return self.segment_windows(np.asarray(win_starts, dtype=np.float64),
+                                    np.asarray(win_ends, dtype=np.float64), transcript_df)
+
+    def segment_windows(self, win_starts: np.ndarray, win_ends: np.ndarray,
+                        transcript_df: pd.DataFrame) -> SegmentTable:
+        """
+        Maps transcript lines to arbitrary [start, end] windows in a single sweep.
+        Overlap logic: (line_start <= win_end) and (line_end >= win_start).
+
+        Lines are sorted by start time; the running max of their end times is
+        monotone, so for each window the candidate lines form a contiguous range
+        [lo, hi) found with searchsorted. Only that range is filtered.
+        """
+        line_starts = transcript_df['start_time'].to_numpy(dtype=np.float64)
+        line_ends = transcript_df['end_time'].to_numpy(dtype=np.float64)
+        line_texts = transcript_df['text'].astype(str).to_numpy()
+
+        order = np.argsort(line_starts, kind='stable')
+        sorted_starts = line_starts[order]
+        sorted_ends = line_ends[order]
+        running_max_end = np.maximum.accumulate(sorted_ends) if len(order) else sorted_ends
+
+        # Candidate range per window
+        hi = np.searchsorted(sorted_starts, win_ends, side='right')
+        lo = np.searchsorted(running_max_end, win_starts, side='left')
+
+        texts = []
+        row_ptr = np.zeros(len(win_starts) + 1, dtype=np.int64)
+        row_chunks = []
+        for i in range(len(win_starts)):
+            if lo[i] < hi[i]:
+                cand = order[lo[i]:hi[i]]
+                hits = np.sort(cand[line_ends[cand] >= win_starts[i]])
+            else:
+                hits = order[:0]
+            row_chunks.append(hits)
+            row_ptr[i + 1] = row_ptr[i] + len(hits)
             # Concatenate text
-            text_content = " ".join(segment_transcript['text'].astype(str).tolist())
-            
-            segments.append({
-                "start_time": current_time,
-                "end_time": end_time,
-                "text": text_content,
-                "transcript_rows": segment_transcript.to_dict('records')
-            })
-            
-            current_time += self.step_size
-            
-        return segments
+            texts.append(" ".join(line_texts[hits]))
+
+        row_index = np.concatenate(row_chunks) if row_chunks else np.empty(0, dtype=np.int64)
+        return SegmentTable(win_starts, win_ends, texts, row_ptr, row_index, transcript_df)
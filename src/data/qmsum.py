@@ -0,0 +1,120 @@
+import os
+import json
+import glob
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Tuple
+
+from src.data.loader import SegmentGenerator, SegmentTable
+
+QMSUM_DIR = "data/qmsum/QMSum-main/data/ALL"
+
+def load_split(split_dir: str) -> List[Tuple[str, Dict]]:
+    """Returns (meeting_id, QMSum meeting dict) for every meeting JSON in a split directory."""
+    meetings = []
+    for path in sorted(glob.glob(os.path.join(split_dir, "*.json"))):
+        with open(path) as f:
+            meetings.append((os.path.basename(path).split('.')[0], json.load(f)))
+    return meetings
+
+def meeting_transcript_df(meeting: Dict) -> pd.DataFrame:
+    """
+    QMSum transcripts have no timestamps, so turn i is placed at [i, i + 0.5]:
+    SegmentGenerator windows are then measured in turns instead of seconds.
+    """
+    turns = meeting['meeting_transcripts']
+    starts = np.arange(len(turns), dtype=np.float64)
+    return pd.DataFrame({
+        "start_time": starts,
+        "end_time": starts + 0.5,
+        "speaker": [t['speaker'] for t in turns],
+        "text": [t['content'] for t in turns]
+    })
+
+def role_queries(meeting: Dict) -> List[Tuple[str, List[List[str]]]]:
+    """
+    Turns QMSum annotations into role-like queries with their relevant turn spans:
+    specific queries are used as-is, topics become "Interested in <topic>".
+    General queries ("Summarize the meeting") have no spans and are skipped.
+    """
+    queries = []
+    for q in meeting.get('specific_query_list', []):
+        queries.append((q['query'], q['relevant_text_span']))
+    for t in meeting.get('topic_list', []):
+        queries.append((f"Interested in {t['topic']}", t['relevant_text_span']))
+    return queries
+
+def relevance_labels(segments: SegmentTable, n_turns: int, spans: List[List[str]]) -> np.ndarray:
+    """
+    Fraction of each segment's turns that fall inside the relevant spans (inclusive turn indices).
+    Returns: float32 array of shape (N_segments,)
+    """
+    relevant = np.zeros(n_turns + 1, dtype=np.int64)
+    for start, end in spans:
+        start, end = int(start), min(int(end), n_turns - 1)
+        if start <= end:
+            relevant[start] += 1
+            relevant[end + 1] -= 1
+    relevant = np.cumsum(relevant[:-1]) > 0
+
+    # Per-segment sums over the CSR row index via prefix sums
+    rel_cs = np.concatenate([[0], np.cumsum(relevant[segments.row_index])])
+    counts = np.diff(segments.row_ptr)
+    hits = rel_cs[segments.row_ptr[1:]] - rel_cs[segments.row_ptr[:-1]]
+    return np.divide(hits, counts, out=np.zeros(len(counts)), where=counts > 0).astype(np.float32)
+
+def build_cache(split_dir: str, cache_dir: str, text_extractor, window_turns: int = 20,
+                step_turns: int = 10, batch_size: int = 1024) -> str:
+    """
+    Segments every QMSum meeting in split_dir, labels segments per query and embeds
+    all segment and query texts once. Writes memory-mappable arrays to cache_dir:
+        segment_emb.npy (S, D), query_emb.npy (Q, D),
+        pair_query.npy / pair_segment.npy (P,) int32, pair_label.npy (P,) float32,
+        meta.json (per-query meeting id and segment range; written last as the completion marker).
+    Does nothing if the cache is already complete.
+    """
+    meta_path = os.path.join(cache_dir, "meta.json")
+    if os.path.exists(meta_path):
+        return cache_dir
+    os.makedirs(cache_dir, exist_ok=True)
+
+    segmenter = SegmentGenerator(window_size_sec=window_turns, step_size_sec=step_turns)
+    seg_texts, query_texts, query_meta = [], [], []
+    pair_query, pair_segment, pair_label = [], [], []
+
+    for meeting_id, meeting in load_split(split_dir):
+        transcript_df = meeting_transcript_df(meeting)
+        n_turns = len(transcript_df)
+        segments = segmenter.segment_meeting(float(n_turns), transcript_df)
+        seg_offset = len(seg_texts)
+        seg_texts.extend(segments.text)
+
+        for query, spans in role_queries(meeting):
+            q = len(query_texts)
+            query_texts.append(query)
+            query_meta.append({"meeting_id": meeting_id, "query": query,
+                               "segments": [seg_offset, seg_offset + len(segments)]})
+            pair_query.append(np.full(len(segments), q, dtype=np.int32))
+            pair_segment.append(np.arange(seg_offset, seg_offset + len(segments), dtype=np.int32))
+            pair_label.append(relevance_labels(segments, n_turns, spans))
+
+    _embed_to_npy(text_extractor, seg_texts, os.path.join(cache_dir, "segment_emb.npy"), batch_size)
+    _embed_to_npy(text_extractor, query_texts, os.path.join(cache_dir, "query_emb.npy"), batch_size)
+    np.save(os.path.join(cache_dir, "pair_query.npy"), np.concatenate(pair_query))
+    np.save(os.path.join(cache_dir, "pair_segment.npy"), np.concatenate(pair_segment))
+    np.save(os.path.join(cache_dir, "pair_label.npy"), np.concatenate(pair_label))
+
+    with open(meta_path, "w") as f:
+        json.dump({"split_dir": split_dir, "window_turns": window_turns, "step_turns": step_turns,
+                   "queries": query_meta}, f)
+    print(f"Cached {len(seg_texts)} segments, {len(query_texts)} queries from {split_dir}")
+    return cache_dir
+
+def _embed_to_npy(text_extractor, texts: List[str], path: str, batch_size: int):
+    """Embeds texts in batches straight into a .npy memmap, so memory stays bounded."""
+    dim = text_extractor.get_embedding_dim()
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(len(texts), dim))
+    for start in range(0, len(texts), batch_size):
+        out[start:start + batch_size] = text_extractor.extract(texts[start:start + batch_size])
+    out.flush()
+    del out
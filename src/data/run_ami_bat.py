@@ -1,9 +1,9 @@
 import re
 import os
-import requests
 from pathlib import Path
+from src.data.download_manager import DownloadManager, DownloadTask
 
-def run_bat_downloads():
+def run_bat_downloads(concurrency: int = 4):
     bat_path = Path("data/ami_sample/amiBuild-17834-Sat-Nov-22-2025.wget.bat")
     base_dir = Path("data/ami_sample")
     
@@ -24,6 +24,7 @@ def run_bat_downloads():
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
     }
 
+    tasks = []
     for output_dir, url in matches:
         filename = url.split("/")[-1]
         
@@ -34,28 +35,18 @@ def run_bat_downloads():
         else:
             target_dir = base_dir
             
-        target_dir.mkdir(parents=True, exist_ok=True)
-        target_file = target_dir / filename
-        
-        print(f"Downloading {filename}...")
-        try:
-            response = requests.get(url, headers=headers, stream=True)
-            response.raise_for_status()
-            
-            with open(target_file, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            print(f"Saved to {target_file}")
-            
-            # Special handling for the main video file for the prototype
-            if filename == "IS1001a.PreferredOverview.avi":
-                final_dest = base_dir / "IS1001a.mp4"
-                with open(final_dest, "wb") as f_out, open(target_file, "rb") as f_in:
-                    f_out.write(f_in.read())
-                print(f"Copied to {final_dest} for prototype.")
-                
-        except Exception as e:
-            print(f"Failed to download {url}: {e}")
+        links = []
+        # Special handling for the main video file for the prototype:
+        # expose it as IS1001a.mp4 via a hardlink instead of copying it
+        if filename == "IS1001a.PreferredOverview.avi":
+            links.append(base_dir / "IS1001a.mp4")
+        tasks.append(DownloadTask(url, target_dir / filename, links=links))
+
+    results = DownloadManager(concurrency=concurrency, headers=headers).download_all(tasks)
+    failed = [url for url, error in results.items() if error is not None]
+    print(f"Downloaded {len(results) - len(failed)}/{len(results)} files.")
+    for url in failed:
+        print(f"Failed: {url}")
 
 if __name__ == "__main__":
     run_bat_downloads()
@@ -0,0 +1,48 @@
+import re
+import pandas as pd
+
+TIMESTAMP_RE = re.compile(
+    r'(?P<start>(?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})\s*-->\s*(?P<end>(?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})'
+)
+VOICE_RE = re.compile(r'<v(?:\.[^\s>]+)*\s+([^>]+)>')
+TAG_RE = re.compile(r'<[^>]+>')
+
+def parse_timestamp(value: str) -> float:
+    """'01:02:03.450' / '02:03,450' -> seconds"""
+    parts = value.replace(',', '.').split(':')
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+def parse_subtitles(path: str, default_speaker: str = "Speaker 1") -> pd.DataFrame:
+    """
+    Parses a WebVTT or SRT file into transcript rows, one per cue.
+    Speakers come from WebVTT voice tags (<v Alice>...), otherwise default_speaker.
+    Cue numbers, NOTE/STYLE blocks and formatting tags are ignored.
+    Returns: DataFrame with ['start_time', 'end_time', 'speaker', 'text']
+    """
+    with open(path, encoding='utf-8-sig') as f:
+        content = f.read()
+
+    rows = []
+    for block in re.split(r'\n\s*\n', content.replace('\r\n', '\n')):
+        lines = block.strip().split('\n')
+        for i, line in enumerate(lines):
+            match = TIMESTAMP_RE.search(line)
+            if match:
+                break
+        else:
+            continue
+
+        cue = "\n".join(lines[i + 1:])
+        voice = VOICE_RE.search(cue)
+        text = " ".join(TAG_RE.sub('', cue).split())
+        if text:
+            rows.append({
+                "start_time": parse_timestamp(match.group('start')),
+                "end_time": parse_timestamp(match.group('end')),
+                "speaker": voice.group(1).strip() if voice else default_speaker,
+                "text": text
+            })
+    return pd.DataFrame(rows, columns=['start_time', 'end_time', 'speaker', 'text'])
@@ -0,0 +1,182 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.data.ami import AmiWords
+
+TRANSCRIPT_CACHE_DIR = "data/cache/transcripts"
+TRANSCRIPT_CACHE_BUDGET_BYTES = 1 * 2**30
+# Bump when parsing or the stored layout changes, so old entries are not reused
+FORMAT_VERSION = 1
+COLUMNS = ['start_time', 'end_time', 'speaker', 'text']
+
+def transcript_key(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Content hash of a transcript file. The extension is part of the key since it selects the parser.
+    An AMI per-speaker words file is parsed together with its siblings (see find_speaker_word_files),
+    so every speaker's label and file content go into the key.
+    """
+    from src.data.ami import find_speaker_word_files
+
+    digest = hashlib.sha256()
+    word_files = find_speaker_word_files(path)
+    for speaker, file_path in sorted(word_files.items()) if word_files else [(None, path)]:
+        if speaker is not None:
+            digest.update(f"\x00{speaker}\x00".encode("utf-8"))
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    return f"{digest.hexdigest()}.{ext}.v{FORMAT_VERSION}"
+
+def _write_strings(path: str, texts):
+    # NUL-separated UTF-8, so loading is a single decode + split
+    with open(path, "wb") as f:
+        f.write("\x00".join(t.replace("\x00", "") for t in texts).encode("utf-8"))
+
+def _read_strings(path: str, n: int):
+    with open(path, "rb") as f:
+        data = f.read()
+    return data.decode("utf-8").split("\x00") if n else []
+
+class TranscriptCache:
+    """
+    Canonical columnar copies of parsed transcripts, keyed by file content hash.
+    Each entry is a directory:
+        start_time.npy / end_time.npy (float32), speaker.npy (int16 category codes),
+        text.bin (NUL-separated UTF-8), meta.json (speaker categories, row count),
+        and for AMI XML the word timings (words_*.npy, words_text.bin).
+    meta.json is written last and the directory is moved into place atomically,
+    so a present entry is always complete. Arrays are loaded memory-mapped.
+    Least recently used entries are deleted once the cache exceeds max_bytes.
+    """
+    def __init__(self, cache_dir: str = TRANSCRIPT_CACHE_DIR, max_bytes: int = TRANSCRIPT_CACHE_BUDGET_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self.entry_dir(key), "meta.json"))
+
+    def load(self, key: str) -> Optional[Tuple[pd.DataFrame, Optional["AmiWords"]]]:
+        """Returns: (transcript_df, word timings or None), or None if the key is not cached."""
+        entry = self.entry_dir(key)
+        if not os.path.isdir(entry):
+            return None
+        try:
+            loaded = _read_entry(entry)
+        except (OSError, ValueError, KeyError) as e:
+            # Corrupt or half-pruned entry: drop it so the next save can rewrite it, and treat as a miss
+            print(f"Discarding unreadable transcript cache entry {key}: {e}")
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+        _touch(entry)
+        return loaded
+
+    def save(self, key: str, df: pd.DataFrame, words=None) -> Tuple[pd.DataFrame, Optional["AmiWords"]]:
+        """
+        Stores a parsed transcript in canonical form.
+        Returns: the cached (memory-mapped) copy, so first and later loads see identical data.
+        """
+        entry = self.entry_dir(key)
+        tmp = f"{entry}.tmp{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        speaker = pd.Categorical(df['speaker'].astype(str))
+        np.save(os.path.join(tmp, "start_time.npy"), df['start_time'].to_numpy(dtype=np.float32))
+        np.save(os.path.join(tmp, "end_time.npy"), df['end_time'].to_numpy(dtype=np.float32))
+        np.save(os.path.join(tmp, "speaker.npy"), speaker.codes.astype(np.int16))
+        _write_strings(os.path.join(tmp, "text.bin"), df['text'].fillna("").astype(str))
+
+        meta = {"version": FORMAT_VERSION, "n_rows": len(df),
+                "speakers": [str(c) for c in speaker.categories], "words": None}
+        if words is not None:
+            np.save(os.path.join(tmp, "words_start.npy"), np.asarray(words.start, dtype=np.float32))
+            np.save(os.path.join(tmp, "words_end.npy"), np.asarray(words.end, dtype=np.float32))
+            np.save(os.path.join(tmp, "words_speaker.npy"), np.asarray(words.speaker, dtype=np.int16))
+            np.save(os.path.join(tmp, "words_punct.npy"), np.asarray(words.punct, dtype=bool))
+            _write_strings(os.path.join(tmp, "words_text.bin"), words.text)
+            meta["words"] = {"speakers": list(words.speakers), "n_words": len(words)}
+
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            # Another process cached the same transcript first
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.prune(keep=key)
+        cached = self.load(key)
+        return cached if cached is not None else (df, words)
+
+    def prune(self, keep: Optional[str] = None) -> int:
+        """
+        Deletes least recently used entries (other than keep) until the cache fits in max_bytes.
+        Pruned transcripts are simply parsed again on their next load.
+        Returns: number of entries deleted.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry = self.entry_dir(key)
+            if ".tmp" in key or key == keep or not os.path.isdir(entry):
+                continue
+            try:
+                size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+                entries.append((os.path.getmtime(entry), size, entry))
+            except OSError:
+                continue
+        kept = self.entry_dir(keep) if keep else None
+        total = sum(size for _, size, _ in entries)
+        if kept and os.path.isdir(kept):
+            total += sum(os.path.getsize(os.path.join(kept, f)) for f in os.listdir(kept))
+        pruned = 0
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            pruned += 1
+        return pruned
+
+def _read_entry(entry: str) -> Tuple[pd.DataFrame, Optional["AmiWords"]]:
+    with open(os.path.join(entry, "meta.json")) as f:
+        meta = json.load(f)
+
+    def arr(name):
+        return np.load(os.path.join(entry, f"{name}.npy"), mmap_mode='r')
+
+    n = meta["n_rows"]
+    df = pd.DataFrame({
+        "start_time": arr("start_time"),
+        "end_time": arr("end_time"),
+        "speaker": pd.Categorical.from_codes(arr("speaker"), categories=meta["speakers"]),
+        "text": _read_strings(os.path.join(entry, "text.bin"), n)
+    }, columns=COLUMNS)
+
+    words = None
+    if meta.get("words") is not None:
+        from src.data.ami import AmiWords
+        w = meta["words"]
+        words = AmiWords(arr("words_start"), arr("words_end"), arr("words_speaker"), w["speakers"],
+                         _read_strings(os.path.join(entry, "words_text.bin"), w["n_words"]),
+                         arr("words_punct"))
+    return df, words
+
+def _touch(path: str):
+    # mtime doubles as the last-used time for TranscriptCache.prune
+    try:
+        os.utime(path)
+    except OSError:
+        pass
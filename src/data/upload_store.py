@@ -0,0 +1,132 @@
+import os
+import time
+import hashlib
+import threading
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+UPLOAD_DIR = "data/uploads"
+UPLOAD_BUDGET_BYTES = 20 * 2**30
+
+class UploadStore:
+    """
+    Content-addressed store for uploaded meeting files.
+    Uploads are streamed in chunks (never read whole into memory) to
+    objects/<aa>/<sha256><suffix>, and content that is already stored is not
+    written again. Stored files are opened in place by MeetingLoader; files
+    derived from an object (e.g. <sha256>.16000hz.npy audio caches) live next
+    to it and are collected together with it.
+    """
+    def __init__(self, root: str = UPLOAD_DIR, max_bytes: int = UPLOAD_BUDGET_BYTES, chunk_size: int = 8 << 20):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+
+    def path_for(self, digest: str, suffix: str = "") -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest + suffix)
+
+    def ingest(self, fileobj: BinaryIO, suffix: str = "") -> Tuple[str, str]:
+        """
+        Stores the remaining content of a binary file object.
+        Seekable inputs (e.g. Streamlit UploadedFile) are hashed first and only
+        written if the content is new; others are hashed while being written.
+        Returns: (sha256 hex digest, path of the stored file).
+        """
+        suffix = suffix.lower()
+        if fileobj.seekable():
+            start = fileobj.tell()
+            digest = hashlib.sha256()
+            for chunk in iter(lambda: fileobj.read(self.chunk_size), b""):
+                digest.update(chunk)
+            path = self.path_for(digest.hexdigest(), suffix)
+            if os.path.exists(path):
+                _touch(path)
+                return digest.hexdigest(), path
+            fileobj.seek(start)
+        return self._write(fileobj, suffix)
+
+    def ingest_path(self, src_path: str) -> Tuple[str, str]:
+        """Stores a local file (suffix kept). Returns: (sha256 hex digest, stored path)."""
+        with open(src_path, "rb") as f:
+            return self.ingest(f, os.path.splitext(src_path)[1])
+
+    def _write(self, fileobj: BinaryIO, suffix: str) -> Tuple[str, str]:
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(tmp_dir, f"{os.getpid()}.{threading.get_ident()}.{time.time_ns()}.part")
+        digest = hashlib.sha256()
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in iter(lambda: fileobj.read(self.chunk_size), b""):
+                    digest.update(chunk)
+                    f.write(chunk)
+            path = self.path_for(digest.hexdigest(), suffix)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                _touch(path)
+            else:
+                os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return digest.hexdigest(), path
+
+    def _objects(self) -> Dict[str, Dict]:
+        """Groups stored files by digest. Returns: digest -> {'paths', 'bytes', 'last_used'}."""
+        objects: Dict[str, Dict] = {}
+        objects_dir = os.path.join(self.root, "objects")
+        for sub in os.listdir(objects_dir):
+            sub_dir = os.path.join(objects_dir, sub)
+            if not os.path.isdir(sub_dir):
+                continue
+            for name in os.listdir(sub_dir):
+                path = os.path.join(sub_dir, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                obj = objects.setdefault(name.split('.')[0], {"paths": [], "bytes": 0, "last_used": 0.0})
+                obj["paths"].append(path)
+                obj["bytes"] += st.st_size
+                obj["last_used"] = max(obj["last_used"], st.st_mtime)
+        return objects
+
+    def size(self) -> int:
+        return sum(obj["bytes"] for obj in self._objects().values())
+
+    def gc(self, max_bytes: Optional[int] = None, protect: Iterable[str] = ()) -> List[str]:
+        """
+        Deletes least-recently-used objects (with their derived files) until the
+        store fits in max_bytes. Digests or paths in protect (e.g. inputs of
+        queued/running jobs) are never deleted.
+        Returns: digests that were removed.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        protected = {os.path.basename(p).split('.')[0] for p in protect}
+        with self._lock:
+            objects = self._objects()
+            total = sum(obj["bytes"] for obj in objects.values())
+            removed = []
+            for digest, obj in sorted(objects.items(), key=lambda kv: kv[1]["last_used"]):
+                if total <= max_bytes:
+                    break
+                if digest in protected:
+                    continue
+                for path in obj["paths"]:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                total -= obj["bytes"]
+                removed.append(digest)
+        if removed:
+            print(f"Upload store: removed {len(removed)} objects, {total / 2**30:.2f} GiB left")
+        return removed
+
+def _touch(path: str):
+    # mtime doubles as the last-used time for garbage collection
+    try:
+        os.utime(path)
+    except OSError:
+        pass
@@ -1,11 +1,20 @@
+import math
 import librosa
 import numpy as np
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.data.loader import MeetingLoader
+
+# Bump when the MFCC computation changes; stored with precomputed audio features
+# and fusion checkpoints, so features from different versions are never mixed
+AUDIO_FEATURE_VERSION = 2
 
 class AudioFeatureExtractor:
-    def __init__(self, sr: int = 16000, n_mfcc: int = 13):
+    def __init__(self, sr: int = 16000, n_mfcc: int = 13, hop_length: int = 512):
         self.sr = sr
         self.n_mfcc = n_mfcc
+        self.hop_length = hop_length
 
     def extract_segment_features(self, audio_segment: np.ndarray) -> np.ndarray:
         """
@@ -14,14 +23,85 @@ class AudioFeatureExtractor:
         """
         if len(audio_segment) == 0:
             return np.zeros(self.n_mfcc)
-            
+
         # Extract MFCCs
-        mfccs = librosa.feature.mfcc(y=audio_segment, sr=self.sr, n_mfcc=self.n_mfcc)
-        
+        mfccs = self._mfcc(audio_segment)
+
         # Take mean across time to get a single vector per segment
         mfcc_mean = np.mean(mfccs, axis=1)
-        
+
         return mfcc_mean
 
+    def prepare_meeting(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Computes the MFCC matrix for the whole meeting once and returns its
+        prefix sums over frames, shape (n_frames + 1, n_mfcc).
+        Keep the result to pool any number of window sets via pool_segments.
+        """
+        if len(audio) == 0:
+            return np.zeros((1, self.n_mfcc))
+
+        mfccs = self._mfcc(audio)
+        prefix = np.zeros((mfccs.shape[1] + 1, self.n_mfcc))
+        # float64 accumulation keeps long meetings numerically stable
+        np.cumsum(mfccs.T, axis=0, dtype=np.float64, out=prefix[1:])
+        return prefix
+
+    def pool_segments(self, prefix: np.ndarray, seg_starts: np.ndarray, seg_ends: np.ndarray) -> np.ndarray:
+        """
+        Mean MFCC vector per [start, end) window from prepare_meeting's prefix sums.
+        Each window costs O(n_mfcc), independent of its length or overlap.
+        Returns: numpy array of shape (N_segments, n_mfcc); empty windows are zeros.
+        """
+        n_frames = prefix.shape[0] - 1
+        # Frame f is centered at f * hop_length / sr
+        lo = np.clip(np.ceil(np.asarray(seg_starts) * self.sr / self.hop_length), 0, n_frames).astype(np.int64)
+        hi = np.clip(np.ceil(np.asarray(seg_ends) * self.sr / self.hop_length), 0, n_frames).astype(np.int64)
+        hi = np.maximum(hi, lo)
+
+        counts = (hi - lo)[:, None]
+        sums = prefix[hi] - prefix[lo]
+        return np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0).astype(np.float32)
+
+    def extract_meeting(self, audio: np.ndarray, seg_starts: np.ndarray, seg_ends: np.ndarray) -> np.ndarray:
+        """
+        Whole-meeting mode: one STFT/MFCC pass, then per-segment pooling.
+        Returns: numpy array of shape (N_segments, n_mfcc), ready for RoME_Scorer.
+        """
+        return self.pool_segments(self.prepare_meeting(audio), seg_starts, seg_ends)
+
+    def extract_ranges(self, loader: "MeetingLoader", seg_starts: np.ndarray, seg_ends: np.ndarray) -> np.ndarray:
+        """
+        Lazy mode for a few segments (e.g. a ranking shortlist): decodes only their
+        ranges via MeetingLoader.load_audio_range and pools them like extract_meeting.
+        Each range is cut on the whole-meeting MFCC frame grid with one FFT window of
+        context, so the pooled frames are the ones extract_meeting would use (identical
+        from the .npy cache; ffmpeg's seek can shift decoded samples very slightly).
+        Returns: numpy array of shape (N_segments, n_mfcc)
+        """
+        n_fft = 2048  # librosa's default, as in prepare_meeting
+        context = math.ceil(n_fft / 2 / self.hop_length)
+        features = np.zeros((len(seg_starts), self.n_mfcc), dtype=np.float32)
+        for i, (start, end) in enumerate(zip(seg_starts, seg_ends)):
+            # Meeting frames lo..hi-1, as pool_segments selects them
+            lo = int(np.ceil(start * self.sr / self.hop_length))
+            hi = max(int(np.ceil(end * self.sr / self.hop_length)), lo)
+            first = max(lo - context, 0)
+            # Half a sample in, so load_audio_range's int() starts exactly at sample first * hop_length
+            offset = (first * self.hop_length + 0.5) / self.sr if first else 0.0
+            y = np.asarray(loader.load_audio_range(offset,
+                                                   (hi + context + 1) * self.hop_length / self.sr, self.sr))
+            # Local frame j is meeting frame first + j; half-frame times select lo..hi-1 exactly
+            bounds = (np.array([lo, hi]) - first - 0.5) * self.hop_length / self.sr
+            features[i] = self.pool_segments(self.prepare_meeting(y), bounds[:1], bounds[1:])[0]
+        return features
+
+    def _mfcc(self, y: np.ndarray) -> np.ndarray:
+        # librosa's mfcc(y=...) floors dB at 80 below the loudest frame of y; with a fixed
+        # floor instead each frame depends only on its own samples, so a range decoded on
+        # its own (extract_ranges) gives the same frames as the whole-meeting pass
+        S = librosa.feature.melspectrogram(y=y, sr=self.sr, hop_length=self.hop_length)
+        return librosa.feature.mfcc(S=librosa.power_to_db(S, top_db=None), sr=self.sr, n_mfcc=self.n_mfcc)
+
     def get_embedding_dim(self) -> int:
         return self.n_mfcc
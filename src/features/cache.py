@@ -0,0 +1,134 @@
+import os
+import hashlib
+import sqlite3
+import time
+import threading
+import numpy as np
+from typing import List, Dict
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed embedding store backed by SQLite.
+    Keys are (model_name, sha256(text)); values are float32 vectors.
+    The store is bounded by max_entries and evicts least-recently-used rows.
+    Several processes may share one database: LRU stamps are wall-clock times
+    and the row count is kept in SQLite by triggers, so no full count is needed.
+    """
+    # SQLite limits the number of bound parameters per statement
+    _CHUNK = 500
+
+    def __init__(self, path: str = "data/cache/embeddings.sqlite", max_entries: int = 500_000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash BLOB NOT NULL,
+                dim INTEGER NOT NULL,
+                vec BLOB NOT NULL,
+                last_access INTEGER NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings(last_access)")
+        self._conn.commit()
+        # Running row count; seeded once from databases created before it existed
+        self._conn.execute("BEGIN IMMEDIATE")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO stats (key, value) SELECT 'rows', COUNT(*) FROM embeddings")
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS embeddings_insert AFTER INSERT ON embeddings
+            BEGIN UPDATE stats SET value = value + 1 WHERE key = 'rows'; END
+        """)
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS embeddings_delete AFTER DELETE ON embeddings
+            BEGIN UPDATE stats SET value = value - 1 WHERE key = 'rows'; END
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def text_hash(text: str) -> bytes:
+        return hashlib.sha256(text.encode('utf-8')).digest()
+
+    @staticmethod
+    def _stamp() -> int:
+        # Wall clock, so stamps from every process sharing the database order correctly
+        # (rows stamped by the old per-process counter sort as oldest)
+        return time.time_ns()
+
+    def get_many(self, model_name: str, texts: List[str]) -> Dict[int, np.ndarray]:
+        """
+        Looks up embeddings for texts.
+        Returns: dict mapping input position -> embedding, for cache hits only.
+        """
+        positions: Dict[bytes, List[int]] = {}
+        for i, text in enumerate(texts):
+            positions.setdefault(self.text_hash(text), []).append(i)
+
+        hits = {}
+        keys = list(positions.keys())
+        with self._lock:
+            for c in range(0, len(keys), self._CHUNK):
+                chunk = keys[c:c + self._CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, dim, vec FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model_name, *chunk]
+                ).fetchall()
+                for h, dim, vec in rows:
+                    emb = np.frombuffer(vec, dtype=np.float32, count=dim)
+                    for i in positions[h]:
+                        hits[i] = emb
+
+            # Refresh LRU stamps for the hits
+            if hits:
+                stamp = self._stamp()
+                hit_keys = {self.text_hash(texts[i]) for i in hits}
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                    [(stamp, model_name, h) for h in hit_keys]
+                )
+                self._conn.commit()
+        return hits
+
+    def put_many(self, model_name: str, texts: List[str], embeddings: np.ndarray):
+        """Stores embeddings (N, dim) for texts, then evicts LRU rows above max_entries."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            stamp = self._stamp()
+            # Upsert rather than INSERT OR REPLACE: REPLACE's implicit delete doesn't fire the count trigger
+            self._conn.executemany(
+                "INSERT INTO embeddings (model, text_hash, dim, vec, last_access) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(model, text_hash) DO UPDATE SET dim = excluded.dim, vec = excluded.vec, "
+                "last_access = excluded.last_access",
+                [(model_name, self.text_hash(t), e.shape[0], e.tobytes(), stamp) for t, e in zip(texts, embeddings)]
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT value FROM stats WHERE key = 'rows'").fetchone()[0]
+
+    def _evict(self):
+        excess = self._count() - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE (model, text_hash) IN "
+                "(SELECT model, text_hash FROM embeddings ORDER BY last_access LIMIT ?)",
+                (excess,)
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,25 +1,168 @@
 import torch
 from sentence_transformers import SentenceTransformer
-from typing import List, Union
+from typing import List, Union, Optional, TYPE_CHECKING
 import numpy as np
+from src.features.cache import EmbeddingCache
+
+if TYPE_CHECKING:
+    from src.data.loader import SegmentTable
+
+TEXT_MODES = ("window", "lines")
+# 'int8' and 'onnx' are CPU-only approximations of the float32 'torch' backend.
+TEXT_BACKENDS = ("torch", "int8", "onnx")
+# Required mean cosine similarity of their embeddings to the 'torch' ones, enforced by
+# tests/test_text_backends.py with the real all-MiniLM-L6-v2 weights (reported by
+# `benchmark --components text`). NOT yet measured with those weights: they could not be
+# downloaded where the backends were added, so that test skipped. With the same
+# architecture and random weights the means were int8 0.99995, onnx 1.00000 (200 synthetic
+# transcript lines), which says little: random weights quantize far more easily.
+BACKEND_MIN_COSINE = {"int8": 0.99, "onnx": 0.9999}
 
 class TextFeatureExtractor:
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', cache: Optional[EmbeddingCache] = None,
+                 backend: str = "torch", token_budget: Optional[int] = None, max_batch_size: int = 256):
         """
         Initializes the BERT-based text encoder.
         Using 'all-MiniLM-L6-v2' for speed/performance balance.
+        If a cache is given, only texts missing from it are sent to the model.
+        backend: 'torch' (float32), 'int8' (dynamically quantized Linear layers)
+        or 'onnx' (ONNX Runtime export; needs optimum[onnxruntime]).
+        token_budget: if set, inputs are sorted by token length and batched so
+        that batch size x longest sequence stays within this many tokens
+        (default: the library's fixed batch size).
         """
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        print(f"Loading Text Model {model_name} on {self.device}...")
-        self.model = SentenceTransformer(model_name, device=self.device)
-        
+        if backend not in TEXT_BACKENDS:
+            raise ValueError(f"Unknown text backend: {backend} (expected one of {TEXT_BACKENDS})")
+        self.model_name = model_name
+        self.backend = backend
+        self.cache = cache
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+        self.device = 'cuda' if torch.cuda.is_available() and backend == "torch" else 'cpu'
+        print(f"Loading Text Model {model_name} ({backend}) on {self.device}...")
+        if backend == "onnx":
+            self.model = SentenceTransformer(model_name, device=self.device, backend="onnx")
+        else:
+            self.model = SentenceTransformer(model_name, device=self.device)
+        if backend == "int8":
+            self.model = torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    @property
+    def cache_name(self) -> str:
+        """Embedding cache namespace; approximate backends don't share entries with float32 ones."""
+        return self.model_name if self.backend == "torch" else f"{self.model_name}@{self.backend}"
+
     def extract(self, text_segments: List[str]) -> np.ndarray:
         """
         Encodes a list of text strings into embeddings.
         Returns: numpy array of shape (N, 384)
         """
-        embeddings = self.model.encode(text_segments, convert_to_numpy=True)
+        if self.cache is None:
+            return self.encode(text_segments)
+
+        hits = self.cache.get_many(self.cache_name, text_segments)
+        embeddings = np.empty((len(text_segments), self.get_embedding_dim()), dtype=np.float32)
+        for i, emb in hits.items():
+            embeddings[i] = emb
+
+        miss_idx = [i for i in range(len(text_segments)) if i not in hits]
+        if miss_idx:
+            # Encode each distinct missing text once
+            miss_texts = list(dict.fromkeys(text_segments[i] for i in miss_idx))
+            miss_embs = self.encode(miss_texts)
+            self.cache.put_many(self.cache_name, miss_texts, miss_embs)
+            lookup = dict(zip(miss_texts, miss_embs))
+            for i in miss_idx:
+                embeddings[i] = lookup[text_segments[i]]
         return embeddings
 
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Runs the model on texts (no cache), in length-sorted token-budget batches.
+        Returns: float32 array of shape (N, 384), in input order
+        """
+        if self.token_budget is None or len(texts) <= 1:
+            return self.model.encode(texts, convert_to_numpy=True)
+        lengths = self.token_lengths(texts)
+        # Longest first, so the largest batch tensors are allocated up front
+        order = np.argsort(-lengths, kind='stable')
+        out = np.empty((len(texts), self.get_embedding_dim()), dtype=np.float32)
+        for batch in token_budget_batches(lengths[order], self.token_budget, self.max_batch_size):
+            idx = order[batch]
+            out[idx] = self.model.encode([texts[i] for i in idx], batch_size=len(idx), convert_to_numpy=True)
+        return out
+
+    def token_lengths(self, texts: List[str]) -> np.ndarray:
+        """Tokens per text including special tokens, after truncation to the model's max_seq_length."""
+        encoded = self.model.tokenizer(texts, add_special_tokens=True, truncation=True,
+                                       max_length=self.model.max_seq_length)
+        return np.array([len(ids) for ids in encoded['input_ids']], dtype=np.int64)
+
+    def extract_lines(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeds every transcript line once (repeated lines such as "yeah" only once).
+        Returns: numpy array of shape (N_lines, 384), in line order
+        """
+        unique, inverse = np.unique(np.array(texts, dtype=object).astype(str), return_inverse=True)
+        if len(unique) == 0:
+            return np.zeros((0, self.get_embedding_dim()), dtype=np.float32)
+        return np.asarray(self.extract(unique.tolist()), dtype=np.float32)[inverse]
+
+    def extract_segments(self, segments: "SegmentTable", mode: str = "window",
+                         line_embs: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Segment embeddings in one of two modes:
+        - 'window': encode each segment's joined text (long windows get truncated by the model)
+        - 'lines': encode each transcript line once and pool them per segment (pool_lines);
+          pass line_embs to re-segment the same transcript without any model calls
+        Returns: numpy array of shape (N_segments, 384)
+        """
+        if mode == "window":
+            return self.extract(segments.text)
+        if mode != "lines":
+            raise ValueError(f"Unknown text mode: {mode} (expected one of {TEXT_MODES})")
+        texts = segments.transcript_df['text'].astype(str).tolist()
+        if line_embs is None:
+            line_embs = self.extract_lines(texts)
+        return pool_lines(line_embs, line_weights(texts), segments.row_ptr, segments.row_index)
+
     def get_embedding_dim(self) -> int:
         return self.model.get_sentence_embedding_dimension()
+
+def token_budget_batches(sorted_lengths: np.ndarray, token_budget: int, max_batch_size: int) -> List[slice]:
+    """
+    Splits length-sorted (descending) inputs into consecutive batches whose
+    padded size (batch size x first, i.e. longest, length) fits the token budget.
+    Returns: list of slices into sorted_lengths
+    """
+    batches = []
+    start, n = 0, len(sorted_lengths)
+    while start < n:
+        size = max(1, min(max_batch_size, token_budget // max(int(sorted_lengths[start]), 1)))
+        batches.append(slice(start, min(start + size, n)))
+        start += size
+    return batches
+
+def line_weights(texts: List[str]) -> np.ndarray:
+    """Pooling weight per line: its word count, so short backchannels ("yeah") count little."""
+    return np.array([len(t.split()) for t in texts], dtype=np.float64)
+
+def pool_lines(line_embs: np.ndarray, weights: np.ndarray, row_ptr: np.ndarray, row_index: np.ndarray) -> np.ndarray:
+    """
+    Weighted mean of line embeddings per segment, for segments given in CSR form
+    (segment i covers lines row_index[row_ptr[i]:row_ptr[i + 1]]).
+    Each segment is a difference of two prefix sums, so the cost is one cumsum
+    over the CSR entries regardless of window size or overlap.
+    Segments without (non-empty) lines get a zero vector.
+    Returns: float32 array of shape (N_segments, D)
+    """
+    dim = line_embs.shape[1]
+    w = weights[row_index]
+    weighted = np.zeros((len(row_index) + 1, dim), dtype=np.float64)
+    # float64 prefix sums keep long meetings free of cancellation error
+    np.cumsum(line_embs[row_index] * w[:, None], axis=0, out=weighted[1:])
+    w_cs = np.concatenate([[0.0], np.cumsum(w)])
+
+    sums = weighted[row_ptr[1:]] - weighted[row_ptr[:-1]]
+    totals = (w_cs[row_ptr[1:]] - w_cs[row_ptr[:-1]])[:, None]
+    return np.divide(sums, totals, out=np.zeros_like(sums), where=totals > 0).astype(np.float32)
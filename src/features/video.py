@@ -3,11 +3,56 @@ import torch.nn as nn
 import torchvision.models as models
 import torchvision.transforms as transforms
 from PIL import Image
+import cv2
 import numpy as np
-from typing import List
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.data.loader import MeetingLoader
+
+class KeyframeSelector:
+    """
+    Cheap change detection on decoded frames: each frame is reduced to a small
+    grayscale thumbnail and compared (mean absolute difference, 0-255 scale)
+    with the last keyframe. Frames closer than threshold are near-duplicates,
+    e.g. a fixed camera on a static room, and can reuse the keyframe's features.
+    Comparing against the keyframe rather than the previous frame keeps slow
+    drift from being skipped indefinitely.
+    """
+    def __init__(self, threshold: Optional[float] = 2.0, size: int = 32):
+        self.threshold = threshold
+        self.size = size
+        self._reference = None
+        self.frames = 0
+        self.keyframes = 0
+
+    def is_duplicate(self, frame: np.ndarray) -> bool:
+        """True if frame (RGB uint8) is a near-duplicate of the last keyframe; otherwise it becomes the keyframe."""
+        self.frames += 1
+        if self.threshold:
+            thumb = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY), (self.size, self.size),
+                               interpolation=cv2.INTER_AREA).astype(np.int16)
+            if self._reference is not None and np.abs(thumb - self._reference).mean() < self.threshold:
+                return True
+            self._reference = thumb
+        self.keyframes += 1
+        return False
+
+    def stats(self) -> Dict:
+        """Returns: {'frames', 'keyframes', 'skip_ratio'} for the frames seen so far."""
+        skipped = self.frames - self.keyframes
+        return {"frames": self.frames, "keyframes": self.keyframes,
+                "skip_ratio": skipped / self.frames if self.frames else 0.0}
 
 class VideoFeatureExtractor:
-    def __init__(self):
+    def __init__(self, skip_threshold: Optional[float] = 2.0):
+        """
+        skip_threshold: frames whose thumbnail differs from the last keyframe by
+        less than this (mean abs. grey level) reuse its features instead of
+        running ResNet50 (see KeyframeSelector). None or 0 encodes every frame.
+        """
+        self.skip_threshold = skip_threshold
+        self.last_stats: Optional[Dict] = None # KeyframeSelector.stats() of the last call
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
         print(f"Loading Video Model (ResNet50) on {self.device}...")
         
@@ -26,15 +71,26 @@ class VideoFeatureExtractor:
     def extract(self, frames: List[np.ndarray]) -> np.ndarray:
         """
         Extracts features from a list of frames (numpy arrays).
+        Near-duplicate frames are not encoded; their keyframe counts once per frame it stands for.
         Returns: numpy array of shape (2048,) - averaged over frames.
         """
         if not frames:
             return np.zeros(2048)
             
+        selector = KeyframeSelector(self.skip_threshold)
+        keyframes, weights = [], []
+        for frame in frames:
+            if selector.is_duplicate(frame):
+                weights[-1] += 1
+            else:
+                keyframes.append(frame)
+                weights.append(1)
+        self.last_stats = selector.stats()
+
         # Convert frames to tensors
         # Frames are expected to be RGB numpy arrays
         batch_tensors = []
-        for frame in frames:
+        for frame in keyframes:
             # Convert numpy to PIL
             pil_img = Image.fromarray(frame)
             tensor_img = self.preprocess(pil_img)
@@ -42,14 +98,103 @@ class VideoFeatureExtractor:
             
         batch = torch.stack(batch_tensors).to(self.device)
         
-        with torch.no_grad():
+        with torch.inference_mode():
             features = self.model(batch)
             
-        # Average pooling over the frames to get one vector per segment
-        # features shape: (N_frames, 2048)
-        pooled_features = torch.mean(features, dim=0).cpu().numpy()
+        # Weighted average over the frames to get one vector per segment
+        # features shape: (N_keyframes, 2048)
+        w = torch.tensor(weights, dtype=features.dtype, device=features.device)
+        pooled_features = ((features * w[:, None]).sum(dim=0) / w.sum()).cpu().numpy()
         
         return pooled_features
 
+    def extract_meeting(self, loader: "MeetingLoader", seg_starts: np.ndarray, seg_ends: np.ndarray,
+                        frames_per_segment: int = 4, batch_size: int = 32) -> np.ndarray:
+        """
+        Samples frames_per_segment frames per segment straight from the video and
+        average-pools their features per segment.
+        Frames are decoded at reduced resolution and streamed through ResNet50 in
+        fixed-size batches across all segments, so memory stays bounded by
+        batch_size regardless of meeting length. Frames shared by overlapping
+        segments are decoded and encoded once, and near-duplicates of the
+        previous keyframe (static footage) are not encoded at all: they reuse
+        the keyframe's features, still counting once in each of their segments.
+        The skip ratio is printed and kept in self.last_stats.
+        Returns: numpy array of shape (N_segments, 2048)
+        """
+        seg_starts = np.asarray(seg_starts, dtype=np.float64)
+        seg_ends = np.asarray(seg_ends, dtype=np.float64)
+        n_segments = len(seg_starts)
+        sums = torch.zeros(n_segments, 2048)
+        counts = torch.zeros(n_segments)
+        if n_segments == 0:
+            return sums.numpy()
+
+        metadata = loader.load_video_metadata()
+        fps = metadata['fps']
+        last_frame = max(metadata['frame_count'] - 1, 0)
+
+        # Evenly spaced sample times inside each segment
+        offsets = (np.arange(frames_per_segment) + 0.5) / frames_per_segment
+        times = seg_starts[:, None] + (seg_ends - seg_starts)[:, None] * offsets[None, :]
+        frame_idx = np.clip((times * fps).astype(np.int64), 0, last_frame).ravel()
+        seg_idx = np.repeat(np.arange(n_segments), frames_per_segment)
+
+        # CSR map: unique frame -> segments that sampled it
+        unique_frames, inverse = np.unique(frame_idx, return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        frame_segs = seg_idx[order]
+        frame_ptr = np.searchsorted(inverse[order], np.arange(len(unique_frames) + 1))
+
+        selector = KeyframeSelector(self.skip_threshold)
+        # Keyframes waiting for the CNN, and per keyframe the unique frames it stands for
+        batch, groups = [], []
+        # Last keyframe of the previous batch: encoded, but later frames may still reuse it
+        open_feature, open_group = None, None
+        for target, frame in loader.iter_frames(unique_frames):
+            u = np.searchsorted(unique_frames, target)
+            if selector.is_duplicate(frame):
+                (groups[-1] if groups else open_group).append(u)
+                continue
+            if open_group is not None:
+                self._accumulate(open_feature[None], [open_group], frame_segs, frame_ptr, sums, counts)
+                open_feature, open_group = None, None
+            batch.append(torch.from_numpy(frame).permute(2, 0, 1))
+            groups.append([u])
+            if len(batch) == batch_size:
+                features = self._encode(batch)
+                self._accumulate(features[:-1], groups[:-1], frame_segs, frame_ptr, sums, counts)
+                open_feature, open_group = features[-1], groups[-1]
+                batch, groups = [], []
+        if batch:
+            self._accumulate(self._encode(batch), groups, frame_segs, frame_ptr, sums, counts)
+        if open_group is not None:
+            self._accumulate(open_feature[None], [open_group], frame_segs, frame_ptr, sums, counts)
+
+        self.last_stats = selector.stats()
+        print(f"Video features: {self.last_stats['keyframes']}/{self.last_stats['frames']} frames encoded "
+              f"({100 * self.last_stats['skip_ratio']:.0f}% skipped as near-duplicates)")
+
+        # Segments without decodable frames stay at zero, as in extract()
+        return (sums / counts.clamp(min=1).unsqueeze(1)).numpy()
+
+    def _encode(self, batch: List[torch.Tensor]) -> torch.Tensor:
+        """Runs one batch of uint8 CHW frames. Returns: (N, 2048) float32 features on the CPU."""
+        with torch.inference_mode():
+            return self.model(self.preprocess(torch.stack(batch)).to(self.device)).float().cpu()
+
+    def _accumulate(self, features: torch.Tensor, groups: List[List[int]], frame_segs: np.ndarray,
+                    frame_ptr: np.ndarray, sums: torch.Tensor, counts: torch.Tensor):
+        """Adds each keyframe's features to the segments of every unique frame in its group."""
+        if not groups:
+            return
+        owners = np.repeat(np.arange(len(groups)), [len(g) for g in groups])
+        frames = np.concatenate(groups)
+        lengths = frame_ptr[frames + 1] - frame_ptr[frames]
+        rows = torch.from_numpy(np.repeat(owners, lengths))
+        segs = torch.from_numpy(np.concatenate([frame_segs[frame_ptr[u]:frame_ptr[u + 1]] for u in frames]))
+        sums.index_add_(0, segs, features[rows])
+        counts.index_add_(0, segs, torch.ones(len(segs)))
+
     def get_embedding_dim(self) -> int:
         return 2048
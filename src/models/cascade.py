@@ -0,0 +1,143 @@
+import os
+import glob
+import json
+import argparse
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.models.scoring import normalize_rows, top_k_indices
+
+# fetch(segment indices) -> (audio_emb, video_emb) rows for exactly those segments
+FeatureFetcher = Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]]
+
+def scorer_mismatch(meta: Dict, text_mode: str, text_model: Optional[str] = None) -> Optional[str]:
+    """
+    Checks a fusion checkpoint's training metadata (RoME_Scorer.meta) against the
+    features it would re-rank: audio and video must have been real training inputs
+    (audio from the current AudioFeatureExtractor), and the text embeddings must
+    come from the same mode (and model, if given).
+    Returns: why the scorer can't be used, or None if it can.
+    """
+    from src.features.audio import AUDIO_FEATURE_VERSION
+    missing = [m for m in ("audio", "video") if m not in meta.get("modalities", [])]
+    if missing:
+        return f"the fusion model was not trained on {' or '.join(missing)} features"
+    if meta.get("audio_version") != AUDIO_FEATURE_VERSION:
+        return f"the fusion model was trained on audio features v{meta.get('audio_version')}, not v{AUDIO_FEATURE_VERSION}"
+    if meta.get("text_mode") != text_mode:
+        return f"the fusion model was trained on '{meta.get('text_mode')}' text embeddings, not '{text_mode}'"
+    if text_model is not None and meta.get("text_model") != text_model:
+        return f"the fusion model was trained on {meta.get('text_model')} embeddings, not {text_model}"
+    return None
+
+def cascade_rank(role_embs: np.ndarray, seg_embs: np.ndarray, scorer, fetch: FeatureFetcher,
+                 top_k: int = 3, shortlist: int = 20) -> Dict[str, np.ndarray]:
+    """
+    Coarse-to-fine ranking: the cheap text cosine score (as in score_roles)
+    keeps the best `shortlist` segments per role, audio/video features are
+    fetched only for the union of those shortlists, and each role's shortlist
+    is re-ranked with the fusion model.
+    Args:
+        role_embs: (N_roles, dim) role embeddings
+        seg_embs: (N_segments, dim) segment text embeddings
+        scorer: SharedRoleScorer (RoME_Scorer.for_inference())
+        fetch: returns (audio_emb, video_emb) for the given sorted segment indices
+    Returns: dict with
+        'scores': (N_roles, N_segments) fusion scores, -inf outside the role's shortlist
+        'top_k': (N_roles, k) segment indices per role, best first
+        'text_scores': (N_roles, N_segments) cosine similarities
+        'shortlist': (N_roles, S) text-ranked candidates per role
+        'candidates': sorted indices of the segments whose features were fetched
+    """
+    text_scores = normalize_rows(role_embs) @ normalize_rows(seg_embs).T
+    short = top_k_indices(text_scores, max(shortlist, top_k))
+    candidates = np.unique(short)
+
+    scores = np.full(text_scores.shape, -np.inf, dtype=np.float32)
+    if len(candidates):
+        audio, video = fetch(candidates)
+        # Row of each shortlisted segment within the fetched features
+        rows = np.searchsorted(candidates, short)
+        text = np.asarray(seg_embs, dtype=np.float32)
+        for r in range(len(role_embs)):
+            scores[r, short[r]] = scorer.score(text[short[r]], audio[rows[r]], video[rows[r]], role_embs[r])
+    return {
+        "scores": scores,
+        "top_k": top_k_indices(scores, top_k),
+        "text_scores": text_scores,
+        "shortlist": short,
+        "candidates": candidates,
+    }
+
+def cascade_recall(role_embs: np.ndarray, text: np.ndarray, audio: np.ndarray, video: np.ndarray, scorer,
+                   top_k: int = 3, shortlists: Tuple[int, ...] = (5, 10, 20, 50)) -> List[Dict]:
+    """
+    Compares the cascade with exhaustive fusion ranking (every segment scored)
+    on one meeting whose features are all available.
+    Returns: one row per shortlist size with 'recall' (share of the exhaustive
+    top-k the cascade also returns, averaged over roles) and 'feature_fraction'
+    (share of segments whose audio/video features the cascade needs).
+    """
+    n = len(text)
+    exhaustive = np.stack([scorer.score(text, audio, video, role) for role in role_embs])
+    expected = top_k_indices(exhaustive, top_k)
+    rows = []
+    for shortlist in shortlists:
+        result = cascade_rank(role_embs, text, scorer, lambda idx: (audio[idx], video[idx]), top_k, shortlist)
+        hits = [len(np.intersect1d(result["top_k"][r], expected[r])) / max(len(expected[r]), 1)
+                for r in range(len(role_embs))]
+        rows.append({"shortlist": shortlist, "top_k": top_k, "segments": n,
+                     "recall": float(np.mean(hits)) if hits else 1.0,
+                     "feature_fraction": len(result["candidates"]) / n if n else 0.0})
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recall of cascaded ranking vs. exhaustive fusion ranking over precomputed meetings "
+                    "(feature files need audio and video features: precompute --video).")
+    parser.add_argument("--features", default="data/features", help="Directory of precomputed .npz feature files")
+    parser.add_argument("--role", action="append", required=True, help="Role description (repeatable)")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--shortlists", default="5,10,20,50", help="Comma-separated shortlist sizes")
+    parser.add_argument("--out", default=None, help="Also write per-meeting and mean rows as JSON here")
+    args = parser.parse_args()
+
+    from src.models.registry import get_registry
+    from src.pipeline.precompute import stored_text_mode
+    registry = get_registry()
+    role_embs = registry.role_encoder().encode_roles(args.role)
+    scorer = registry.scorer()
+    shortlists = tuple(int(s) for s in args.shortlists.split(","))
+
+    per_meeting = {}
+    for path in sorted(glob.glob(os.path.join(args.features, "*.npz"))):
+        with np.load(path) as data:
+            if not all(k in data for k in ("text_emb", "audio_emb", "video_emb")):
+                print(f"Skipping {path}: needs text, audio and video features")
+                continue
+            mismatch = scorer_mismatch(scorer.meta, stored_text_mode(data),
+                                       str(data["text_model"]) if "text_model" in data else None)
+            if mismatch:
+                print(f"Skipping {path}: {mismatch}")
+                continue
+            per_meeting[os.path.basename(path)[:-4]] = cascade_recall(
+                role_embs, data["text_emb"], data["audio_emb"], data["video_emb"], scorer, args.top_k, shortlists)
+    if not per_meeting:
+        print("No meetings with all three modalities found.")
+        return
+
+    mean = []
+    for i, shortlist in enumerate(shortlists):
+        rows = [m[i] for m in per_meeting.values()]
+        mean.append({"shortlist": shortlist, "top_k": args.top_k,
+                     "recall": float(np.mean([r["recall"] for r in rows])),
+                     "feature_fraction": float(np.mean([r["feature_fraction"] for r in rows]))})
+        print(f"shortlist {shortlist}: recall@{args.top_k} {mean[-1]['recall']:.3f}, "
+              f"features for {100 * mean[-1]['feature_fraction']:.0f}% of segments")
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump({"meetings": per_meeting, "mean": mean}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
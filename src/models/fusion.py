@@ -1,6 +1,21 @@
+import copy
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from typing import Dict
+
+def save_checkpoint(model: "RoME_Scorer", path: str, meta: Dict):
+    """
+    Saves the weights with what they were trained on, e.g. {'modalities': ['text'],
+    'text_mode': 'window', 'text_model': ...}: the inputs a caller must match.
+    """
+    torch.save({"state_dict": model.cpu().state_dict(), "meta": meta}, path)
+
+def read_checkpoint_meta(path: str) -> Dict:
+    """Training metadata of a checkpoint ({} for bare state dicts from older versions)."""
+    checkpoint = torch.load(path, map_location='cpu')
+    return checkpoint.get("meta", {}) if "state_dict" in checkpoint else {}
 
 class RoME_Scorer(nn.Module):
     def __init__(self, text_dim: int, audio_dim: int, video_dim: int, role_dim: int, hidden_dim: int = 128):
@@ -55,3 +70,127 @@ class RoME_Scorer(nn.Module):
         # Score
         score = self.classifier(combined)
         return score
+
+    @classmethod
+    def from_checkpoint(cls, path: str) -> "RoME_Scorer":
+        """
+        Loads a checkpoint saved by train.py (or a bare state dict from older versions);
+        input dims are read from the projection weights and the training metadata
+        (see save_checkpoint) is kept in .meta.
+        """
+        checkpoint = torch.load(path, map_location='cpu')
+        state = checkpoint.get("state_dict", checkpoint)
+        hidden_dim, text_dim = state['text_proj.weight'].shape
+        model = cls(text_dim, state['audio_proj.weight'].shape[1], state['video_proj.weight'].shape[1],
+                    state['role_proj.weight'].shape[1], hidden_dim)
+        model.load_state_dict(state)
+        model.meta = checkpoint.get("meta", {})
+        return model.eval()
+
+    def for_inference(self, quantize: bool = False) -> "SharedRoleScorer":
+        """
+        Returns an inference wrapper that scores many segments against one role.
+        quantize=True applies dynamic int8 quantization to the Linear layers (CPU serving).
+        """
+        return SharedRoleScorer(self, quantize=quantize)
+
+class SharedRoleScorer(nn.Module):
+    """
+    Inference-only view of a RoME_Scorer for a whole meeting and a single role.
+    The role is projected, and turned into attention queries, once and then
+    broadcast over the batch, instead of being repeated per row and re-projected
+    inside nn.MultiheadAttention. Numerically equivalent to RoME_Scorer.forward in eval mode.
+    """
+    def __init__(self, scorer: RoME_Scorer, quantize: bool = False):
+        super(SharedRoleScorer, self).__init__()
+        scorer = copy.deepcopy(scorer).eval()
+        if quantize:
+            scorer = torch.ao.quantization.quantize_dynamic(scorer, {nn.Linear}, dtype=torch.qint8)
+        self.scorer = scorer
+        self.meta = getattr(scorer, "meta", {})
+        self.num_heads = scorer.attention.num_heads
+        self.embed_dim = scorer.attention.embed_dim
+
+    def forward(self, text_emb, audio_emb, video_emb, role_emb):
+        """
+        Args:
+            text_emb: (Batch, text_dim)
+            audio_emb: (Batch, audio_dim)
+            video_emb: (Batch, video_dim)
+            role_emb: (role_dim,) - a single role shared by the whole batch
+        Returns: (Batch, 1) scores
+        """
+        s = self.scorer
+        attn = s.attention
+        head_dim = self.embed_dim // self.num_heads
+        w_q, w_k, w_v = attn.in_proj_weight.chunk(3)
+        b_q, b_k, b_v = attn.in_proj_bias.chunk(3)
+
+        # Role: projected once. Shape: (1, Hidden) and per-head query (Heads, HeadDim)
+        r = s.role_proj(role_emb.unsqueeze(0))
+        q = F.linear(r, w_q, b_q).view(self.num_heads, head_dim) * head_dim ** -0.5
+
+        # Modalities: (Batch, 3, Hidden) -> per-head keys/values (Batch, 3, Heads, HeadDim)
+        modalities = torch.stack([s.text_proj(text_emb), s.audio_proj(audio_emb), s.video_proj(video_emb)], dim=1)
+        k = F.linear(modalities, w_k, b_k).view(-1, 3, self.num_heads, head_dim)
+        v = F.linear(modalities, w_v, b_v).view(-1, 3, self.num_heads, head_dim)
+
+        # Attention weights over the 3 modalities: (Batch, Heads, 3)
+        weights = torch.softmax(torch.einsum('bmhd,hd->bhm', k, q), dim=-1)
+        attn_output = torch.einsum('bhm,bmhd->bhd', weights, v).reshape(-1, self.embed_dim)
+        attn_output = attn.out_proj(attn_output)
+
+        combined = torch.cat([r.expand_as(attn_output), attn_output], dim=1)
+        return s.classifier(combined)
+
+    def score(self, text_emb: np.ndarray, audio_emb: np.ndarray, video_emb: np.ndarray,
+              role_emb: np.ndarray, chunk_size: int = 4096) -> np.ndarray:
+        """
+        Scores an entire meeting's (N, dim) feature matrices in chunks of chunk_size rows.
+        Returns: numpy array of shape (N,)
+        """
+        n = len(text_emb)
+        scores = np.empty(n, dtype=np.float32)
+        role = torch.tensor(role_emb, dtype=torch.float32)
+        with torch.inference_mode():
+            for start in range(0, n, chunk_size):
+                end = min(start + chunk_size, n)
+                scores[start:end] = self(
+                    torch.as_tensor(text_emb[start:end], dtype=torch.float32),
+                    torch.as_tensor(audio_emb[start:end], dtype=torch.float32),
+                    torch.as_tensor(video_emb[start:end], dtype=torch.float32),
+                    role
+                ).squeeze(1).numpy()
+        return scores
+
+    def _example_inputs(self, batch_size: int = 8):
+        s = self.scorer
+        return (
+            torch.zeros(batch_size, _in_features(s.text_proj)),
+            torch.zeros(batch_size, _in_features(s.audio_proj)),
+            torch.zeros(batch_size, _in_features(s.video_proj)),
+            torch.zeros(_in_features(s.role_proj)),
+        )
+
+    def export_torchscript(self, path: str):
+        """Traces the wrapper to TorchScript (batch size stays dynamic)."""
+        with torch.inference_mode():
+            traced = torch.jit.trace(self, self._example_inputs())
+        traced.save(path)
+        return path
+
+    def export_onnx(self, path: str):
+        """Exports the wrapper to ONNX with a dynamic batch axis (requires the onnx package)."""
+        torch.onnx.export(
+            self, self._example_inputs(), path,
+            input_names=['text_emb', 'audio_emb', 'video_emb', 'role_emb'],
+            output_names=['score'],
+            dynamic_axes={'text_emb': {0: 'batch'}, 'audio_emb': {0: 'batch'},
+                          'video_emb': {0: 'batch'}, 'score': {0: 'batch'}},
+            dynamo=False
+        )
+        return path
+
+def _in_features(linear) -> int:
+    # Quantized Linear modules expose in_features like nn.Linear
+    return linear.in_features
@@ -0,0 +1,142 @@
+import os
+import time
+import threading
+from typing import Dict, Optional, Callable, Any
+
+SCORER_PATH = "data/models/rome_scorer.pt" # Written by src/models/train.py
+
+class ModelRegistry:
+    """
+    Process-wide holder for the feature extractors.
+    Each model is loaded lazily on first use and shared by every caller
+    (and every Streamlit session) in the process afterwards.
+    The text encoder backend and token budget default to the ROME_TEXT_BACKEND
+    and ROME_TEXT_TOKEN_BUDGET env vars (see TextFeatureExtractor).
+    """
+    def __init__(self, text_model_name: str = 'all-MiniLM-L6-v2', cache_path: Optional[str] = "data/cache/embeddings.sqlite",
+                 text_backend: Optional[str] = None, text_token_budget: Optional[int] = None,
+                 scorer_path: str = SCORER_PATH):
+        self.text_model_name = text_model_name
+        self.text_backend = text_backend or os.environ.get("ROME_TEXT_BACKEND", "torch")
+        if text_token_budget is None and os.environ.get("ROME_TEXT_TOKEN_BUDGET"):
+            text_token_budget = int(os.environ["ROME_TEXT_TOKEN_BUDGET"])
+        self.text_token_budget = text_token_budget
+        self.cache_path = cache_path
+        self.scorer_path = scorer_path
+        self._models: Dict[str, Any] = {}
+        self._load_times: Dict[str, float] = {}
+        # Re-entrant: loading the role encoder loads the text model first
+        self._lock = threading.RLock()
+        self._factories: Dict[str, Callable[[], Any]] = {
+            "text": self._load_text,
+            "role": self._load_role,
+            "video": self._load_video,
+            "audio": self._load_audio,
+            "scorer": self._load_scorer,
+        }
+
+    def _load_text(self):
+        from src.features.text import TextFeatureExtractor
+        from src.features.cache import EmbeddingCache
+        cache = EmbeddingCache(self.cache_path) if self.cache_path else None
+        return TextFeatureExtractor(self.text_model_name, cache=cache, backend=self.text_backend,
+                                   token_budget=self.text_token_budget)
+
+    def _load_role(self):
+        from src.models.role_encoder import RoleEncoder
+        return RoleEncoder(self.get("text"))
+
+    def _load_video(self):
+        from src.features.video import VideoFeatureExtractor
+        return VideoFeatureExtractor()
+
+    def _load_audio(self):
+        from src.features.audio import AudioFeatureExtractor
+        return AudioFeatureExtractor()
+
+    def _load_scorer(self):
+        from src.models.fusion import RoME_Scorer
+        if not os.path.exists(self.scorer_path):
+            raise FileNotFoundError(f"No trained fusion model at {self.scorer_path} (see src/models/train.py)")
+        return RoME_Scorer.from_checkpoint(self.scorer_path).for_inference()
+
+    def get(self, name: str):
+        """Returns the shared model for name ('text', 'role', 'video', 'audio', 'scorer'), loading it once."""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self._factories:
+            raise ValueError(f"Unknown model: {name}")
+
+        with self._lock:
+            # Another thread may have loaded it while we waited
+            if name not in self._models:
+                start = time.perf_counter()
+                self._models[name] = self._factories[name]()
+                self._load_times[name] = time.perf_counter() - start
+        return self._models[name]
+
+    def text_extractor(self):
+        return self.get("text")
+
+    def role_encoder(self):
+        return self.get("role")
+
+    def video_extractor(self):
+        return self.get("video")
+
+    def audio_extractor(self):
+        return self.get("audio")
+
+    def scorer(self):
+        """The trained fusion model as a SharedRoleScorer."""
+        return self.get("scorer")
+
+    def warm_up(self, names=("text", "role")) -> Dict[str, float]:
+        """
+        Loads the given models ahead of the first request and runs one tiny
+        inference through the text encoder so lazy kernels are initialized.
+        Returns: load time (seconds) per model.
+        """
+        for name in names:
+            self.get(name)
+        if "text" in self._models:
+            self._models["text"].model.encode(["warm up"], convert_to_numpy=True)
+        return {name: self._load_times[name] for name in names}
+
+    def stats(self) -> Dict:
+        """Load times, parameter memory per loaded model, and process peak RSS."""
+        models = {}
+        # Copy: a worker's heartbeat thread reads this while jobs may load models
+        for name, model in list(self._models.items()):
+            models[name] = {
+                "load_time_sec": round(self._load_times.get(name, 0.0), 3),
+                "param_mb": round(_param_bytes(model) / 2**20, 1),
+            }
+        return {"models": models, "peak_rss_mb": _peak_rss_mb()}
+
+def _param_bytes(extractor) -> int:
+    module = getattr(extractor, "model", None)
+    if module is None or not hasattr(module, "parameters"):
+        return 0
+    return sum(p.numel() * p.element_size() for p in module.parameters())
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in KB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_registry() -> ModelRegistry:
+    """Returns the process-wide ModelRegistry."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -1,10 +1,17 @@
 import torch
 import numpy as np
+from typing import List, Optional
 from src.features.text import TextFeatureExtractor
+from src.features.cache import EmbeddingCache
 
 class RoleEncoder:
-    def __init__(self, text_extractor: TextFeatureExtractor):
+    def __init__(self, text_extractor: TextFeatureExtractor, cache: Optional[EmbeddingCache] = None):
+        """
+        If a cache is given (or the text extractor already has one), role embeddings
+        are stored in that persistent, size-bounded store instead of an in-process dict.
+        """
         self.text_extractor = text_extractor
+        self.cache = cache if cache is not None else text_extractor.cache
         self.role_cache = {}
 
     def encode_role(self, role_description: str) -> np.ndarray:
@@ -12,13 +19,30 @@ class RoleEncoder:
         Encodes a role description (e.g., "Project Manager interested in deadlines")
         into a vector using the same text encoder as the transcript.
         """
+        if self.cache is not None:
+            model_name = self.text_extractor.cache_name
+            hit = self.cache.get_many(model_name, [role_description])
+            if 0 in hit:
+                return hit[0]
+            embedding = self.text_extractor.extract([role_description])[0]
+            if self.text_extractor.cache is not self.cache:
+                self.cache.put_many(model_name, [role_description], embedding[None, :])
+            return embedding
+
         if role_description in self.role_cache:
             return self.role_cache[role_description]
-            
+
         # Encode as a single string
         embedding = self.text_extractor.extract([role_description])[0]
         self.role_cache[role_description] = embedding
         return embedding
 
+    def encode_roles(self, role_descriptions: List[str]) -> np.ndarray:
+        """
+        Encodes several role descriptions.
+        Returns: numpy array of shape (N_roles, embedding_dim)
+        """
+        return np.stack([self.encode_role(desc) for desc in role_descriptions])
+
     def get_embedding_dim(self) -> int:
         return self.text_extractor.get_embedding_dim()
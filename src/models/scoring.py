@@ -0,0 +1,44 @@
+import numpy as np
+from typing import Dict
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalizes each row; all-zero rows stay zero."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores along the last axis, best first.
+    Uses a partial sort (argpartition), so cost is O(N) plus O(k log k).
+    """
+    n = scores.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    part_scores = np.take_along_axis(scores, part, axis=-1)
+    order = np.argsort(-part_scores, axis=-1, kind='stable')
+    return np.take_along_axis(part, order, axis=-1)
+
+def score_roles(role_embs: np.ndarray, seg_embs: np.ndarray, top_k: int = 3) -> Dict[str, np.ndarray]:
+    """
+    Scores every segment for every role with one matmul of normalized embeddings
+    (cosine similarity), so N roles cost about as much as one.
+    Args:
+        role_embs: (N_roles, dim), e.g. from RoleEncoder.encode_roles
+        seg_embs: (N_segments, dim) segment text embeddings
+    Returns: dict with
+        'scores': (N_roles, N_segments) cosine similarities
+        'top_k': (N_roles, k) segment indices per role, best first
+        'best_role': (N_segments,) index of the highest-scoring role per segment
+        'best_score': (N_segments,) that role's score
+    """
+    scores = normalize_rows(role_embs) @ normalize_rows(seg_embs).T
+    best_role = np.argmax(scores, axis=0) if len(scores) else np.zeros(scores.shape[1], dtype=np.int64)
+    return {
+        "scores": scores,
+        "top_k": top_k_indices(scores, top_k),
+        "best_role": best_role,
+        "best_score": scores[best_role, np.arange(scores.shape[1])] if len(scores) else np.zeros(scores.shape[1]),
+    }
@@ -0,0 +1,191 @@
+import os
+import json
+import sqlite3
+import threading
+import numpy as np
+from typing import List, Dict, Optional
+
+from src.models.scoring import normalize_rows, top_k_indices
+
+class SegmentIndex:
+    """
+    Persistent cross-meeting index over segment text embeddings.
+    Vectors are L2-normalized and appended to a flat float32 file that is
+    memory-mapped for search; metadata (meeting_id, start/end, text) lives in
+    SQLite. Each meeting occupies a contiguous row range, so meetings can be
+    added incrementally without rebuilding anything.
+    Each meeting also records the configuration its embeddings were computed
+    with (text mode, windows, model); re-adding it with another configuration
+    replaces its rows, so one index never mixes embedding spaces for a meeting.
+    Replaced rows stay in the vector file unreferenced and are masked in search.
+    A flat index with partial-sort top-k answers in milliseconds at corpus
+    scale (hundreds of thousands of segments); no approximate structure needed.
+    """
+    def __init__(self, index_dir: str = "data/index"):
+        self.index_dir = index_dir
+        os.makedirs(index_dir, exist_ok=True)
+        self.vectors_path = os.path.join(index_dir, "vectors.f32")
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(os.path.join(index_dir, "meta.sqlite"), check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS meetings (
+                meeting_id TEXT PRIMARY KEY,
+                row_start INTEGER NOT NULL,
+                row_end INTEGER NOT NULL,
+                config TEXT
+            );
+            CREATE TABLE IF NOT EXISTS segments (
+                row INTEGER PRIMARY KEY,
+                meeting_id TEXT NOT NULL,
+                start_time REAL NOT NULL,
+                end_time REAL NOT NULL,
+                text TEXT
+            );
+        """)
+        columns = [c[1] for c in self._conn.execute("PRAGMA table_info(meetings)")]
+        if "config" not in columns:
+            # Indexes built before configs were recorded; their meetings get replaced on the next add
+            self._conn.execute("ALTER TABLE meetings ADD COLUMN config TEXT")
+        self._conn.commit()
+        row = self._conn.execute("SELECT value FROM info WHERE key = 'dim'").fetchone()
+        self.dim = int(row[0]) if row else None
+        self._vectors = None
+        self._live = None # Row mask when replaced meetings left unreferenced rows, else None
+        self._recover()
+        self._reload()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COALESCE(MAX(row_end), 0) FROM meetings").fetchone()[0]
+
+    def _recover(self):
+        # Vectors are written before metadata is committed; drop any tail from an interrupted add
+        if self.dim and os.path.exists(self.vectors_path):
+            expected = self._count() * self.dim * 4
+            if os.path.getsize(self.vectors_path) > expected:
+                with open(self.vectors_path, "r+b") as f:
+                    f.truncate(expected)
+
+    def _reload(self):
+        n = self._count()
+        if n and self.dim:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(n, self.dim))
+        else:
+            self._vectors = None
+        live = self._row_mask(None)
+        self._live = None if live.all() else live
+
+    def __len__(self) -> int:
+        return 0 if self._vectors is None else self._vectors.shape[0]
+
+    def __contains__(self, meeting_id: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM meetings WHERE meeting_id = ?", (meeting_id,)).fetchone() is not None
+
+    def config(self, meeting_id: str) -> Optional[Dict]:
+        """The configuration a meeting was indexed with ({} if none was recorded), or None if it is not indexed."""
+        row = self._conn.execute("SELECT config FROM meetings WHERE meeting_id = ?", (meeting_id,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]) if row[0] else {}
+
+    def add(self, meeting_id: str, start_times: np.ndarray, end_times: np.ndarray,
+            embeddings: np.ndarray, texts: Optional[List[str]] = None, config: Optional[Dict] = None) -> bool:
+        """
+        Appends one meeting's segments, computed with config (e.g. text_mode,
+        window_size, step_size, text_model). If the meeting is already indexed
+        with the same config nothing changes; with another config its old
+        segments are replaced.
+        Returns: True if segments were written.
+        """
+        embeddings = normalize_rows(embeddings)
+        if len(embeddings) == 0:
+            return False
+        config = config or {}
+        with self._lock:
+            existing = self.config(meeting_id)
+            if existing == config:
+                return False
+            if self.dim is None:
+                self.dim = embeddings.shape[1]
+                self._conn.execute("INSERT INTO info (key, value) VALUES ('dim', ?)", (str(self.dim),))
+            elif embeddings.shape[1] != self.dim:
+                raise ValueError(f"Embedding dim {embeddings.shape[1]} does not match index dim {self.dim}")
+
+            row_start = self._count()
+            with open(self.vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(embeddings).tobytes())
+
+            if texts is None:
+                texts = [None] * len(embeddings)
+            if existing is not None:
+                # Replaced in the same transaction; the old vector rows become unreferenced
+                self._conn.execute("DELETE FROM segments WHERE meeting_id = ?", (meeting_id,))
+                self._conn.execute("DELETE FROM meetings WHERE meeting_id = ?", (meeting_id,))
+            self._conn.execute("INSERT INTO meetings VALUES (?, ?, ?, ?)",
+                               (meeting_id, row_start, row_start + len(embeddings),
+                                json.dumps(config, sort_keys=True)))
+            self._conn.executemany(
+                "INSERT INTO segments VALUES (?, ?, ?, ?, ?)",
+                [(row_start + i, meeting_id, float(s), float(e), t)
+                 for i, (s, e, t) in enumerate(zip(start_times, end_times, texts))]
+            )
+            self._conn.commit()
+            self._reload()
+        return True
+
+    def _row_mask(self, meeting_ids: Optional[List[str]]) -> np.ndarray:
+        """Rows of the given meetings (of every indexed meeting if None)."""
+        mask = np.zeros(len(self), dtype=bool)
+        if meeting_ids is None:
+            ranges = self._conn.execute("SELECT row_start, row_end FROM meetings")
+        else:
+            placeholders = ",".join("?" * len(meeting_ids))
+            ranges = self._conn.execute(
+                f"SELECT row_start, row_end FROM meetings WHERE meeting_id IN ({placeholders})", list(meeting_ids))
+        for row_start, row_end in ranges:
+            mask[row_start:row_end] = True
+        return mask
+
+    def search_many(self, query_embs: np.ndarray, k: int = 10,
+                    meeting_ids: Optional[List[str]] = None) -> List[List[Dict]]:
+        """
+        Global top-k segments for each query (e.g. role embeddings from RoleEncoder.encode_roles),
+        optionally restricted to the given meetings.
+        Returns: one list of dicts (meeting_id, start_time, end_time, text, score) per query, best first.
+        """
+        queries = normalize_rows(np.atleast_2d(query_embs))
+        vectors = self._vectors
+        if vectors is None:
+            return [[] for _ in queries]
+
+        scores = queries @ vectors.T
+        if meeting_ids is not None:
+            scores[:, ~self._row_mask(meeting_ids)] = -np.inf
+        elif self._live is not None:
+            scores[:, ~self._live] = -np.inf
+        top = top_k_indices(scores, k)
+
+        results = []
+        for q in range(len(queries)):
+            rows = [int(r) for r in top[q] if np.isfinite(scores[q, r])]
+            meta = self._fetch(rows)
+            results.append([dict(meta[r], score=float(scores[q, r])) for r in rows])
+        return results
+
+    def search(self, query_emb: np.ndarray, k: int = 10, meeting_ids: Optional[List[str]] = None) -> List[Dict]:
+        return self.search_many(query_emb, k, meeting_ids)[0]
+
+    def _fetch(self, rows: List[int]) -> Dict[int, Dict]:
+        if not rows:
+            return {}
+        placeholders = ",".join("?" * len(rows))
+        return {
+            row: {"meeting_id": meeting_id, "start_time": start, "end_time": end, "text": text}
+            for row, meeting_id, start, end, text in self._conn.execute(
+                f"SELECT row, meeting_id, start_time, end_time, text FROM segments WHERE row IN ({placeholders})", rows)
+        }
+
+    def close(self):
+        self._vectors = None
+        self._conn.close()
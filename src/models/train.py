@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import Dataset, DataLoader, BatchSampler, RandomSampler, SequentialSampler
+from typing import List, Dict, Optional
+
+from src.models.fusion import RoME_Scorer, save_checkpoint
+
+class PairDataset(Dataset):
+    """
+    (segment embedding, query embedding, label) pairs read from a build_cache() directory.
+    Arrays are memory-mapped lazily in each DataLoader worker, and items are
+    fetched a whole batch of indices at a time (use with a BatchSampler).
+    """
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._arrays = None
+        self._len = len(np.load(os.path.join(cache_dir, "pair_label.npy"), mmap_mode='r'))
+
+    def _open(self):
+        if self._arrays is None:
+            names = ("segment_emb", "query_emb", "pair_query", "pair_segment", "pair_label")
+            self._arrays = {n: np.load(os.path.join(self.cache_dir, f"{n}.npy"), mmap_mode='r') for n in names}
+        return self._arrays
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, indices):
+        a = self._open()
+        # Sorted indices turn the memmap gather into mostly sequential reads
+        indices = np.sort(np.asarray(indices))
+        return (
+            torch.from_numpy(a["segment_emb"][a["pair_segment"][indices]]),
+            torch.from_numpy(a["query_emb"][a["pair_query"][indices]]),
+            torch.from_numpy(np.asarray(a["pair_label"][indices]))
+        )
+
+def make_loader(cache_dir: str, batch_size: int = 512, num_workers: int = 2, shuffle: bool = True) -> DataLoader:
+    dataset = PairDataset(cache_dir)
+    sampler = RandomSampler(dataset) if shuffle else SequentialSampler(dataset)
+    return DataLoader(
+        dataset,
+        sampler=BatchSampler(sampler, batch_size=batch_size, drop_last=False),
+        batch_size=None,
+        num_workers=num_workers,
+        persistent_workers=num_workers > 0,
+        pin_memory=torch.cuda.is_available()
+    )
+
+def ranking_metrics(scores: np.ndarray, labels: np.ndarray, k: int = 5) -> Dict[str, float]:
+    """Average precision, recall@k and reciprocal rank of the first relevant segment for one query."""
+    relevant = labels >= 0.5
+    n_relevant = int(relevant.sum())
+    if n_relevant == 0:
+        return {}
+    order = np.argsort(-scores, kind='stable')
+    hits = relevant[order]
+    ranks = np.flatnonzero(hits) + 1
+    precision_at_hits = np.arange(1, len(ranks) + 1) / ranks
+    return {
+        "ap": float(precision_at_hits.mean()),
+        f"recall@{k}": float(hits[:k].sum() / n_relevant),
+        "mrr": float(1.0 / ranks[0])
+    }
+
+def evaluate(model: RoME_Scorer, cache_dir: str, audio_dim: int, video_dim: int, k: int = 5) -> Dict[str, float]:
+    """Ranks every query's meeting segments with the model and averages ranking metrics over queries."""
+    with open(os.path.join(cache_dir, "meta.json")) as f:
+        queries = json.load(f)["queries"]
+    segment_emb = np.load(os.path.join(cache_dir, "segment_emb.npy"), mmap_mode='r')
+    query_emb = np.load(os.path.join(cache_dir, "query_emb.npy"), mmap_mode='r')
+    pair_label = np.load(os.path.join(cache_dir, "pair_label.npy"), mmap_mode='r')
+
+    scorer = model.for_inference()
+    totals, n = {}, 0
+    offset = 0
+    for q, meta in enumerate(queries):
+        s0, s1 = meta["segments"]
+        labels = np.asarray(pair_label[offset:offset + (s1 - s0)])
+        offset += s1 - s0
+        # Copy out of the read-only memmaps before handing them to torch
+        text = np.array(segment_emb[s0:s1])
+        scores = scorer.score(text, np.zeros((len(text), audio_dim), np.float32),
+                              np.zeros((len(text), video_dim), np.float32), np.array(query_emb[q]))
+        metrics = ranking_metrics(scores, labels, k)
+        if metrics:
+            n += 1
+            for name, value in metrics.items():
+                totals[name] = totals.get(name, 0.0) + value
+    return {name: value / max(n, 1) for name, value in totals.items()}
+
+def train(train_cache: str, val_cache: Optional[str] = None, epochs: int = 5, batch_size: int = 512,
+          lr: float = 1e-3, num_workers: int = 2, audio_dim: int = 13, video_dim: int = 2048,
+          out_path: str = "data/models/rome_scorer.pt", text_model: Optional[str] = None) -> List[Dict]:
+    """
+    Trains RoME_Scorer on cached QMSum pairs. QMSum has no audio/video, so those
+    inputs are zeros; the text and role paths learn from query relevance.
+    Logs loss, throughput (samples/s) and validation ranking metrics per epoch.
+    The checkpoint records that only text was trained, on whole-window ('window')
+    embeddings of text_model, so cascade ranking refuses it (see scorer_mismatch).
+    """
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    loader = make_loader(train_cache, batch_size, num_workers)
+    dim = np.load(os.path.join(train_cache, "segment_emb.npy"), mmap_mode='r').shape[1]
+
+    model = RoME_Scorer(text_dim=dim, audio_dim=audio_dim, video_dim=video_dim, role_dim=dim).to(device)
+    optimizer = torch.optim.AdamW(model.parameters(), lr=lr)
+    criterion = nn.BCELoss()
+    audio_zeros = torch.zeros(batch_size, audio_dim, device=device)
+    video_zeros = torch.zeros(batch_size, video_dim, device=device)
+
+    history = []
+    for epoch in range(1, epochs + 1):
+        model.train()
+        start = time.perf_counter()
+        total_loss, n_samples = 0.0, 0
+        for text, role, label in loader:
+            text, role, label = text.to(device), role.to(device), label.to(device)
+            b = len(label)
+            pred = model(text, audio_zeros[:b], video_zeros[:b], role).squeeze(1)
+            loss = criterion(pred, label)
+
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item() * b
+            n_samples += b
+        elapsed = time.perf_counter() - start
+
+        record = {"epoch": epoch, "loss": total_loss / max(n_samples, 1),
+                  "samples_per_sec": n_samples / elapsed if elapsed > 0 else 0.0}
+        if val_cache:
+            model.eval()
+            record.update(evaluate(model.cpu(), val_cache, audio_dim, video_dim))
+            model.to(device)
+        history.append(record)
+        print(" | ".join(f"{k}: {v:.4f}" if isinstance(v, float) else f"{k}: {v}" for k, v in record.items()))
+
+    if out_path:
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        # build_cache embeds each window's joined text, i.e. text_mode 'window'
+        save_checkpoint(model, out_path, {"modalities": ["text"], "text_mode": "window",
+                                          "text_model": text_model, "dataset": "qmsum"})
+        print(f"Saved model to {out_path}")
+    return history
+
+def main():
+    parser = argparse.ArgumentParser(description="Train RoME_Scorer on QMSum query/relevant-span annotations.")
+    parser.add_argument("--qmsum-dir", default="data/qmsum/QMSum-main/data/ALL", help="QMSum ALL directory with train/val splits")
+    parser.add_argument("--cache-dir", default="data/qmsum_cache", help="Where segment/query embeddings are cached")
+    parser.add_argument("--window", type=int, default=20, help="Segment window in transcript turns")
+    parser.add_argument("--step", type=int, default=10, help="Segment step in transcript turns")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--workers", type=int, default=2, help="DataLoader worker processes")
+    parser.add_argument("--out", default="data/models/rome_scorer.pt")
+    args = parser.parse_args()
+
+    from src.data.qmsum import build_cache
+    from src.models.registry import get_registry
+
+    # Encoders are only touched here, once; epochs read the cached memmaps
+    text_extractor = get_registry().text_extractor()
+    caches = {}
+    for split in ("train", "val"):
+        caches[split] = build_cache(os.path.join(args.qmsum_dir, split),
+                                    os.path.join(args.cache_dir, f"{split}_w{args.window}_s{args.step}"),
+                                    text_extractor, args.window, args.step)
+
+    train(caches["train"], caches["val"], epochs=args.epochs, batch_size=args.batch_size,
+          lr=args.lr, num_workers=args.workers, out_path=args.out, text_model=text_extractor.cache_name)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Optional, Tuple
+
+BENCHMARK_DIR = "data/benchmarks"
+AMI_SAMPLE = "data/ami_sample/IS1001a_sample.transcript.xml"
+VOCAB = ("project budget deadline design interface remote control button battery market "
+         "user test release bug api database schema screen colour price meeting agree "
+         "think maybe we should need the a to and of is it that").split()
+
+# Scaling parameters per component: the full suite and a --quick subset
+SIZES = {
+    "full": {
+        "segmentation": [1_000, 10_000, 100_000],  # transcript lines
+        "parse_xml": [1_000, 10_000, 50_000],      # transcript segments
+        "text": [32, 256, 1024],                   # segments embedded
+        "audio": [300, 1800, 3600],                # meeting seconds
+        "video": [(320, 240), (1280, 720)],        # frame resolution
+        "scorer": [64, 1024, 16384],               # segments per forward
+        "render": [3, 10],                         # highlights in the reel
+    },
+    "quick": {
+        "segmentation": [1_000, 10_000],
+        "parse_xml": [1_000, 5_000],
+        "text": [32, 128],
+        "audio": [300, 900],
+        "video": [(320, 240)],
+        "scorer": [64, 1024],
+        "render": [3],
+    },
+}
+
+def synthetic_transcript(duration: float, n_lines: int, seed: int = 0) -> List[Tuple]:
+    """
+    Random but reproducible AMI-style segments spread over duration seconds.
+    Returns: [(start, end, [(word start, word end, word), ...]), ...] sorted by start.
+    """
+    rng = np.random.default_rng(seed)
+    starts = np.sort(rng.uniform(0, max(duration - 5.0, 1.0), n_lines)).round(2)
+    lengths = rng.uniform(1.0, 5.0, n_lines).round(2)
+    n_words = rng.integers(3, 16, n_lines)
+    segments = []
+    for start, length, n in zip(starts, lengths, n_words):
+        edges = np.linspace(start, start + length, n + 1).round(2)
+        words = [VOCAB[k] for k in rng.integers(0, len(VOCAB), n)]
+        segments.append((float(start), float(edges[-1]),
+                         [(float(a), float(b), w) for a, b, w in zip(edges[:-1], edges[1:], words)]))
+    return segments
+
+def synthetic_transcript_df(segments: List[Tuple]) -> pd.DataFrame:
+    return pd.DataFrame({
+        "start_time": [s[0] for s in segments],
+        "end_time": [s[1] for s in segments],
+        "speaker": "Speaker 1",
+        "text": [" ".join(w[2] for w in s[2]) for s in segments],
+    })
+
+def synthetic_video(path: str, duration: float, resolution: Tuple[int, int], fps: float = 5.0,
+                    static: bool = False, seed: int = 0):
+    """
+    Writes a test video (no audio) with OpenCV: a moving gradient, or with
+    static=True a fixed scene with sensor-like noise (a fixed meeting-room camera).
+    """
+    import cv2
+    rng = np.random.default_rng(seed)
+    width, height = resolution
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    base = np.add.outer(np.arange(height), np.arange(width)).astype(np.uint8)
+    for i in range(int(duration * fps)):
+        if static:
+            noise = rng.integers(-3, 4, base.shape)
+            frame = np.clip(base.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+        else:
+            frame = np.roll(base, 4 * i, axis=1)
+        writer.write(np.dstack([frame, np.roll(frame, height // 3, axis=0), 255 - frame]))
+    writer.release()
+
+def synthetic_audio(duration: float, sr: int = 16000, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sr), dtype=np.float32) / sr
+    return (0.1 * np.sin(2 * np.pi * 220 * t) + 0.01 * rng.standard_normal(len(t))).astype(np.float32)
+
+def windows(duration: float, size: float = 30.0) -> Tuple[np.ndarray, np.ndarray]:
+    starts = np.arange(0, duration, size, dtype=np.float64)
+    return starts, np.minimum(starts + size, duration)
+
+def time_call(fn: Callable, repeats: int, warmup: int = 1) -> Dict:
+    """Runs fn warmup + repeats times. Returns: median/min/max wall seconds of the timed runs."""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"median_sec": float(np.median(times)), "min_sec": float(np.min(times)),
+            "max_sec": float(np.max(times)), "repeats": repeats}
+
+def _result(component: str, params: Dict, items: int, timing: Dict) -> Dict:
+    return dict(component=component, params=params, items=items, **timing,
+                items_per_sec=items / timing["median_sec"] if timing["median_sec"] > 0 else None)
+
+def bench_segmentation(sizes, repeats, work_dir):
+    from src.data.loader import SegmentGenerator
+    results = []
+    for n_lines in sizes:
+        duration = n_lines * 3.0
+        df = synthetic_transcript_df(synthetic_transcript(duration, n_lines))
+        segmenter = SegmentGenerator(window_size_sec=30, step_size_sec=15)
+        timing = time_call(lambda: segmenter.segment_meeting(duration, df), repeats)
+        results.append(_result("segmentation", {"lines": n_lines, "duration_sec": duration}, n_lines, timing))
+    return results
+
+def bench_parse_xml(sizes, repeats, work_dir):
+    from src.data.loader import MeetingLoader
+    from src.data.downloader import create_dummy_transcript
+    results = []
+    cases = []
+    for n_lines in sizes:
+        path = os.path.join(work_dir, f"synthetic_{n_lines}.transcript.xml")
+        create_dummy_transcript(path, "BENCH", synthetic_transcript(n_lines * 3.0, n_lines), verbose=False)
+        cases.append(({"lines": n_lines, "source": "synthetic"}, path))
+    if os.path.exists(AMI_SAMPLE):
+        cases.append(({"source": "ami_sample"}, AMI_SAMPLE))
+
+    for params, path in cases:
+        n_rows = len(MeetingLoader("bench.mp4", path)._parse_ami_xml())
+        timing = time_call(lambda: MeetingLoader("bench.mp4", path)._parse_ami_xml(), repeats)
+        results.append(_result("parse_xml", dict(params, bytes=os.path.getsize(path)), n_rows, timing))
+    return results
+
+# (backend, token_budget); the first entry is the reference path (library defaults)
+TEXT_VARIANTS = [("torch", None), ("torch", 4096), ("int8", 4096), ("onnx", 4096)]
+
+def bench_text(sizes, repeats, work_dir):
+    from src.features.text import TextFeatureExtractor, BACKEND_MIN_COSINE
+    from src.data.loader import SegmentGenerator
+    results = []
+    reference = {} # input size -> reference embeddings
+    for backend, token_budget in TEXT_VARIANTS:
+        try:
+            # No embedding cache: measure the encoder itself
+            extractor = TextFeatureExtractor(cache=None, backend=backend, token_budget=token_budget)
+        except Exception as e:
+            print(f"  {backend}: skipped ({type(e).__name__}: {e})")
+            continue
+        for n_segments in sizes:
+            duration = n_segments * 15.0
+            df = synthetic_transcript_df(synthetic_transcript(duration, n_segments * 8))
+            # Mixed lengths, as in practice: 30 s windows and single transcript lines
+            windows_text = SegmentGenerator(30, 15).segment_meeting(duration, df).text[:n_segments // 2]
+            texts = windows_text + df['text'].tolist()[:n_segments - len(windows_text)]
+            timing = time_call(lambda: extractor.encode(texts), repeats)
+            params = {"segments": len(texts), "model": extractor.model_name,
+                      "backend": backend, "token_budget": token_budget}
+            result = _result("text", params, len(texts), timing)
+
+            # Compatibility with the reference embeddings
+            embs = extractor.encode(texts)
+            if len(texts) not in reference:
+                reference[len(texts)] = embs
+            else:
+                ref = reference[len(texts)]
+                cos = np.sum(embs * ref, axis=1) / np.maximum(
+                    np.linalg.norm(embs, axis=1) * np.linalg.norm(ref, axis=1), 1e-12)
+                result["min_cosine"], result["mean_cosine"] = float(cos.min()), float(cos.mean())
+                result["required_mean_cosine"] = BACKEND_MIN_COSINE.get(backend)
+            results.append(result)
+        del extractor
+    return results
+
+def bench_audio(sizes, repeats, work_dir):
+    from src.features.audio import AudioFeatureExtractor
+    extractor = AudioFeatureExtractor()
+    results = []
+    for duration in sizes:
+        audio = synthetic_audio(duration, extractor.sr)
+        starts, ends = windows(duration)
+        timing = time_call(lambda: extractor.extract_meeting(audio, starts, ends), repeats)
+        results.append(_result("audio", {"duration_sec": duration, "segments": len(starts)}, len(starts), timing))
+    return results
+
+def bench_video(sizes, repeats, work_dir, duration: float = 120.0, frames_per_segment: int = 4):
+    from src.data.loader import MeetingLoader
+    from src.features.video import VideoFeatureExtractor
+    extractor = VideoFeatureExtractor()
+    default_threshold = extractor.skip_threshold
+    results = []
+    for width, height in sizes:
+        for scene in ("moving", "static"):
+            path = os.path.join(work_dir, f"synthetic_{scene}_{width}x{height}.mp4")
+            if not os.path.exists(path):
+                synthetic_video(path, duration, (width, height), static=scene == "static")
+            loader = MeetingLoader(path, AMI_SAMPLE)
+            starts, ends = windows(duration)
+            # Frame skipping off (the previous path) and on
+            for skip_threshold in (None, default_threshold):
+                extractor.skip_threshold = skip_threshold
+                timing = time_call(lambda: extractor.extract_meeting(loader, starts, ends, frames_per_segment), repeats)
+                result = _result("video", {"resolution": f"{width}x{height}", "duration_sec": duration,
+                                           "segments": len(starts), "frames_per_segment": frames_per_segment,
+                                           "scene": scene, "skip_threshold": skip_threshold},
+                                 len(starts), timing)
+                result["skip_ratio"] = extractor.last_stats["skip_ratio"]
+                results.append(result)
+    return results
+
+def bench_scorer(sizes, repeats, work_dir):
+    import torch
+    from src.models.fusion import RoME_Scorer
+    torch.manual_seed(0)
+    text_dim, audio_dim, video_dim = 384, 13, 2048
+    model = RoME_Scorer(text_dim, audio_dim, video_dim, text_dim).eval()
+    shared = model.for_inference()
+    results = []
+    for n in sizes:
+        text, audio, video = torch.randn(n, text_dim), torch.randn(n, audio_dim), torch.randn(n, video_dim)
+        role = torch.randn(1, text_dim)
+
+        def forward():
+            with torch.inference_mode():
+                model(text, audio, video, role.expand(n, -1))
+        timing = time_call(forward, repeats)
+        results.append(_result("scorer", {"segments": n, "path": "RoME_Scorer.forward"}, n, timing))
+
+        arrays = (text.numpy(), audio.numpy(), video.numpy(), role[0].numpy())
+        timing = time_call(lambda: shared.score(*arrays), repeats)
+        results.append(_result("scorer", {"segments": n, "path": "SharedRoleScorer.score"}, n, timing))
+    return results
+
+def bench_render(sizes, repeats, work_dir, duration: float = 300.0):
+    from src.app.utils import generate_highlight_video
+    path = os.path.join(work_dir, "render_640x360.mp4")
+    if not os.path.exists(path):
+        synthetic_video(path, duration, (640, 360), fps=25.0)
+    results = []
+    for n_highlights in sizes:
+        starts = np.linspace(10, duration - 30, n_highlights)
+        segments = [{"start_time": float(s), "end_time": float(s) + 20.0} for s in starts]
+        out_path = os.path.join(work_dir, f"reel_{n_highlights}.mp4")
+
+        def render():
+            if not generate_highlight_video(path, segments, out_path):
+                raise RuntimeError("generate_highlight_video failed")
+        timing = time_call(render, repeats)
+        results.append(_result("render", {"highlights": n_highlights, "clip_sec": 20.0,
+                                          "resolution": "640x360"}, n_highlights, timing))
+    return results
+
+BENCHMARKS = {
+    "segmentation": bench_segmentation,
+    "parse_xml": bench_parse_xml,
+    "text": bench_text,
+    "audio": bench_audio,
+    "video": bench_video,
+    "scorer": bench_scorer,
+    "render": bench_render,
+}
+
+def environment(threads: int) -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    env = {"git_commit": commit, "python": platform.python_version(), "platform": platform.platform(),
+           "processor": platform.processor(), "cpu_count": os.cpu_count(), "threads": threads,
+           "numpy": np.__version__, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    if "torch" in sys.modules:
+        env["torch"] = sys.modules["torch"].__version__
+    return env
+
+def run(components: Optional[List[str]] = None, quick: bool = False, repeats: int = 3, threads: int = 4,
+        work_dir: Optional[str] = None) -> Dict:
+    """
+    Runs the selected component benchmarks on CPU.
+    A component whose dependencies are missing (or that fails) is recorded with
+    its error instead of aborting the suite.
+    Returns: {'environment': {...}, 'results': [...], 'errors': {component: message}}
+    """
+    # CPU only, fixed thread count, so numbers are comparable across machines and commits
+    os.environ["CUDA_VISIBLE_DEVICES"] = ""
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    sizes = SIZES["quick" if quick else "full"]
+    work_dir = work_dir or tempfile.mkdtemp(prefix="rome_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+
+    results, errors = [], {}
+    for name in components or list(BENCHMARKS):
+        print(f"Benchmarking {name}...")
+        try:
+            for r in BENCHMARKS[name](sizes[name], repeats, work_dir):
+                results.append(r)
+                print(f"  {json.dumps(r['params'])}: {r['median_sec'] * 1000:.1f} ms"
+                      + (f" ({r['items_per_sec']:.1f} items/s)" if r["items_per_sec"] else "")
+                      + (f" min cosine {r['min_cosine']:.4f}, mean {r['mean_cosine']:.4f}"
+                         f" (required {r['required_mean_cosine']})" if "min_cosine" in r else ""))
+        except Exception as e:
+            errors[name] = f"{type(e).__name__}: {e}"
+            print(f"  skipped: {errors[name]}")
+    return {"environment": environment(threads), "quick": quick, "results": results, "errors": errors}
+
+def _key(result: Dict) -> str:
+    return result["component"] + json.dumps(result["params"], sort_keys=True)
+
+def compare(current: Dict, baseline: Dict, tolerance: float = 0.2) -> List[Dict]:
+    """
+    Median-time ratios (current / baseline) for cases present in both runs.
+    Returns: one row per case, with 'regression' set when the ratio exceeds 1 + tolerance.
+    """
+    base = {_key(r): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        b = base.get(_key(r))
+        if b is None or b["median_sec"] <= 0:
+            continue
+        ratio = r["median_sec"] / b["median_sec"]
+        rows.append({"component": r["component"], "params": r["params"], "baseline_sec": b["median_sec"],
+                     "current_sec": r["median_sec"], "ratio": ratio, "regression": ratio > 1 + tolerance})
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU benchmark suite for the RoME pipeline components.")
+    parser.add_argument("--components", default=",".join(BENCHMARKS),
+                        help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--quick", action="store_true", help="Smaller scaling sizes")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=4, help="torch intra-op threads")
+    parser.add_argument("--work-dir", default=None, help="Where synthetic inputs are written (default: temp dir)")
+    parser.add_argument("--out", default=None, help=f"Result JSON (default: {BENCHMARK_DIR}/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging a regression")
+    args = parser.parse_args()
+
+    components = [c.strip() for c in args.components.split(",") if c.strip()]
+    unknown = set(components) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown components: {', '.join(sorted(unknown))}")
+
+    report = run(components, quick=args.quick, repeats=args.repeats, threads=args.threads, work_dir=args.work_dir)
+
+    out = args.out or os.path.join(BENCHMARK_DIR, f"{(report['environment']['git_commit'] or 'local')[:12]}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            rows = compare(report, json.load(f), args.tolerance)
+        for row in rows:
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['component']} {json.dumps(row['params'])}: {row['baseline_sec'] * 1000:.1f} ms -> "
+                  f"{row['current_sec'] * 1000:.1f} ms (x{row['ratio']:.2f}){flag}")
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
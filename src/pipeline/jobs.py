@@ -0,0 +1,586 @@
+import os
+import json
+import time
+import socket
+import hashlib
+import sqlite3
+import argparse
+import threading
+import shutil
+import traceback
+import multiprocessing as mp
+from typing import Callable, Dict, List, Optional
+
+JOB_DIR = "data/jobs"
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+# Bump when run_job's output changes, so finished jobs are not reused across versions
+JOB_VERSION = 2
+ARTIFACT_BUDGET_BYTES = 5 * 2**30
+# Workers beat every HEARTBEAT_INTERVAL seconds (also while running a job); a running job
+# whose worker has been silent for HEARTBEAT_TIMEOUT, or whose process on this host is gone,
+# is requeued by the next claim, and failed once MAX_ATTEMPTS workers have died on it
+HEARTBEAT_INTERVAL = 5.0
+HEARTBEAT_TIMEOUT = 60.0
+MAX_ATTEMPTS = 3
+
+class JobLost(Exception):
+    """The worker no longer owns the job it is running (requeued or resubmitted meanwhile)."""
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def job_key(params: Dict) -> str:
+    """Content hash identifying a job: identical inputs and settings give the same id."""
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+class JobQueue:
+    """
+    SQLite-backed highlight job queue shared by the app and worker processes.
+    Job ids are content hashes of (video, transcript, roles, settings), so
+    resubmitting identical work joins the queued/running job or returns the
+    finished one. Workers claim jobs atomically and report per-stage progress,
+    and heartbeat (with their model stats) so jobs of dead workers are requeued.
+    """
+    def __init__(self, job_dir: str = JOB_DIR):
+        self.job_dir = job_dir
+        os.makedirs(job_dir, exist_ok=True)
+        # One connection per process, shared by threads (e.g. Streamlit sessions)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(job_dir, "jobs.sqlite"), timeout=30,
+                                     isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                stage TEXT,
+                progress REAL NOT NULL DEFAULT 0,
+                params TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                worker TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_status_created ON jobs(status, created)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS workers (
+                id TEXT PRIMARY KEY,
+                heartbeat REAL NOT NULL,
+                stats TEXT
+            )
+        """)
+
+    def artifact_dir(self, job_id: str) -> str:
+        return os.path.join(self.job_dir, "artifacts", job_id)
+
+    def submit(self, video_path: str, transcript_path: str, roles: List[str], meeting_id: Optional[str] = None,
+               top_k: int = 3, window_size: float = 30, step_size: float = 30, text_mode: str = "lines",
+               ranking: str = "text", shortlist: int = 20, output: str = "mp4", order: str = "chronological",
+               video_hash: Optional[str] = None, transcript_hash: Optional[str] = None) -> str:
+        """
+        Enqueues a highlight job unless an identical one is queued, running or done
+        (with its artifacts still present). Failed jobs are retried.
+        ranking: 'text' (cosine to the role) or 'cascade' (text shortlist of
+        `shortlist` segments per role, re-ranked by the fusion model on audio/video too).
+        output: 'mp4' (one reel file per role) or 'hls' (one cached fMP4 fragment per
+        highlight plus an HLS playlist, reported as partial results while rendering),
+        with highlights in 'chronological' or 'ranked' order.
+        Returns: the job id.
+        """
+        key_params = {
+            "video": video_hash or file_sha256(video_path),
+            "transcript": transcript_hash or file_sha256(transcript_path),
+            "roles": list(roles), "meeting_id": meeting_id, "top_k": top_k,
+            "window_size": window_size, "step_size": step_size, "text_mode": text_mode,
+            "ranking": ranking, "shortlist": shortlist, "output": output, "order": order,
+            "version": JOB_VERSION,
+        }
+        job_id = job_key(key_params)
+        params = dict(key_params, video_path=video_path, transcript_path=transcript_path)
+        now = time.time()
+
+        with self._lock:
+            self._submit(job_id, params, now)
+        return job_id
+
+    def _submit(self, job_id: str, params: Dict, now: float):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._conn.execute("SELECT status, result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                self._conn.execute(
+                    "INSERT INTO jobs (id, status, params, created, updated) VALUES (?, ?, ?, ?, ?)",
+                    (job_id, QUEUED, json.dumps(params), now, now))
+            elif row[0] == FAILED or (row[0] == DONE and not _artifacts_exist(json.loads(row[1]))):
+                # Latest paths, since the previous upload's files may be gone; a fresh
+                # attempt budget, or a job failed by dead workers would fail on its first claim
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, stage = NULL, progress = 0, params = ?, result = NULL, "
+                    "error = NULL, worker = NULL, attempts = 0, updated = ? WHERE id = ?",
+                    (QUEUED, json.dumps(params), now, job_id))
+            elif row[0] == DONE:
+                # Served from artifacts; mark as recently used for prune_artifacts
+                self._conn.execute("UPDATE jobs SET updated = ? WHERE id = ?", (now, job_id))
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def claim(self, worker: str) -> Optional[Dict]:
+        """
+        Atomically takes the oldest queued job for worker, after requeueing running
+        jobs whose worker died. Returns: the job, or None if the queue is empty.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_stale(time.time())
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, worker = ?, stage = 'starting', progress = 0, result = NULL, "
+                        "attempts = attempts + 1, updated = ? WHERE id = ?",
+                        (RUNNING, worker, time.time(), row[0]))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row[0]) if row is not None else None
+
+    def _requeue_stale(self, now: float) -> int:
+        """Requeues (or fails, after MAX_ATTEMPTS) running jobs of dead workers. Call inside a transaction."""
+        stale = []
+        for job_id, worker, attempts, updated, heartbeat in self._conn.execute(
+                "SELECT j.id, j.worker, j.attempts, j.updated, w.heartbeat FROM jobs j "
+                "LEFT JOIN workers w ON w.id = j.worker WHERE j.status = ?", (RUNNING,)).fetchall():
+            if not _worker_alive(worker, heartbeat if heartbeat is not None else updated, now):
+                stale.append((job_id, worker, attempts))
+
+        for job_id, worker, attempts in stale:
+            if attempts >= MAX_ATTEMPTS:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ? AND status = ?",
+                    (FAILED, f"Worker {worker} died while running the job ({attempts} attempts)", now, job_id, RUNNING))
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, worker = NULL, updated = ? WHERE id = ? AND status = ?",
+                    (QUEUED, now, job_id, RUNNING))
+        self._conn.execute("DELETE FROM workers WHERE heartbeat < ?", (now - HEARTBEAT_TIMEOUT,))
+        return len(stale)
+
+    def heartbeat(self, worker: str, stats: Optional[Dict] = None):
+        """Marks worker as alive; stats (e.g. ModelRegistry.stats()) replace the stored ones if given."""
+        if stats is None:
+            self._execute("INSERT INTO workers (id, heartbeat) VALUES (?, ?) "
+                          "ON CONFLICT(id) DO UPDATE SET heartbeat = excluded.heartbeat", (worker, time.time()))
+        else:
+            self._execute("INSERT OR REPLACE INTO workers (id, heartbeat, stats) VALUES (?, ?, ?)",
+                          (worker, time.time(), json.dumps(stats)))
+
+    def remove_worker(self, worker: str):
+        self._execute("DELETE FROM workers WHERE id = ?", (worker,))
+
+    def worker_stats(self) -> Dict[str, Optional[Dict]]:
+        """Latest reported stats of each live worker."""
+        now = time.time()
+        rows = self._execute("SELECT id, heartbeat, stats FROM workers ORDER BY id")
+        return {worker: json.loads(stats) if stats else None
+                for worker, heartbeat, stats in rows if _worker_alive(worker, heartbeat, now)}
+
+    def _execute(self, sql: str, args=()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    def _update(self, sql: str, args=()) -> int:
+        """Returns: number of rows changed."""
+        with self._lock:
+            return self._conn.execute(sql, args).rowcount
+
+    # report/complete/fail only apply while worker still owns the running job: once it has been
+    # requeued (worker presumed dead) or resubmitted, a late update must not clobber the new run.
+    # Each returns whether the update was applied.
+
+    def report(self, job_id: str, worker: str, stage: str, progress: float, partial: Optional[Dict] = None) -> bool:
+        """Updates a running job's progress; partial (e.g. highlights ready so far) is stored as its result."""
+        if partial is None:
+            return self._update(
+                "UPDATE jobs SET stage = ?, progress = ?, updated = ? WHERE id = ? AND worker = ? AND status = ?",
+                (stage, progress, time.time(), job_id, worker, RUNNING)) > 0
+        return self._update(
+            "UPDATE jobs SET stage = ?, progress = ?, result = ?, updated = ? WHERE id = ? AND worker = ? AND status = ?",
+            (stage, progress, json.dumps(partial), time.time(), job_id, worker, RUNNING)) > 0
+
+    def complete(self, job_id: str, worker: str, result: Dict) -> bool:
+        return self._update(
+            "UPDATE jobs SET status = ?, stage = 'done', progress = 1, result = ?, updated = ? "
+            "WHERE id = ? AND worker = ? AND status = ?",
+            (DONE, json.dumps(result), time.time(), job_id, worker, RUNNING)) > 0
+
+    def fail(self, job_id: str, worker: str, error: str) -> bool:
+        return self._update(
+            "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ? AND worker = ? AND status = ?",
+            (FAILED, error, time.time(), job_id, worker, RUNNING)) > 0
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        rows = self._execute(
+            "SELECT id, status, stage, progress, params, result, error, worker, attempts, created, updated "
+            "FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        row = rows[0]
+        job = dict(zip(("id", "status", "stage", "progress", "params", "result", "error", "worker",
+                        "attempts", "created", "updated"), row))
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def requeue_orphans(self) -> int:
+        """Puts running jobs whose worker is gone back in the queue (claim also does this). Returns: count."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                count = self._requeue_stale(time.time())
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return count
+
+    def active_inputs(self) -> List[str]:
+        """Input file paths of queued and running jobs (must not be garbage-collected)."""
+        paths = []
+        for (params,) in self._execute("SELECT params FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)):
+            params = json.loads(params)
+            paths += [params["video_path"], params["transcript_path"]]
+        return paths
+
+    def active_fragments(self) -> List[str]:
+        """Highlight fragment directories in the (partial) results of queued and running jobs."""
+        dirs = []
+        for (result,) in self._execute("SELECT result FROM jobs WHERE status IN (?, ?) AND result IS NOT NULL",
+                                       (QUEUED, RUNNING)):
+            for role in json.loads(result).get("roles", []):
+                dirs += [f["dir"] for f in role.get("fragments", [])]
+        return dirs
+
+    def prune_artifacts(self, max_bytes: int = ARTIFACT_BUDGET_BYTES) -> int:
+        """
+        Deletes the least recently used finished jobs (rows and artifacts) until
+        all artifacts fit in max_bytes. Resubmitting a deleted job runs it again.
+        Returns: number of jobs deleted.
+        """
+        done = self._execute("SELECT id FROM jobs WHERE status = ? ORDER BY updated", (DONE,))
+        sizes = [(job_id, _dir_bytes(self.artifact_dir(job_id))) for (job_id,) in done]
+        total = sum(size for _, size in sizes)
+        pruned = 0
+        for job_id, size in sizes:
+            if total <= max_bytes:
+                break
+            self._execute("DELETE FROM jobs WHERE id = ? AND status = ?", (job_id, DONE))
+            shutil.rmtree(self.artifact_dir(job_id), ignore_errors=True)
+            total -= size
+            pruned += 1
+        return pruned
+
+    def stats(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        return dict(self._execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+
+    def close(self):
+        self._conn.close()
+
+def _artifacts_exist(result: Optional[Dict]) -> bool:
+    if not result:
+        return False
+    from src.app.utils import fragments_exist
+    return all(os.path.exists(r["video"]) and fragments_exist(r.get("fragments", []))
+               for r in result["roles"] if r.get("video"))
+
+def _dir_bytes(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+def _worker_alive(worker: Optional[str], last_seen: float, now: float) -> bool:
+    """A worker ("host:pid") on this host is alive while its process is; elsewhere only its heartbeat tells."""
+    worker_host, _, pid = (worker or "").rpartition(":")
+    if worker_host == socket.gethostname() and pid.isdigit():
+        return _pid_alive(int(pid))
+    return last_seen >= now - HEARTBEAT_TIMEOUT
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def run_job(params: Dict, artifact_dir: str, report: Callable[..., None]) -> Dict:
+    """
+    The highlight pipeline for one (video, transcript, roles) job: load, segment,
+    embed, score every role at once, then render one reel per role into artifact_dir.
+    HLS jobs pass the highlights rendered so far to report(stage, progress, partial).
+    Returns: {'n_segments', 'roles': [{'role', 'video', 'segments'}], 'ranking', 'profile'};
+    HLS roles also have 'playlist' (same as 'video') and 'fragments'.
+    """
+    import numpy as np
+    from src.data.loader import MeetingLoader, SegmentGenerator
+    from src.models.registry import get_registry
+    from src.models.scoring import score_roles
+    from src.models.cascade import cascade_rank, scorer_mismatch
+    from src.pipeline.precompute import load_precomputed
+    from src.pipeline.profiling import StageProfiler
+    from src.app.utils import generate_highlight_video, generate_highlight_playlist
+
+    profiler = StageProfiler("job")
+    roles = params["roles"]
+    report("loading transcript", 0.05)
+    loader = MeetingLoader(params["video_path"], params["transcript_path"])
+    with profiler.stage("load_transcript") as rec:
+        transcript_df = loader.load_transcript(cache=True)
+        rec["items"] = len(transcript_df)
+
+    report("segmenting", 0.1)
+    window_size, step_size = params["window_size"], params["step_size"]
+    text_mode = params.get("text_mode", "window")
+    precomputed = None
+    if params.get("meeting_id"):
+        with profiler.stage("load_precomputed"):
+            precomputed = load_precomputed(params["meeting_id"], transcript_df, window_size, step_size,
+                                           loader.transcript_key, text_mode=text_mode)
+    if precomputed is not None:
+        segments, features = precomputed
+    else:
+        with profiler.stage("segmentation") as rec:
+            segmenter = SegmentGenerator(window_size_sec=window_size, step_size_sec=step_size)
+            segments = segmenter.segment_meeting(transcript_df['end_time'].max(), transcript_df)
+            rec["items"] = len(segments)
+        features = {}
+
+    report("embedding", 0.2)
+    registry = get_registry()
+    with profiler.stage("role_encoding", items=len(roles)):
+        role_embs = registry.role_encoder().encode_roles(roles)
+    if 'text_emb' in features:
+        seg_embs = features['text_emb']
+    else:
+        with profiler.stage("text_features", items=len(segments)):
+            # 'lines' embeds each transcript line once (cached), so other window settings cost no model calls
+            seg_embs = registry.text_extractor().extract_segments(segments, text_mode)
+
+    report("scoring", 0.5)
+    if params.get("ranking", "text") == "cascade":
+        scorer = registry.scorer()
+        mismatch = scorer_mismatch(scorer.meta, text_mode, registry.text_extractor().cache_name)
+        if mismatch:
+            # Re-ranking with untrained audio/video weights or other text embeddings would be noise
+            raise ValueError(f"Cascade ranking unavailable: {mismatch}")
+
+        def fetch(idx):
+            # Audio/video only for shortlisted segments, unless precomputed for the whole meeting
+            starts, ends = segments.start_time[idx], segments.end_time[idx]
+            if 'audio_emb' in features:
+                audio = features['audio_emb'][idx]
+            else:
+                with profiler.stage("audio_features", items=len(idx)):
+                    audio = registry.audio_extractor().extract_ranges(loader, starts, ends)
+            if 'video_emb' in features:
+                video = features['video_emb'][idx]
+            else:
+                report(f"video features ({len(idx)}/{len(segments)} segments)", 0.55)
+                with profiler.stage("video_features", items=len(idx)):
+                    video = registry.video_extractor().extract_meeting(loader, starts, ends)
+            return audio, video
+
+        with profiler.stage("cascade_scoring", items=len(segments) * len(roles)):
+            role_scores = cascade_rank(role_embs, seg_embs, scorer, fetch,
+                                       top_k=params["top_k"], shortlist=params["shortlist"])
+        ranking = {"mode": "cascade", "shortlist": params["shortlist"],
+                   "feature_segments": len(role_scores["candidates"])}
+    else:
+        with profiler.stage("scoring", items=len(segments) * len(roles)):
+            role_scores = score_roles(role_embs, seg_embs, top_k=params["top_k"])
+        ranking = {"mode": "text"}
+
+    os.makedirs(artifact_dir, exist_ok=True)
+    hls = params.get("output", "mp4") == "hls"
+    ranked = params.get("order", "chronological") == "ranked"
+    outputs = []
+    for r, role in enumerate(roles):
+        report(f"rendering {r + 1}/{len(roles)}", 0.6 + 0.4 * r / len(roles))
+        top_idx = role_scores['top_k'][r]
+        if not (hls and ranked):
+            # Sort back by time for the video
+            top_idx = top_idx[np.argsort(segments.start_time[top_idx], kind='stable')]
+        top_segments = segments.to_records(top_idx)
+        for seg, i in zip(top_segments, top_idx):
+            seg['score'] = float(role_scores['scores'][r, i])
+            seg['start_time'], seg['end_time'] = float(seg['start_time']), float(seg['end_time'])
+
+        # Don't cut mid-word when word timings are available (AMI XML)
+        if loader.words is not None and top_segments:
+            cut_starts, cut_ends = loader.words.snap([s['start_time'] for s in top_segments],
+                                                     [s['end_time'] for s in top_segments])
+            for seg, s, e in zip(top_segments, cut_starts, cut_ends):
+                seg['start_time'], seg['end_time'] = float(s), float(e)
+
+        if hls:
+            playlist = os.path.join(artifact_dir, f"role{r}.m3u8")
+            output = {"role": role, "video": playlist, "playlist": playlist, "fragments": [],
+                      "segments": top_segments}
+
+            def on_fragment(i, fragment, r=r, output=output, n=len(top_segments)):
+                # Earlier highlights are playable while the rest are cut
+                output["fragments"].append(fragment)
+                progress = 0.6 + 0.4 * (r + (i + 1) / max(n, 1)) / len(roles)
+                report(f"rendering {r + 1}/{len(roles)}", progress,
+                       {"n_segments": len(segments), "roles": outputs + [output], "ranking": ranking})
+
+            with profiler.stage("render_hls", items=len(top_segments)):
+                generate_highlight_playlist(params["video_path"], top_segments, playlist,
+                                            order=params.get("order", "chronological"),
+                                            source_key=params["video"], on_fragment=on_fragment)
+            outputs.append(output)
+            continue
+
+        video_out = os.path.join(artifact_dir, f"role{r}_highlight_reel.mp4")
+        with profiler.stage("render", items=len(top_segments)):
+            success = generate_highlight_video(params["video_path"], top_segments, video_out)
+        outputs.append({"role": role, "video": video_out if success else None, "segments": top_segments})
+
+    return {"n_segments": len(segments), "roles": outputs, "ranking": ranking, "profile": profiler.summary()}
+
+def worker_loop(job_dir: str = JOB_DIR, poll_interval: float = 0.5, max_jobs: Optional[int] = None,
+                threads: Optional[int] = None):
+    """
+    Loads the models, then claims and runs jobs until max_jobs have been processed
+    (forever by default). A background thread heartbeats with the model stats.
+    threads: CPU threads for model inference (torch/OpenMP/MKL), so that
+    concurrent workers share the cores instead of each using all of them.
+    """
+    if threads is not None:
+        # Before torch is imported, so OpenMP/MKL pools are sized too
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+            os.environ[var] = str(threads)
+        import torch
+        torch.set_num_threads(threads)
+    from src.models.registry import get_registry
+
+    queue = JobQueue(job_dir)
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    queue.heartbeat(worker)
+    # Load before the first claim, so no job waits on model loading
+    registry = get_registry()
+    registry.warm_up()
+    stop = threading.Event()
+
+    def beat():
+        # Separate thread: jobs can spend minutes in a single stage without reporting
+        while True:
+            queue.heartbeat(worker, registry.stats())
+            if stop.wait(HEARTBEAT_INTERVAL):
+                break
+
+    beater = threading.Thread(target=beat, name="rome-heartbeat", daemon=True)
+    beater.start()
+    try:
+        _run_jobs(queue, worker, poll_interval, max_jobs)
+    finally:
+        stop.set()
+        beater.join()
+        queue.remove_worker(worker)
+        queue.close()
+
+def _run_jobs(queue: JobQueue, worker: str, poll_interval: float, max_jobs: Optional[int]):
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        job = queue.claim(worker)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        print(f"[{worker}] Running job {job['id']}")
+
+        def report(stage, progress, partial=None, job_id=job["id"]):
+            if not queue.report(job_id, worker, stage, progress, partial):
+                raise JobLost(job_id)
+
+        try:
+            result = run_job(job["params"], queue.artifact_dir(job["id"]), report)
+            if queue.complete(job["id"], worker, result):
+                print(f"[{worker}] Finished job {job['id']}")
+            else:
+                print(f"[{worker}] Job {job['id']} was taken over meanwhile; result discarded")
+        except JobLost:
+            print(f"[{worker}] Job {job['id']} was taken over meanwhile; stopped")
+        except Exception as e:
+            if queue.fail(job["id"], worker, f"{type(e).__name__}: {e}\n{traceback.format_exc()}"):
+                print(f"[{worker}] Job {job['id']} failed: {e}")
+            else:
+                print(f"[{worker}] Job {job['id']} failed after being taken over: {e}")
+        done += 1
+
+def start_workers(n_workers: int, job_dir: str = JOB_DIR, supervise_interval: float = HEARTBEAT_INTERVAL) -> List[mp.Process]:
+    """
+    Starts n_workers daemon worker processes (spawned, so they don't inherit
+    the caller's threads or loaded models). Each worker loads its own models
+    once and reuses them across jobs. Orphaned running jobs are requeued first,
+    and a supervisor thread replaces workers that die (the returned list is
+    updated in place). The CPU cores are split evenly between the workers.
+    """
+    queue = JobQueue(job_dir)
+    requeued = queue.requeue_orphans()
+    if requeued:
+        print(f"Requeued {requeued} interrupted jobs")
+    queue.close()
+
+    ctx = mp.get_context("spawn")
+    threads = max(1, (os.cpu_count() or 1) // n_workers)
+    workers = [_spawn_worker(ctx, job_dir, threads) for _ in range(n_workers)]
+    threading.Thread(target=_supervise, args=(ctx, workers, job_dir, threads, supervise_interval),
+                     name="rome-worker-supervisor", daemon=True).start()
+    return workers
+
+def _spawn_worker(ctx, job_dir: str, threads: int) -> mp.Process:
+    p = ctx.Process(target=worker_loop, args=(job_dir,), kwargs={"threads": threads}, daemon=True)
+    p.start()
+    return p
+
+def _supervise(ctx, workers: List[mp.Process], job_dir: str, threads: int, interval: float):
+    while True:
+        time.sleep(interval)
+        for i, p in enumerate(workers):
+            if not p.is_alive():
+                # Its running job (if any) is requeued by the next claim
+                print(f"Worker {p.pid} exited with code {p.exitcode}; starting a replacement")
+                workers[i] = _spawn_worker(ctx, job_dir, threads)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run RoME highlight job workers.")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--job-dir", default=JOB_DIR)
+    args = parser.parse_args()
+
+    workers = start_workers(args.workers, args.job_dir)
+    print(f"Started {len(workers)} workers on {args.job_dir}")
+    # Workers are daemons replaced by the supervisor thread; just keep the process alive
+    while True:
+        time.sleep(3600)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import heapq
+import itertools
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Optional
+
+from src.data.loader import SegmentGenerator
+from src.models.scoring import normalize_rows
+
+class LiveMeetingSession:
+    """
+    Incremental highlights for a meeting that is still running.
+    Transcript rows (and optionally audio chunks) are pushed as they arrive.
+    A window [start, start + window_size] closes once the watermark (latest
+    row start time, or an explicit clock) passes its end and, with an
+    audio_extractor, once the audio pushed so far covers it too. Only newly
+    closed windows are embedded and scored, and a running top-k is kept per role.
+    Buffers only hold data that can still overlap an open window, so the
+    per-update cost stays constant as the meeting grows.
+    Windows follow SegmentGenerator.segment_meeting (start = i * step_size).
+    With text_mode='lines', each line is embedded once when its first window
+    closes and reused by every later (overlapping) window.
+    """
+    def __init__(self, text_extractor, role_encoder, roles: List[str], window_size_sec: int = 30,
+                 step_size_sec: int = 15, top_k: int = 3, audio_extractor=None, text_mode: str = "window"):
+        self.text_extractor = text_extractor
+        self.text_mode = text_mode
+        self.roles = list(roles)
+        self.role_embs = normalize_rows(role_encoder.encode_roles(self.roles))
+        self.segmenter = SegmentGenerator(window_size_sec, step_size_sec)
+        self.top_k = top_k
+        self.audio_extractor = audio_extractor
+
+        self._next_window = 0 # Index of the oldest window not yet emitted
+        self._watermark = 0.0
+        self._lines: List[tuple] = []
+        self._line_embs: List[Optional[np.ndarray]] = [] # Parallel to _lines, filled in lines mode
+        # Audio chunks as pushed (no per-chunk concatenation of the whole buffer)
+        self._audio_chunks: List[np.ndarray] = []
+        self._audio_samples = 0 # Total samples in _audio_chunks
+        self._audio_dropped = 0 # Samples pruned from the front (integer, so no drift)
+        self._audio_start = 0.0 # Meeting time of self._audio_chunks[0][0]
+        self._heaps: List[list] = [[] for _ in self.roles]
+        self._seq = itertools.count()
+        self.n_segments = 0
+
+    def _window(self, i: int):
+        start = i * self.segmenter.step_size
+        return start, start + self.segmenter.window_size
+
+    def add_transcript_rows(self, rows, now: Optional[float] = None) -> List[Dict]:
+        """
+        Ingests new transcript rows (DataFrame or list of dicts with start_time, end_time,
+        speaker, text), then emits every window that closed.
+        Returns: the newly closed segments with per-role 'scores'.
+        """
+        if isinstance(rows, pd.DataFrame):
+            rows = rows.to_dict('records')
+        for row in rows:
+            self._lines.append((float(row['start_time']), float(row['end_time']), row.get('speaker'), str(row['text'])))
+            self._line_embs.append(None)
+            self._watermark = max(self._watermark, float(row['start_time']))
+        if now is not None:
+            self._watermark = max(self._watermark, now)
+        return self._emit(self._closed_windows())
+
+    def add_audio(self, chunk: np.ndarray) -> List[Dict]:
+        """
+        Appends the next block of meeting audio (mono, at audio_extractor.sr), then
+        emits the windows the transcript already closed that the audio now covers.
+        Returns: the newly closed segments with per-role 'scores'.
+        """
+        if self.audio_extractor is None:
+            raise ValueError("LiveMeetingSession was created without an audio_extractor")
+        chunk = np.asarray(chunk, dtype=np.float32)
+        if len(chunk):
+            self._audio_chunks.append(chunk)
+            self._audio_samples += len(chunk)
+        return self._emit(self._closed_windows())
+
+    def _audio_end(self) -> float:
+        """Meeting time up to which audio has arrived."""
+        return self._audio_start + self._audio_samples / self.audio_extractor.sr
+
+    def finish(self, duration: Optional[float] = None) -> List[Dict]:
+        """
+        Closes the remaining windows at the end of the meeting (last one truncated to duration),
+        whether or not their audio arrived (see the segments' 'audio_complete').
+        """
+        if duration is None:
+            duration = max((end for _, end, _, _ in self._lines), default=self._watermark)
+        windows = []
+        i = self._next_window
+        while self._window(i)[0] < duration:
+            start, end = self._window(i)
+            windows.append((start, min(end, duration)))
+            i += 1
+        return self._emit(windows)
+
+    def _closed_windows(self) -> List[tuple]:
+        windows = []
+        i = self._next_window
+        # Windows whose audio hasn't arrived yet wait, instead of getting truncated features
+        audio_end = self._audio_end() if self.audio_extractor is not None else np.inf
+        while self._window(i)[1] < self._watermark and self._window(i)[1] <= audio_end:
+            windows.append(self._window(i))
+            i += 1
+        return windows
+
+    def _emit(self, windows: List[tuple]) -> List[Dict]:
+        if not windows:
+            return []
+        self._next_window += len(windows)
+
+        starts = np.array([w[0] for w in windows], dtype=np.float64)
+        ends = np.array([w[1] for w in windows], dtype=np.float64)
+        lines_df = pd.DataFrame(self._lines, columns=['start_time', 'end_time', 'speaker', 'text'])
+        segments = self.segmenter.segment_windows(starts, ends, lines_df)
+
+        # Embed and score only the new segments: (N_roles, N_new)
+        if self.text_mode == "lines":
+            seg_embs = self.text_extractor.extract_segments(segments, "lines", self._embed_lines())
+        else:
+            seg_embs = self.text_extractor.extract_segments(segments, self.text_mode)
+        scores = self.role_embs @ normalize_rows(seg_embs).T
+
+        new_segments = segments.to_records()
+        for j, seg in enumerate(new_segments):
+            seg['scores'] = {role: float(scores[r, j]) for r, role in enumerate(self.roles)}
+            if self.audio_extractor is not None:
+                seg['audio_emb'] = self._audio_features(seg['start_time'], seg['end_time'])
+                seg['audio_complete'] = bool(seg['end_time'] <= self._audio_end())
+            for r in range(len(self.roles)):
+                item = (float(scores[r, j]), next(self._seq), seg)
+                if len(self._heaps[r]) < self.top_k:
+                    heapq.heappush(self._heaps[r], item)
+                else:
+                    heapq.heappushpop(self._heaps[r], item)
+        self.n_segments += len(new_segments)
+        self._prune()
+        return new_segments
+
+    def _embed_lines(self) -> np.ndarray:
+        """Embeds lines not seen before. Returns: (N_lines, D) embeddings of the buffered lines."""
+        missing = [k for k, emb in enumerate(self._line_embs) if emb is None]
+        if missing:
+            new_embs = self.text_extractor.extract_lines([self._lines[k][3] for k in missing])
+            for k, emb in zip(missing, new_embs):
+                self._line_embs[k] = emb
+        if not self._line_embs:
+            return np.zeros((0, self.role_embs.shape[1]), dtype=np.float32)
+        return np.stack(self._line_embs)
+
+    def _audio_features(self, start: float, end: float) -> np.ndarray:
+        sr = self.audio_extractor.sr
+        lo = max(int((start - self._audio_start) * sr), 0)
+        hi = max(int((end - self._audio_start) * sr), 0)
+        # Concatenate only the chunks overlapping [lo, hi)
+        parts, offset = [], 0
+        for chunk in self._audio_chunks:
+            if offset >= hi:
+                break
+            if offset + len(chunk) > lo:
+                parts.append(chunk[max(lo - offset, 0):hi - offset])
+            offset += len(chunk)
+        y = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+        return self.audio_extractor.extract_segment_features(y)
+
+    def _prune(self):
+        # Drop lines and audio that can no longer overlap an open window
+        oldest_start = self._window(self._next_window)[0]
+        keep = [k for k, line in enumerate(self._lines) if line[1] >= oldest_start]
+        self._lines = [self._lines[k] for k in keep]
+        self._line_embs = [self._line_embs[k] for k in keep]
+        if self.audio_extractor is not None:
+            drop = min(int((oldest_start - self._audio_start) * self.audio_extractor.sr), self._audio_samples)
+            if drop > 0:
+                self._audio_dropped += drop
+                self._audio_start = self._audio_dropped / self.audio_extractor.sr
+                self._audio_samples -= drop
+                # Whole chunks go; a partially needed one is cut as a view, without copying
+                while drop and len(self._audio_chunks[0]) <= drop:
+                    drop -= len(self._audio_chunks.pop(0))
+                if drop:
+                    self._audio_chunks[0] = self._audio_chunks[0][drop:]
+
+    def top(self, role: str) -> List[Dict]:
+        """Current top-k segments for a role, best first."""
+        heap = self._heaps[self.roles.index(role)]
+        return [dict(seg, score=score) for score, _, seg in sorted(heap, key=lambda x: (-x[0], x[1]))]
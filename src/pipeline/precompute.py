@@ -0,0 +1,294 @@
+import os
+import glob
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Optional, Tuple
+
+from src.data.loader import MeetingLoader, SegmentGenerator, SegmentTable
+from src.data.ami import SPEAKER_WORDS_RE
+from src.data.transcript_cache import transcript_key
+from src.pipeline.profiling import StageProfiler
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov')
+TRANSCRIPT_EXTENSIONS = ('.csv', '.json', '.xml', '.vtt', '.srt')
+FEATURE_DIR = "data/features"
+
+def find_meetings(data_dir: str) -> List[Tuple[str, str]]:
+    """
+    Pairs every video under data_dir with a transcript sharing its meeting id
+    (e.g. IS1001a.mp4 + IS1001a.transcript.xml).
+    If a meeting has several transcript files, the choice is deterministic:
+    earlier extensions in TRANSCRIPT_EXTENSIONS first, then NXT per-speaker words
+    files (the parser merges all speakers from any one of them), then by path.
+    Returns: list of (video_path, transcript_path).
+    """
+    def rank(path):
+        ext = os.path.splitext(path)[1].lower()
+        return (TRANSCRIPT_EXTENSIONS.index(ext), SPEAKER_WORDS_RE.match(os.path.basename(path)) is None, path)
+
+    transcripts = {}
+    for ext in TRANSCRIPT_EXTENSIONS:
+        for path in glob.glob(os.path.join(data_dir, '**', f'*{ext}'), recursive=True):
+            meeting_id = os.path.basename(path).split('.')[0]
+            if meeting_id not in transcripts or rank(path) < rank(transcripts[meeting_id]):
+                transcripts[meeting_id] = path
+
+    meetings = []
+    for ext in VIDEO_EXTENSIONS:
+        for path in sorted(glob.glob(os.path.join(data_dir, '**', f'*{ext}'), recursive=True)):
+            meeting_id = os.path.basename(path).split('.')[0]
+            if meeting_id in transcripts:
+                meetings.append((path, transcripts[meeting_id]))
+    return meetings
+
+def feature_path(out_dir: str, meeting_id: str) -> str:
+    return os.path.join(out_dir, f"{meeting_id}.npz")
+
+def stored_text_mode(data) -> str:
+    # Feature files written before line-level pooling embedded whole windows
+    return str(data['text_mode']) if 'text_mode' in data else "window"
+
+def stored_transcript_key(data) -> Optional[str]:
+    # Feature files written before keys were stored can't be matched to a transcript
+    return str(data['transcript_key']) if 'transcript_key' in data else None
+
+def stored_audio_version(data) -> int:
+    # Feature files written before versioning used librosa's relative dB floor
+    return int(data['audio_version']) if 'audio_version' in data else 1
+
+def is_complete(out_dir: str, meeting_id: str, window_size: float, step_size: float,
+                text_mode: Optional[str] = None, transcript: Optional[str] = None,
+                audio_version: Optional[int] = None) -> bool:
+    """
+    True if a feature file exists for this meeting with the same window config
+    (and text mode, transcript content key from transcript_key(), and audio
+    feature version of any stored audio features, if given).
+    """
+    path = feature_path(out_dir, meeting_id)
+    if not os.path.exists(path):
+        return False
+    with np.load(path) as data:
+        if text_mode is not None and stored_text_mode(data) != text_mode:
+            return False
+        if transcript is not None and stored_transcript_key(data) != transcript:
+            return False
+        if audio_version is not None and 'audio_emb' in data and stored_audio_version(data) != audio_version:
+            return False
+        return float(data['window_size']) == window_size and float(data['step_size']) == step_size
+
+def prepare_meeting(video_path: str, transcript_path: str, window_size: float, step_size: float,
+                    with_audio: bool = True) -> Dict:
+    """
+    CPU-bound part of the pipeline, run in a worker process:
+    transcript parsing, segmentation and audio decoding + MFCC pooling.
+    Stage timings are returned under "profile" for the parent's StageProfiler.
+    """
+    profiler = StageProfiler("precompute")
+    loader = MeetingLoader(video_path, transcript_path)
+    with profiler.stage("load_transcript") as rec:
+        transcript_df = loader.load_transcript(cache=True)
+        rec["items"] = len(transcript_df)
+
+    with profiler.stage("segmentation") as rec:
+        # Same duration rule as the app so precomputed segments line up with it
+        duration = transcript_df['end_time'].max()
+        segments = SegmentGenerator(window_size_sec=window_size, step_size_sec=step_size).segment_meeting(duration, transcript_df)
+        rec["items"] = len(segments)
+
+    prepared = {
+        "meeting_id": loader.meeting_id,
+        # Segments index rows of exactly this transcript; load_precomputed checks it
+        "transcript_key": np.str_(loader.transcript_key),
+        "start_time": segments.start_time,
+        "end_time": segments.end_time,
+        "text": np.array(segments.text, dtype=str),
+        "row_ptr": segments.row_ptr,
+        "row_index": segments.row_index,
+        # Popped by the parent; used for line-level text embeddings
+        "line_text": transcript_df['text'].astype(str).to_numpy(dtype=str),
+    }
+    if with_audio:
+        from src.features.audio import AudioFeatureExtractor, AUDIO_FEATURE_VERSION
+        audio_extractor = AudioFeatureExtractor()
+        with profiler.stage("audio_decode"):
+            y, _ = loader.load_audio(sr=audio_extractor.sr)
+        if y is not None:
+            with profiler.stage("audio_features", items=len(segments)):
+                prepared["audio_emb"] = audio_extractor.extract_meeting(y, segments.start_time, segments.end_time)
+                prepared["audio_version"] = np.int64(AUDIO_FEATURE_VERSION)
+    prepared["profile"] = profiler.records
+    return prepared
+
+def save_features(out_dir: str, meeting_id: str, arrays: Dict):
+    """Writes the meeting's feature file atomically, so an interrupted run never leaves a partial file."""
+    os.makedirs(out_dir, exist_ok=True)
+    path = feature_path(out_dir, meeting_id)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+def load_precomputed(meeting_id: str, transcript_df: pd.DataFrame, window_size: float, step_size: float,
+                     transcript: str, out_dir: str = FEATURE_DIR,
+                     text_mode: Optional[str] = None) -> Optional[Tuple[SegmentTable, Dict[str, np.ndarray]]]:
+    """
+    Loads precomputed segments and features for a meeting, if they exist for this
+    window config and were computed from this transcript (transcript: its
+    transcript_key(), e.g. MeetingLoader.transcript_key). Meeting ids come from
+    file names, so another upload with the same name gets None, not another
+    meeting's segments.
+    If text_mode is given and the file was written with another one, 'text_emb' is left out;
+    'audio_emb' is left out if it comes from another AUDIO_FEATURE_VERSION.
+    Returns: (SegmentTable, {'text_emb': ..., 'audio_emb': ..., 'video_emb': ...}) or None.
+    """
+    from src.features.audio import AUDIO_FEATURE_VERSION
+
+    if not is_complete(out_dir, meeting_id, window_size, step_size, transcript=transcript):
+        return None
+    with np.load(feature_path(out_dir, meeting_id)) as data:
+        segments = SegmentTable(data['start_time'], data['end_time'], data['text'].tolist(),
+                                data['row_ptr'], data['row_index'], transcript_df)
+        features = {k: data[k] for k in ('text_emb', 'audio_emb', 'video_emb') if k in data}
+        if text_mode is not None and stored_text_mode(data) != text_mode:
+            features.pop('text_emb', None)
+        if stored_audio_version(data) != AUDIO_FEATURE_VERSION:
+            features.pop('audio_emb', None)
+    return segments, features
+
+def index_config(arrays) -> Dict:
+    """The embedding configuration of a feature file (or prepared arrays), as recorded by SegmentIndex."""
+    return {
+        "text_mode": stored_text_mode(arrays),
+        "window_size": float(arrays["window_size"]),
+        "step_size": float(arrays["step_size"]),
+        "text_model": str(arrays["text_model"]) if "text_model" in arrays else None,
+    }
+
+def index_meeting(index, meeting_id: str, arrays: Dict):
+    """
+    Adds a meeting's segment text embeddings to a SegmentIndex. No-op if it is
+    indexed with the same configuration; replaces it if indexed with another.
+    """
+    if index.add(meeting_id, arrays["start_time"], arrays["end_time"], arrays["text_emb"], arrays["text"].tolist(),
+                 config=index_config(arrays)):
+        print(f"Indexed {meeting_id}")
+
+def run(data_dir: str, out_dir: str = FEATURE_DIR, window_size: float = 30, step_size: float = 30,
+        workers: int = 4, with_audio: bool = True, with_video: bool = False, index_dir: Optional[str] = None,
+        profiler: Optional[StageProfiler] = None, text_mode: str = "lines") -> StageProfiler:
+    """
+    Precomputes segments and text/audio/video features for every meeting in data_dir.
+    Decoding runs in a process pool while the main process runs batched model
+    inference on the meetings that are ready. Meetings that already have a
+    matching feature file are skipped, so the run can be resumed at any time.
+    If index_dir is given, every meeting is also added to the cross-meeting SegmentIndex.
+    text_mode 'lines' embeds each transcript line once and pools lines per window
+    (see TextFeatureExtractor.extract_segments); 'window' embeds the joined window text.
+    Returns: the StageProfiler holding per-stage timings of workers and main process.
+    """
+    from src.models.registry import get_registry
+    from src.features.text import line_weights, pool_lines
+
+    profiler = profiler or StageProfiler("precompute")
+
+    index = None
+    if index_dir:
+        from src.models.segment_index import SegmentIndex
+        index = SegmentIndex(index_dir)
+
+    from src.features.audio import AUDIO_FEATURE_VERSION
+    meetings = find_meetings(data_dir)
+    pending = []
+    for v, t in meetings:
+        meeting_id = MeetingLoader(v, t).meeting_id
+        if not is_complete(out_dir, meeting_id, window_size, step_size, text_mode, transcript_key(t),
+                           AUDIO_FEATURE_VERSION if with_audio else None):
+            pending.append((v, t))
+        elif index is not None:
+            with np.load(feature_path(out_dir, meeting_id)) as data:
+                if index.config(meeting_id) != index_config(data):
+                    index_meeting(index, meeting_id, data)
+    print(f"Found {len(meetings)} meetings, {len(pending)} to process.")
+    if not pending:
+        return profiler
+
+    registry = get_registry()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(prepare_meeting, v, t, window_size, step_size, with_audio): (v, t)
+            for v, t in pending
+        }
+        for future in as_completed(futures):
+            video_path, transcript_path = futures[future]
+            try:
+                prepared = future.result()
+                meeting_id = prepared.pop("meeting_id")
+                profiler.add(prepared.pop("profile"))
+                line_text = prepared.pop("line_text").tolist()
+                n_segments = len(prepared["start_time"])
+
+                # Text embeddings also land in the shared embedding cache,
+                # so a crash later in this meeting does not lose that work.
+                if text_mode == "lines":
+                    with profiler.stage("text_features", items=len(line_text)):
+                        line_embs = registry.text_extractor().extract_lines(line_text)
+                        prepared["text_emb"] = pool_lines(line_embs, line_weights(line_text),
+                                                          prepared["row_ptr"], prepared["row_index"])
+                else:
+                    with profiler.stage("text_features", items=n_segments):
+                        prepared["text_emb"] = registry.text_extractor().extract(prepared["text"].tolist())
+                if with_video:
+                    with profiler.stage("video_features", items=n_segments) as rec:
+                        loader = MeetingLoader(video_path, transcript_path)
+                        video_extractor = registry.video_extractor()
+                        prepared["video_emb"] = video_extractor.extract_meeting(
+                            loader, prepared["start_time"], prepared["end_time"])
+                        rec["skip_ratio"] = video_extractor.last_stats["skip_ratio"]
+
+                prepared["window_size"] = np.float64(window_size)
+                prepared["step_size"] = np.float64(step_size)
+                prepared["text_mode"] = np.str_(text_mode)
+                prepared["text_model"] = np.str_(registry.text_extractor().cache_name)
+                with profiler.stage("save"):
+                    save_features(out_dir, meeting_id, prepared)
+                print(f"Saved features for {meeting_id} ({n_segments} segments)")
+                if index is not None:
+                    with profiler.stage("index", items=n_segments):
+                        index_meeting(index, meeting_id, prepared)
+            except Exception as e:
+                print(f"Failed to process {video_path}: {e}")
+    return profiler
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute RoME segment features for a directory of meetings.")
+    parser.add_argument("data_dir", help="Directory containing meeting videos and transcripts")
+    parser.add_argument("--out", default=FEATURE_DIR, help="Output directory for per-meeting .npz files")
+    parser.add_argument("--window", type=float, default=30, help="Window size in seconds")
+    parser.add_argument("--step", type=float, default=30, help="Step size in seconds")
+    parser.add_argument("--text-mode", choices=["lines", "window"], default="lines",
+                        help="Embed transcript lines once and pool them per window, or embed whole windows")
+    parser.add_argument("--workers", type=int, default=4, help="Decoding worker processes")
+    parser.add_argument("--no-audio", action="store_true", help="Skip audio features")
+    parser.add_argument("--video", action="store_true", help="Also extract ResNet50 video features")
+    parser.add_argument("--index", default=None, help="Also add segments to the cross-meeting index in this directory")
+    parser.add_argument("--metrics-json", default=None, help="Write per-stage timings as JSON to this path")
+    parser.add_argument("--metrics-prom", default=None, help="Write per-stage totals in Prometheus text format to this path")
+    parser.add_argument("--profile", default=None,
+                        help="Comma-separated main-process stages to run under cProfile ('all' for every stage)")
+    args = parser.parse_args()
+
+    profiler = StageProfiler("precompute", profile_stages=args.profile.split(",") if args.profile else None)
+    run(args.data_dir, args.out, args.window, args.step, args.workers,
+        with_audio=not args.no_audio, with_video=args.video, index_dir=args.index, profiler=profiler,
+        text_mode=args.text_mode)
+
+    for row in profiler.summary():
+        print(" | ".join(f"{k}: {v}" for k, v in row.items() if v is not None))
+    if args.metrics_json:
+        profiler.to_json(args.metrics_json)
+    if args.metrics_prom:
+        profiler.to_prometheus(args.metrics_prom)
+
+if __name__ == "__main__":
+    main()
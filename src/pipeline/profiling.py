@@ -0,0 +1,205 @@
+import os
+import sys
+import json
+import time
+import threading
+import cProfile
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+PROFILE_ENV = "ROME_PROFILE" # Comma-separated stage names to run under cProfile, or "all"
+PROFILE_DIR_ENV = "ROME_PROFILE_DIR"
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process right now (Linux /proc), else the peak so far."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in KB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+class _RssSampler:
+    """Polls RSS in a daemon thread while at least one stage is open, tracking each open stage's peak."""
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._peaks: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def open(self, key: int):
+        rss = current_rss_bytes() or 0
+        with self._lock:
+            self._peaks[key] = rss
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def close(self, key: int) -> int:
+        rss = current_rss_bytes() or 0
+        with self._lock:
+            return max(self._peaks.pop(key, 0), rss)
+
+    def _run(self):
+        while True:
+            rss = current_rss_bytes() or 0
+            with self._lock:
+                if not self._peaks:
+                    # Exit when idle; the next open() starts a new thread
+                    self._thread = None
+                    return
+                for key in self._peaks:
+                    self._peaks[key] = max(self._peaks[key], rss)
+            time.sleep(self.interval)
+
+class StageProfiler:
+    """
+    Lightweight per-stage instrumentation for a request or batch run.
+    Each `with profiler.stage(name, items=n):` block records wall time, CPU time
+    (process-wide, so it includes torch/BLAS threads), peak RSS while the stage
+    ran and items/s. Stages can nest; records keep their parent stage name.
+
+    Drill-down: stages listed in profile_stages (or the ROME_PROFILE env var,
+    "all" for every stage) also run under cProfile and dump standard pstats
+    files to profile_dir (snakeviz / pstats readable). Nothing is hooked
+    otherwise, so sampling profilers such as py-spy see an undisturbed process.
+    """
+    def __init__(self, name: str = "request", profile_stages: Optional[Iterable[str]] = None,
+                 profile_dir: Optional[str] = None, sample_interval: float = 0.02):
+        self.name = name
+        if profile_stages is None and os.environ.get(PROFILE_ENV):
+            profile_stages = [s.strip() for s in os.environ[PROFILE_ENV].split(",") if s.strip()]
+        self.profile_stages = set(profile_stages or ())
+        self.profile_dir = profile_dir or os.environ.get(PROFILE_DIR_ENV, "data/profiles")
+        self.records: List[Dict] = []
+        self._sampler = _RssSampler(sample_interval)
+        self._local = threading.local()
+
+    def _stack(self) -> List[str]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def stage(self, name: str, items: Optional[int] = None):
+        """
+        Times the enclosed block. Yields the record, so the item count can be
+        set once it is known: `with p.stage("embed") as rec: ...; rec["items"] = n`.
+        """
+        stack = self._stack()
+        record = {"stage": name, "parent": stack[-1] if stack else None, "items": items}
+        key = id(record)
+        profiler = None
+        if (name in self.profile_stages or "all" in self.profile_stages) and sys.getprofile() is None:
+            profiler = cProfile.Profile()
+
+        stack.append(name)
+        self._sampler.open(key)
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record["wall_sec"] = time.perf_counter() - wall
+            record["cpu_sec"] = time.process_time() - cpu
+            record["peak_rss_mb"] = self._sampler.close(key) / 2**20
+            stack.pop()
+            if profiler is not None:
+                record["profile"] = self._dump(profiler, name)
+            self.records.append(record)
+
+    def _dump(self, profiler: cProfile.Profile, stage: str) -> str:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        n = sum(1 for r in self.records if r["stage"] == stage)
+        path = os.path.join(self.profile_dir, f"{self.name}.{stage}.{os.getpid()}.{n}.prof")
+        profiler.dump_stats(path)
+        return path
+
+    def add(self, records: List[Dict]):
+        """Merges records produced elsewhere (e.g. by a worker process's own profiler)."""
+        self.records.extend(records)
+
+    def totals(self) -> Dict[str, Dict]:
+        """Per-stage aggregate over all calls: calls, wall/cpu seconds, items, items/s and max peak RSS."""
+        totals: Dict[str, Dict] = {}
+        for r in self.records:
+            t = totals.setdefault(r["stage"], {"calls": 0, "wall_sec": 0.0, "cpu_sec": 0.0,
+                                               "items": 0, "peak_rss_mb": 0.0})
+            t["calls"] += 1
+            t["wall_sec"] += r["wall_sec"]
+            t["cpu_sec"] += r["cpu_sec"]
+            t["items"] += r["items"] or 0
+            t["peak_rss_mb"] = max(t["peak_rss_mb"], r["peak_rss_mb"])
+        for t in totals.values():
+            t["items_per_sec"] = t["items"] / t["wall_sec"] if t["items"] and t["wall_sec"] > 0 else None
+        return totals
+
+    def summary(self) -> List[Dict]:
+        """One rounded row per stage in first-seen order, for display (e.g. st.dataframe)."""
+        wall_total = sum(r["wall_sec"] for r in self.records if r["parent"] is None) or 1.0
+        rows = []
+        for stage, t in self.totals().items():
+            rows.append({
+                "stage": stage,
+                "calls": t["calls"],
+                "wall_sec": round(t["wall_sec"], 3),
+                "cpu_sec": round(t["cpu_sec"], 3),
+                "share": f"{100 * t['wall_sec'] / wall_total:.0f}%",
+                "items": t["items"] or None,
+                "items_per_sec": round(t["items_per_sec"], 1) if t["items_per_sec"] else None,
+                "peak_rss_mb": round(t["peak_rss_mb"], 1),
+            })
+        return rows
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        """Raw records plus per-stage totals as JSON; also written to path if given."""
+        text = json.dumps({"name": self.name, "records": self.records, "totals": self.totals()}, indent=2)
+        if path:
+            _write_text(path, text)
+        return text
+
+    def to_prometheus(self, path: Optional[str] = None, prefix: str = "rome") -> str:
+        """
+        Per-stage totals in the Prometheus text exposition format (e.g. for the
+        node_exporter textfile collector); also written to path if given.
+        """
+        metrics = [
+            ("stage_calls_total", "counter", "Number of times the stage ran", "calls", 1),
+            ("stage_wall_seconds_total", "counter", "Wall-clock time spent in the stage", "wall_sec", 1),
+            ("stage_cpu_seconds_total", "counter", "Process CPU time spent in the stage", "cpu_sec", 1),
+            ("stage_items_total", "counter", "Items processed by the stage", "items", 1),
+            ("stage_peak_rss_bytes", "gauge", "Peak resident set size while the stage ran", "peak_rss_mb", 2**20),
+        ]
+        totals = self.totals()
+        lines = []
+        for metric, kind, help_text, field, scale in metrics:
+            name = f"{prefix}_{metric}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for stage, t in totals.items():
+                lines.append(f'{name}{{run="{_escape(self.name)}",stage="{_escape(stage)}"}} {t[field] * scale:g}')
+        text = "\n".join(lines) + "\n"
+        if path:
+            _write_text(path, text)
+        return text
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _write_text(path: str, text: str):
+    # Atomic, so scrapers never read a half-written file
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
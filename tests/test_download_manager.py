@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.data.download_manager import DownloadManager, DownloadTask
+
+BODY = bytes(range(256)) * 4096  # 1 MiB
+
+class FakeOrigin:
+    """Minimal file server with Range / If-Range support and scriptable failures."""
+    def __init__(self, body: bytes, etag: str = '"v1"'):
+        self.body = body
+        self.etag = etag
+        self.requests = []
+        self.fail_statuses = []  # statuses to answer with before serving, consumed in order
+        self.drop_after = None  # bytes to send before cutting the connection (once)
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        self.requests.append(dict(request.headers))
+        if self.fail_statuses:
+            return web.Response(status=self.fail_statuses.pop(0))
+        start, status = 0, 200
+        range_header = request.headers.get("Range")
+        if range_header and request.headers.get("If-Range", self.etag) == self.etag:
+            start, status = int(range_header[len("bytes="):].rstrip("-")), 206
+            if start >= len(self.body):
+                return web.Response(status=416, headers={"ETag": self.etag, "Content-Range": f"bytes */{len(self.body)}"})
+        resp = web.StreamResponse(status=status, headers={"ETag": self.etag})
+        resp.content_length = len(self.body) - start
+        if status == 206:
+            resp.headers["Content-Range"] = f"bytes {start}-{len(self.body) - 1}/{len(self.body)}"
+        await resp.prepare(request)
+        payload = self.body[start:]
+        if self.drop_after is not None:
+            payload, self.drop_after = payload[:self.drop_after], None
+            await resp.write(payload)
+            request.transport.close()
+            return resp
+        await resp.write(payload)
+        await resp.write_eof()
+        return resp
+
+def download(origin: FakeOrigin, task_kwargs: dict, **manager_kwargs):
+    async def go():
+        app = web.Application()
+        app.router.add_get("/file.bin", origin.handle)
+        async with TestServer(app) as server:
+            task = DownloadTask(str(server.make_url("/file.bin")), **task_kwargs)
+            manager = DownloadManager(backoff=0.01, **manager_kwargs)
+            return (await manager.run([task]))[task.url]
+    return asyncio.run(go())
+
+def test_resumes_after_dropped_connection(tmp_path):
+    origin = FakeOrigin(BODY)
+    origin.drop_after = 300_000
+    dest = tmp_path / "file.bin"
+    error = download(origin, {"dest": dest, "size": len(BODY)})
+
+    assert error is None
+    assert dest.read_bytes() == BODY
+    assert len(origin.requests) == 2
+    assert origin.requests[1]["Range"] == "bytes=300000-"
+    assert origin.requests[1]["If-Range"] == '"v1"'
+    assert not (tmp_path / "file.bin.part").exists()
+    assert not (tmp_path / "file.bin.part.meta").exists()
+
+def test_changed_resource_restarts_instead_of_splicing(tmp_path):
+    origin = FakeOrigin(BODY)
+    origin.drop_after = 300_000
+    dest = tmp_path / "file.bin"
+    # Interrupted download of v1 that is never retried
+    assert download(origin, {"dest": dest}, retries=0) is not None
+    assert (tmp_path / "file.bin.part").stat().st_size == 300_000
+
+    new_body = BODY[::-1]
+    origin.body, origin.etag, origin.requests = new_body, '"v2"', []
+    error = download(origin, {"dest": dest, "sha256": hashlib.sha256(new_body).hexdigest()})
+
+    assert error is None
+    assert dest.read_bytes() == new_body
+    assert len(origin.requests) == 1
+    assert origin.requests[0]["If-Range"] == '"v1"'
+
+def test_retries_server_errors(tmp_path):
+    origin = FakeOrigin(BODY)
+    origin.fail_statuses = [500, 503]
+    dest = tmp_path / "file.bin"
+    error = download(origin, {"dest": dest})
+
+    assert error is None
+    assert dest.read_bytes() == BODY
+    assert len(origin.requests) == 3
+
+def test_does_not_retry_not_found(tmp_path):
+    origin = FakeOrigin(BODY)
+    origin.fail_statuses = [404]
+    dest = tmp_path / "file.bin"
+    error = download(origin, {"dest": dest})
+
+    assert getattr(error, "status", None) == 404
+    assert len(origin.requests) == 1
+    assert not dest.exists()
+
+def test_unsatisfiable_range_with_matching_size_completes(tmp_path):
+    origin = FakeOrigin(BODY)
+    dest = tmp_path / "file.bin"
+    (tmp_path / "file.bin.part").write_bytes(BODY)
+    (tmp_path / "file.bin.part.meta").write_text('{"url": "", "validator": "\\"v1\\""}')
+    error = download(origin, {"dest": dest, "size": len(BODY)})
+
+    assert error is None
+    assert dest.read_bytes() == BODY
+    assert len(origin.requests) == 1
+    assert origin.requests[0]["Range"] == f"bytes={len(BODY)}-"
+
+def test_part_longer_than_resource_restarts(tmp_path):
+    origin = FakeOrigin(BODY)
+    dest = tmp_path / "file.bin"
+    # Leftover of a longer version that happens to carry the current validator
+    (tmp_path / "file.bin.part").write_bytes(BODY + b"stale tail")
+    (tmp_path / "file.bin.part.meta").write_text('{"url": "", "validator": "\\"v1\\""}')
+    error = download(origin, {"dest": dest})
+
+    assert error is None
+    assert dest.read_bytes() == BODY
+    assert len(origin.requests) == 2
+    assert "Range" not in origin.requests[1]
@@ -0,0 +1,143 @@
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from src.pipeline import jobs
+from src.pipeline.jobs import JobQueue, QUEUED, RUNNING, DONE, FAILED, MAX_ATTEMPTS
+
+def dead_worker() -> str:
+    """Worker id of a process on this host that has already exited."""
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return f"{socket.gethostname()}:{proc.pid}"
+
+DEAD = dead_worker()
+LIVE = "other-host:1"  # heartbeat-only liveness: alive until HEARTBEAT_TIMEOUT passes
+
+@pytest.fixture
+def queue(tmp_path):
+    q = JobQueue(str(tmp_path / "jobs"))
+    yield q
+    q.close()
+
+def submit(queue: JobQueue, roles=("Project Manager",), **kwargs) -> str:
+    return queue.submit("meeting.mp4", "meeting.csv", list(roles),
+                        video_hash="v" * 64, transcript_hash="t" * 64, **kwargs)
+
+def fail_with_dead_workers(queue: JobQueue, job_id: str):
+    for _ in range(MAX_ATTEMPTS):
+        assert queue.claim(DEAD)["id"] == job_id
+    queue.claim(LIVE)
+    assert queue.get(job_id)["status"] == FAILED
+
+def test_identical_submissions_share_a_job(queue):
+    job_id = submit(queue)
+    assert submit(queue) == job_id
+    assert submit(queue, top_k=5) != job_id
+    assert queue.stats() == {QUEUED: 2}
+
+    # Joins the running job instead of starting over
+    queue.claim(LIVE)
+    assert submit(queue) == job_id
+    assert queue.get(job_id)["status"] == RUNNING
+
+def test_done_job_is_served_from_its_artifacts(queue, tmp_path):
+    job_id = submit(queue)
+    queue.claim(LIVE)
+    reel = tmp_path / "role0_highlight_reel.mp4"
+    reel.write_bytes(b"mp4")
+    queue.complete(job_id, LIVE, {"roles": [{"role": "Project Manager", "video": str(reel), "segments": []}]})
+
+    assert submit(queue) == job_id
+    assert queue.get(job_id)["status"] == DONE
+
+    # Artifacts gone (e.g. pruned): run again
+    reel.unlink()
+    assert submit(queue) == job_id
+    job = queue.get(job_id)
+    assert (job["status"], job["result"]) == (QUEUED, None)
+
+def test_jobs_of_dead_workers_are_requeued(queue):
+    job_id = submit(queue)
+    assert queue.claim(DEAD)["id"] == job_id
+
+    job = queue.claim(LIVE)
+    assert (job["id"], job["worker"], job["attempts"]) == (job_id, LIVE, 2)
+    # A live worker's job stays with it
+    assert queue.claim("other-host:2") is None
+    assert queue.get(job_id)["worker"] == LIVE
+
+def test_job_fails_after_max_attempts(queue):
+    job_id = submit(queue)
+    fail_with_dead_workers(queue, job_id)
+
+    job = queue.get(job_id)
+    assert job["attempts"] == MAX_ATTEMPTS
+    assert "died" in job["error"]
+    assert queue.claim(LIVE) is None
+
+def test_failed_job_is_resubmitted_with_new_paths(queue):
+    job_id = submit(queue)
+    queue.claim(LIVE)
+    assert queue.fail(job_id, LIVE, "ValueError: boom")
+    assert queue.get(job_id)["status"] == FAILED
+
+    # Same content uploaded again under other paths
+    assert queue.submit("upload2.mp4", "upload2.csv", ["Project Manager"],
+                        video_hash="v" * 64, transcript_hash="t" * 64) == job_id
+    job = queue.get(job_id)
+    assert (job["status"], job["error"], job["worker"]) == (QUEUED, None, None)
+    assert (job["params"]["video_path"], job["params"]["transcript_path"]) == ("upload2.mp4", "upload2.csv")
+    assert queue.claim(LIVE)["id"] == job_id
+
+def test_resubmitting_failed_job_resets_attempts(queue):
+    job_id = submit(queue)
+    fail_with_dead_workers(queue, job_id)
+
+    assert submit(queue) == job_id
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"], job["error"]) == (QUEUED, 0, None)
+    # A full attempt budget again: one dead worker only requeues it
+    queue.claim(DEAD)
+    assert queue.claim(LIVE)["status"] == RUNNING
+
+def test_stale_owner_updates_are_ignored(queue):
+    job_id = submit(queue)
+    queue.claim(DEAD)
+    # DEAD's job is requeued and taken over; its late updates must not touch the new run
+    assert queue.claim(LIVE)["id"] == job_id
+
+    assert not queue.report(job_id, DEAD, "rendering 1/1", 0.9, {"roles": []})
+    assert not queue.complete(job_id, DEAD, {"roles": []})
+    assert not queue.fail(job_id, DEAD, "boom")
+    job = queue.get(job_id)
+    assert (job["status"], job["worker"], job["stage"], job["result"]) == (RUNNING, LIVE, "starting", None)
+
+    assert queue.report(job_id, LIVE, "scoring", 0.5)
+    assert queue.complete(job_id, LIVE, {"roles": []})
+    assert queue.get(job_id)["status"] == DONE
+    # Finished: no further updates from anyone
+    assert not queue.fail(job_id, LIVE, "late")
+    assert queue.get(job_id)["status"] == DONE
+
+def test_worker_stops_job_it_no_longer_owns(queue, monkeypatch):
+    job_id = submit(queue)
+    steps = []
+
+    def run_job(params, artifact_dir, report):
+        report("embedding", 0.2)
+        steps.append("embedding")
+        # Meanwhile the worker is presumed dead and another one takes the job over
+        queue.claim(LIVE)
+        report("scoring", 0.5)
+        steps.append("scoring")
+        return {"roles": []}
+
+    monkeypatch.setattr(jobs, "run_job", run_job)
+    jobs._run_jobs(queue, DEAD, poll_interval=0, max_jobs=1)
+
+    assert steps == ["embedding"]
+    job = queue.get(job_id)
+    assert (job["status"], job["worker"], job["error"]) == (RUNNING, LIVE, None)
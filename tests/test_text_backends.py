@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from src.features.text import TextFeatureExtractor, BACKEND_MIN_COSINE
+from src.pipeline.benchmark import synthetic_transcript, synthetic_transcript_df
+from src.data.loader import SegmentGenerator
+
+MODEL = "all-MiniLM-L6-v2"
+
+def load(backend: str, token_budget=None) -> TextFeatureExtractor:
+    try:
+        return TextFeatureExtractor(MODEL, cache=None, backend=backend, token_budget=token_budget)
+    except ImportError as e:
+        pytest.skip(f"{backend} backend unavailable: {e}")
+    except OSError as e:
+        # Offline without a cached copy: the bounds can only be checked with the real weights
+        pytest.skip(f"{MODEL} weights unavailable: {e}")
+
+@pytest.fixture(scope="module")
+def texts():
+    # Mixed lengths, as in the benchmark: 30 s windows and single transcript lines
+    df = synthetic_transcript_df(synthetic_transcript(1800.0, 400))
+    windows = SegmentGenerator(30, 15).segment_meeting(1800.0, df).text[:100]
+    return windows + df['text'].tolist()[:200]
+
+@pytest.fixture(scope="module")
+def reference(texts):
+    return load("torch").encode(texts)
+
+@pytest.mark.parametrize("backend", sorted(BACKEND_MIN_COSINE))
+def test_backend_matches_float32(backend, texts, reference):
+    embs = load(backend, token_budget=4096).encode(texts)
+    cos = np.sum(embs * reference, axis=1) / np.maximum(
+        np.linalg.norm(embs, axis=1) * np.linalg.norm(reference, axis=1), 1e-12)
+    assert cos.mean() >= BACKEND_MIN_COSINE[backend], f"{backend}: mean cosine {cos.mean():.5f}, min {cos.min():.5f}"